@@ -1,11 +1,83 @@
+import logging
+import os
+import sys
+import time
+
+# Antes das importações pesadas: na primeira execução do processo elas contam para a partida
+SCRIPT_STARTED = time.perf_counter()
+COLD_START = 'financeorganize' not in sys.modules
+
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from datetime import datetime, timedelta
-import requests
-from io import StringIO
-import base64
+
+from financeorganize import (
+    AnalyticsPool,
+    BASE_CURRENCY,
+    BackgroundRefresher,
+    Budgets,
+    CATEGORIAS,
+    COLUMNS,
+    CURRENCY_SYMBOLS,
+    DEFAULT_ACCOUNT,
+    DEFAULT_PAGE_SIZE,
+    DEFAULT_RULES,
+    DEFAULT_USER,
+    EXPORT_FORMATS,
+    FORECAST_MONTHS,
+    FigureCache,
+    IngestError,
+    LEVELS,
+    LedgerService,
+    LedgerStore,
+    MetricsRegistry,
+    PAGE_SIZES,
+    RateTable,
+    RemoteCSVLoader,
+    RerunProfile,
+    RuleSet,
+    SessionLedger,
+    account_totals,
+    balance_variation,
+    create_balance_chart,
+    create_budget_chart,
+    create_expense_pie_chart,
+    create_forecast_chart,
+    create_monthly_flow_chart,
+    currency_symbol,
+    estimate_figure_bytes,
+    expense_months,
+    export_file,
+    export_file_name,
+    format_currency,
+    ingest_csv,
+    load_rates,
+    load_rules,
+    table_page,
+)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+LEDGER_DB_PATH = os.path.join(DATA_DIR, 'ledger.db')
+LEDGER_PATH = os.path.join(DATA_DIR, 'ledger')  # armazenamento Arrow das versões anteriores
+REMOTE_CACHE_PATH = os.path.join(DATA_DIR, 'cache')
+GITHUB_CSV_URL = "https://raw.githubusercontent.com/Alliabson/financeorganize/main/data/lancamentos.csv"
+LEGACY_CSV_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lancamentos.csv')  # versões antigas
+RULES_PATH = os.path.join(DATA_DIR, 'regras.json')  # regras de categorização próprias (opcional)
+AUTO_CATEGORY = "Automática"
+RATES_PATH = os.path.join(DATA_DIR, 'cambio.csv')  # cotações: Data, Moeda, Taxa (valor de 1 unidade em reais)
+ALL_ACCOUNTS = "Todas (consolidado)"
+GITHUB_REFRESH_INTERVAL = 300  # segundos entre atualizações automáticas em segundo plano
+GITHUB_FIRST_LOAD_TIMEOUT = 20  # espera máxima pela primeira busca ao criar um livro vazio
+GITHUB_NOTICE_INTERVAL = 30  # segundos entre verificações de um snapshot novo vindo da atualização periódica
+METRICS_FILE = os.environ.get('FINANCE_METRICS_FILE')  # exportação Prometheus (coletor textfile)
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static')
+CSS_PATH = os.path.join(STATIC_DIR, 'style.css')
+LOGO_PATH = os.path.join(STATIC_DIR, 'logo.svg')
+# Orçamento (segundos) do início da execução até os cards de métricas; acima dele vai um aviso no log
+FIRST_CARD_BUDGET = float(os.environ.get('FINANCE_FIRST_CARD_BUDGET', '1.5'))
+ANALYTICS_WORKERS = os.environ.get('FINANCE_ANALYTICS_WORKERS')  # processos de agregação; 0 desliga
+
+logger = logging.getLogger(__name__)
 
 # --- Configuração da Página ---
 st.set_page_config(
@@ -16,443 +88,141 @@ st.set_page_config(
 )
 
 # --- CSS Personalizado ---
+@st.cache_resource
+def load_custom_css():
+    # Lido do disco uma vez por processo; cada execução só reenvia o texto
+    with open(CSS_PATH, encoding='utf-8') as f:
+        return f"<style>\n{f.read()}</style>"
+
 def apply_custom_css():
-    st.markdown("""
-    <style>
-    :root {
-        --primary: #4e73df;
-        --primary-light: #7a9ef5;
-        --primary-dark: #2c56c8;
-        --success: #1cc88a;
-        --success-light: #4adfa7;
-        --danger: #e74a3b;
-        --danger-light: #ff6b5b;
-        --warning: #f6c23e;
-        --info: #36b9cc;
-        --dark: #5a5c69;
-        --gray: #858796;
-        --light: #f8f9fc;
-        --lighter: #fff;
-    }
-    
-    .stApp {
-        background-color: var(--light);
-        font-family: 'Nunito', sans-serif;
-        line-height: 1.5;
-    }
-    
-    h1 {
-        color: var(--dark);
-        font-weight: 700;
-        font-size: 1.8rem;
-        margin-bottom: 0.5rem;
-    }
-    
-    h2 {
-        color: var(--dark);
-        font-weight: 600;
-        font-size: 1.5rem;
-        margin-top: 1.5rem;
-        margin-bottom: 1rem;
-    }
-    
-    h3 {
-        color: var(--dark);
-        font-weight: 600;
-        font-size: 1.2rem;
-    }
-    
-    .metric-container {
-        display: grid;
-        grid-template-columns: repeat(4, 1fr);
-        gap: 1.5rem;
-        margin-bottom: 2rem;
-    }
-    
-    @media (max-width: 1200px) {
-        .metric-container {
-            grid-template-columns: repeat(2, 1fr);
-        }
-    }
-    
-    @media (max-width: 768px) {
-        .metric-container {
-            grid-template-columns: 1fr;
-        }
-    }
-    
-    .metric-card {
-        background: var(--lighter);
-        border-radius: 0.5rem;
-        padding: 1.5rem;
-        box-shadow: 0 0.15rem 1.75rem 0 rgba(58, 59, 69, 0.1);
-        position: relative;
-        overflow: hidden;
-        border-left: 0.4rem solid;
-        transition: transform 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .metric-card:hover {
-        transform: translateY(-5px);
-        box-shadow: 0 0.5rem 2rem 0 rgba(58, 59, 69, 0.2);
-    }
-    
-    .metric-card.primary { border-left-color: var(--primary); }
-    .metric-card.success { border-left-color: var(--success); }
-    .metric-card.danger { border-left-color: var(--danger); }
-    .metric-card.info { border-left-color: var(--info); }
-    
-    .metric-value {
-        font-size: 1.75rem;
-        font-weight: 700;
-        margin: 0.5rem 0;
-    }
-    
-    .metric-primary { color: var(--primary); }
-    .metric-success { color: var(--success); }
-    .metric-danger { color: var(--danger); }
-    .metric-info { color: var(--info); }
-    
-    .metric-title {
-        font-size: 0.85rem;
-        text-transform: uppercase;
-        font-weight: 600;
-        letter-spacing: 0.5px;
-        color: var(--gray);
-        margin-bottom: 0.25rem;
-    }
-    
-    .metric-period {
-        font-size: 0.75rem;
-        color: var(--gray);
-        display: flex;
-        align-items: center;
-    }
-    
-    .metric-period i {
-        margin-right: 0.3rem;
-        font-size: 0.9rem;
-    }
-    
-    .stTextInput input, 
-    .stNumberInput input, 
-    .stDateInput input, 
-    .stSelectbox div[data-baseweb="select"] {
-        border-radius: 0.4rem;
-        border: 1px solid #d1d3e2;
-        padding: 0.6rem 1rem;
-        background-color: var(--lighter);
-        font-size: 0.95rem;
-        transition: border-color 0.3s ease, box-shadow 0.3s ease;
-    }
-    
-    .stTextInput input:focus, 
-    .stNumberInput input:focus, 
-    .stDateInput input:focus, 
-    .stSelectbox div[data-baseweb="select"]:focus {
-        border-color: var(--primary);
-        box-shadow: 0 0 0 0.2rem rgba(78, 115, 223, 0.25);
-        outline: none;
-    }
-    
-    .stButton button {
-        border-radius: 0.4rem;
-        font-weight: 600;
-        padding: 0.65rem 1.5rem;
-        transition: all 0.3s ease;
-        font-size: 0.95rem;
-    }
-    
-    .stButton button.primary {
-        background-color: var(--primary);
-        border-color: var(--primary);
-    }
-    
-    .stButton button.primary:hover {
-        background-color: var(--primary-dark);
-        border-color: var(--primary-dark);
-        transform: translateY(-2px);
-        box-shadow: 0 0.5rem 1rem rgba(78, 115, 223, 0.3);
-    }
-    
-    .stTabs [role="tablist"] {
-        border-bottom: 1px solid #e3e6f0;
-        margin-bottom: 1.5rem;
-    }
-    
-    .stTabs [role="tab"] {
-        padding: 0.75rem 1.25rem;
-        color: var(--gray);
-        font-weight: 600;
-        margin-right: 0.5rem;
-        border-radius: 0.4rem 0.4rem 0 0;
-        transition: all 0.3s ease;
-    }
-    
-    .stTabs [role="tab"]:hover {
-        color: var(--primary);
-        background-color: rgba(78, 115, 223, 0.05);
-    }
-    
-    .stTabs [aria-selected="true"] {
-        color: var(--primary);
-        border-bottom: 3px solid var(--primary);
-        background-color: transparent;
-    }
-    
-    .stDataFrame {
-        border-radius: 0.5rem;
-        box-shadow: 0 0.15rem 1.75rem 0 rgba(58, 59, 69, 0.1);
-        border: none;
-    }
-    
-    .stTooltip {
-        font-family: 'Nunito', sans-serif;
-        border-radius: 0.3rem;
-        padding: 0.5rem 1rem;
-        box-shadow: 0 0.5rem 1rem rgba(0, 0, 0, 0.15);
-    }
-    
-    .section {
-        background-color: var(--lighter);
-        border-radius: 0.5rem;
-        padding: 1.5rem;
-        box-shadow: 0 0.15rem 1.75rem 0 rgba(58, 59, 69, 0.1);
-        margin-bottom: 1.5rem;
-    }
-    
-    .stRadio [role="radiogroup"] {
-        gap: 1rem;
-    }
-    
-    .stRadio [role="radio"] {
-        padding: 0.5rem 1rem;
-        border-radius: 0.4rem;
-        border: 1px solid #d1d3e2;
-        transition: all 0.3s ease;
-    }
-    
-    .stRadio [role="radio"][aria-checked="true"] {
-        background-color: var(--primary);
-        color: white;
-        border-color: var(--primary);
-    }
-    
-    @media (max-width: 768px) {
-        .stRadio [role="radiogroup"] {
-            flex-direction: column;
-            align-items: flex-start;
-        }
-    }
-    
-    .icon {
-        margin-right: 0.5rem;
-    }
-    </style>
-    """, unsafe_allow_html=True)
+    # Só com <style>, o st.html vai para o contêiner de eventos e não ocupa espaço na página
+    st.html(load_custom_css())
 
 apply_custom_css()
 
-# --- Funções Auxiliares ---
-def format_currency(value):
-    return f"R$ {value:,.2f}"
+@st.cache_resource
+def get_figure_cache():
+    # Compartilhado pelo processo; o limite de memória vale para todas as sessões juntas
+    return FigureCache()
 
-def calculate_metrics(df_filtered_current_period, start_date, end_date, prev_month_start, prev_month_end):
-    total_receitas = df_filtered_current_period[df_filtered_current_period['Tipo'] == 'Receita']['Valor'].sum() if not df_filtered_current_period.empty else 0
-    total_despesas = df_filtered_current_period[df_filtered_current_period['Tipo'] == 'Despesa']['Valor'].sum() if not df_filtered_current_period.empty else 0
-    saldo_atual = total_receitas - total_despesas
+@st.cache_resource
+def get_metrics_registry():
+    # Tempos de todas as sessões do processo
+    return MetricsRegistry(textfile=METRICS_FILE)
 
-    prev_month_receitas = 0
-    prev_month_despesas = 0
-    
-    if not st.session_state.df.empty:
-        df_full_data_copy = st.session_state.df.copy()
-        df_full_data_copy['Data'] = pd.to_datetime(df_full_data_copy['Data'], errors='coerce')
-        df_full_data_copy = df_full_data_copy.dropna(subset=['Data'])
-        
-        if not df_full_data_copy.empty:
-            df_prev_month_data = df_full_data_copy[
-                (df_full_data_copy['Data'].dt.date >= prev_month_start) & 
-                (df_full_data_copy['Data'].dt.date <= prev_month_end)
-            ]
-            prev_month_receitas = df_prev_month_data[df_prev_month_data['Tipo'] == 'Receita']['Valor'].sum() if not df_prev_month_data.empty else 0
-            prev_month_despesas = df_prev_month_data[df_prev_month_data['Tipo'] == 'Despesa']['Valor'].sum() if not df_prev_month_data.empty else 0
+@st.cache_resource
+def get_analytics_pool():
+    # Um pool por processo: sessões com a mesma consulta na mesma versão dividem o resultado
+    return AnalyticsPool(max_workers=int(ANALYTICS_WORKERS) if ANALYTICS_WORKERS else None)
 
-    prev_month_saldo = prev_month_receitas - prev_month_despesas
-    return total_receitas, total_despesas, saldo_atual, prev_month_saldo
+def dev_panel_enabled():
+    return st.query_params.get('dev') == '1' or os.environ.get('FINANCE_DEV_PANEL') == '1'
 
-def create_monthly_flow_chart(df):
-    if df.empty:
-        return None
-        
-    df_monthly = df.copy()
-    df_monthly['Mês'] = df_monthly['Data'].dt.to_period('M').astype(str)
-    monthly_summary = df_monthly.groupby(['Mês', 'Tipo'])['Valor'].sum().unstack().fillna(0)
-    
-    for tipo in ['Receita', 'Despesa']:
-        if tipo not in monthly_summary.columns:
-            monthly_summary[tipo] = 0
-    
-    monthly_summary.index = pd.PeriodIndex(monthly_summary.index, freq='M')
-    monthly_summary = monthly_summary.sort_index()
-    monthly_summary.index = monthly_summary.index.astype(str)
+def cached_figure(ledger, chart_type, start_date, end_date, build):
+    key = (ledger.version, start_date, end_date, chart_type)
+    return get_figure_cache().get_or_build(key, build)
 
-    fig = go.Figure()
-    
-    fig.add_trace(go.Bar(
-        x=monthly_summary.index,
-        y=monthly_summary['Receita'],
-        name='Receitas',
-        marker_color='#1cc88a',
-        hovertemplate='<b>%{x}</b><br>Receitas: R$ %{y:,.2f}<extra></extra>'
-    ))
-    
-    fig.add_trace(go.Bar(
-        x=monthly_summary.index,
-        y=-monthly_summary['Despesa'],
-        name='Despesas',
-        marker_color='#e74a3b',
-        hovertemplate='<b>%{x}</b><br>Despesas: R$ %{y:,.2f}<extra></extra>'
-    ))
-    
-    fig.update_layout(
-        title='Fluxo Mensal de Receitas e Despesas',
-        barmode='relative',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        hovermode='x unified',
-        height=450,
-        margin=dict(t=50, b=50, l=50, r=50),
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1
-        ),
-        xaxis=dict(
-            showgrid=False,
-            tickangle=-45
-        ),
-        yaxis=dict(
-            gridcolor='#e3e6f0',
-            tickprefix="R$ "
-        )
-    )
-    
-    return fig
+# --- Funções para Integração com GitHub ---
+@st.cache_resource
+def get_github_loader():
+    # Um único loader por processo: o quadro carregado é compartilhado entre as sessões
+    return RemoteCSVLoader(GITHUB_CSV_URL, REMOTE_CACHE_PATH)
 
-def create_expense_pie_chart(df):
-    df_despesas = df[df['Tipo'] == 'Despesa']
-    if df_despesas.empty:
-        return None
-    
-    expense_by_category = df_despesas.groupby('Categoria')['Valor'].sum().reset_index()
-    
-    fig = px.pie(
-        expense_by_category,
-        values='Valor',
-        names='Categoria',
-        title='Distribuição das Despesas por Categoria',
-        hole=0.5,
-        color_discrete_sequence=px.colors.qualitative.Pastel
-    )
-    
-    fig.update_traces(
-        textposition='inside',
-        textinfo='percent+label',
-        hovertemplate='<b>%{label}</b><br>Valor: R$ %{value:,.2f}<br>Percentual: %{percent}<extra></extra>',
-        marker=dict(line=dict(color='#fff', width=1))
-    )
-    fig.update_layout(
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        height=450,
-        showlegend=False,
-        margin=dict(t=50, b=50, l=50, r=50),
-        uniformtext_minsize=12,
-        uniformtext_mode='hide'
-    )
-    
-    return fig
+@st.cache_resource
+def get_github_refresher():
+    # Busca, parse e montagem do Ledger rodam numa thread do processo, fora das execuções do script
+    return BackgroundRefresher(get_github_loader().load, interval=GITHUB_REFRESH_INTERVAL).start()
 
-def create_balance_chart(df):
-    if df.empty:
-        return None
-        
-    df_saldo = df.copy()
-    df_saldo = df_saldo.sort_values('Data')
-    df_saldo['Valor_Ajustado'] = df_saldo.apply(
-        lambda x: x['Valor'] if x['Tipo'] == 'Receita' else -x['Valor'], axis=1
-    )
-    df_saldo['Saldo_Acumulado'] = df_saldo['Valor_Ajustado'].cumsum()
-    
-    fig = go.Figure()
-    
-    fig.add_trace(go.Scatter(
-        x=df_saldo['Data'],
-        y=df_saldo['Saldo_Acumulado'],
-        mode='lines+markers',
-        name='Saldo Acumulado',
-        line=dict(color='#4e73df', width=3),
-        marker=dict(size=8, color='#4e73df'),
-        hovertemplate='<b>%{x|%d/%m/%Y}</b><br>Saldo: R$ %{y:,.2f}<extra></extra>',
-        fill='tozeroy',
-        fillcolor='rgba(78, 115, 223, 0.1)'
-    ))
-    
-    fig.update_layout(
-        title='Evolução do Saldo Acumulado',
-        xaxis_title='Data',
-        yaxis_title='Saldo (R$)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        paper_bgcolor='rgba(0,0,0,0)',
-        height=450,
-        hovermode='x unified',
-        margin=dict(t=50, b=50, l=50, r=50),
-        xaxis=dict(
-            showgrid=False,
-            tickformat='%d/%m'
-        ),
-        yaxis=dict(
-            gridcolor='#e3e6f0',
-            tickprefix="R$ "
-        )
-    )
-    
-    return fig
-
-# --- Funções para Integração com GitHub ---
 def load_data_from_github():
-    url = "https://raw.githubusercontent.com/Alliabson/financeorganize/main/data/lancamentos.csv"
-    try:
-        response = requests.get(url)
-        response.raise_for_status()
-        df = pd.read_csv(StringIO(response.text))
-        df['Data'] = pd.to_datetime(df['Data'], errors='coerce')
-        return df.dropna(subset=['Data'])
-    except Exception as e:
-        st.error(f"Erro ao carregar dados do GitHub: {str(e)}")
-        return pd.DataFrame(columns=['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria'])
-
-def save_data_locally():
+    refresher = get_github_refresher()
+    snapshot = refresher.wait(GITHUB_FIRST_LOAD_TIMEOUT)
+    if snapshot is not None:
+        return snapshot.frame
+    if refresher.last_error is not None:
+        st.error(f"Erro ao carregar dados do GitHub: {str(refresher.last_error)}")
+    return pd.DataFrame(columns=COLUMNS)
+
+def github_reload_status():
+    # Acompanha a recarga pedida por esta sessão sem bloquear a tela; o resto do painel segue com os dados atuais
+    refresher = get_github_refresher()
+    ticket = st.session_state.get('github_ticket')
+    if ticket is None:
+        return
+    if refresher.completed < ticket:
+        st.caption("⏳ Buscando dados do GitHub em segundo plano...")
+        return
+    del st.session_state.github_ticket
+    snapshot = refresher.snapshot
+    if refresher.last_error is not None:
+        st.session_state.github_error = (
+            f"Erro ao carregar dados do GitHub: {str(refresher.last_error)}. "
+            "Os dados atuais foram mantidos e uma nova tentativa será feita automaticamente."
+        )
+    elif snapshot is not None and not snapshot.frame.empty:
+        apply_github_snapshot(snapshot)
+    st.rerun()
+
+def apply_github_snapshot(snapshot):
+    # O Ledger já montado em segundo plano substitui a base numa troca só; as outras sessões o veem na próxima execução
+    st.session_state.github_seen = snapshot.sequence
+    replace_data_locally(snapshot.ledger)
+
+def github_update_notice():
+    # A atualização periódica não troca os dados sozinha (apagaria lançamentos feitos aqui): avisa e deixa escolher
+    snapshot = get_github_refresher().snapshot
+    if snapshot is None or 'github_ticket' in st.session_state:
+        return
+    seen = st.session_state.setdefault('github_seen', snapshot.sequence)
+    if snapshot.sequence <= seen or snapshot.frame.empty:
+        return
+    fetched_at = datetime.fromtimestamp(snapshot.fetched_at).strftime('%H:%M')
+    st.info(f"Há dados mais recentes no GitHub (buscados às {fetched_at}).")
+    apply_col, dismiss_col = st.columns(2)
+    with apply_col:
+        if st.button("Aplicar", key="github_apply_update", help="Substitui os dados atuais pelos do GitHub"):
+            apply_github_snapshot(snapshot)
+            st.rerun()
+    with dismiss_col:
+        if st.button("Ignorar", key="github_dismiss_update"):
+            st.session_state.github_seen = snapshot.sequence
+            st.rerun(scope="fragment")
+
+# --- Armazenamento Local ---
+@st.cache_resource
+def get_ledger_service():
+    # Um pool de conexões por processo, compartilhado por todas as sessões e usuários
+    os.makedirs(DATA_DIR, exist_ok=True)
+    service = LedgerService(LEDGER_DB_PATH)
+    store = service.store(DEFAULT_USER)
+    # Migra os dados gravados pelas versões anteriores na primeira abertura
+    if store.is_empty():
+        if os.path.exists(os.path.join(LEDGER_PATH, 'manifest.json')):
+            store.replace(LedgerStore(LEDGER_PATH).read())
+        elif os.path.exists(LEGACY_CSV_PATH):
+            legacy_df = read_legacy_csv(LEGACY_CSV_PATH)
+            if not legacy_df.empty:
+                store.replace(legacy_df)
+    return service
+
+def read_legacy_csv(path):
+    # Mesma validação das importações; o arquivo fica onde está, então nada do que for recusado se perde
     try:
-        st.session_state.df.to_csv('lancamentos.csv', index=False)
-        st.success("Dados salvos localmente em lancamentos.csv")
-    except Exception as e:
-        st.error(f"Erro ao salvar localmente: {str(e)}")
-
-def get_csv_download_link():
-    csv = st.session_state.df.to_csv(index=False)
-    b64 = base64.b64encode(csv.encode()).decode()
-    href = f'<a href="data:file/csv;base64,{b64}" download="lancamentos.csv" style="background-color: var(--primary); color: white; padding: 0.5rem 1rem; border-radius: 0.4rem; text-decoration: none;">📥 Baixar CSV Atualizado</a>'
-    return href
-
-# --- Inicialização de Dados ---
-if 'df' not in st.session_state:
-    st.session_state.df = load_data_from_github()
-    
-    if st.session_state.df.empty:
+        df, report = ingest_csv(path)
+    except (pd.errors.EmptyDataError, IngestError) as e:
+        logger.warning("%s não foi migrado: %s", path, e)
+        return pd.DataFrame(columns=COLUMNS)
+    if report.rows_rejected:
+        reasons = ", ".join(f"{reason}: {count}" for reason, count in report.rejected.items() if count)
+        logger.warning("%s: %d linha(s) ignorada(s) na migração (%s)", path, report.rows_rejected, reasons)
+    return df
+
+def current_user():
+    # Cada usuário (?usuario=... na URL) tem seu próprio livro
+    return st.query_params.get('usuario', '').strip() or DEFAULT_USER
+
+def load_initial_data():
+    initial_df = load_data_from_github()
+    if initial_df.empty:
         example_data = {
             'Data': [
                 datetime(2024, 1, 10), datetime(2024, 1, 15), datetime(2024, 1, 20),
@@ -485,31 +255,167 @@ if 'df' not in st.session_state:
                 'Lazer', 'Salário', 'Saúde'
             ]
         }
-        st.session_state.df = pd.DataFrame(example_data)
-        st.session_state.df['Data'] = pd.to_datetime(st.session_state.df['Data'])
+        initial_df = pd.DataFrame(example_data)
+    return initial_df
+
+def get_shared_ledger(user):
+    # Base única e somente leitura para todas as sessões do mesmo usuário no processo
+    return get_ledger_service().shared(user, load_initial_data)
+
+def current_ledger():
+    # Base compartilhada, mais os lançamentos desta sessão que ainda não foram gravados
+    return st.session_state.ledger_session.ledger
+
+def save_pending_changes():
+    try:
+        st.session_state.ledger_session.commit()
+        st.success("Dados salvos localmente")
+        return True
+    except Exception as e:
+        st.error(f"Erro ao salvar localmente: {str(e)}. As alterações ficam pendentes nesta sessão.")
+        return False
+
+def save_data_locally(new_entries):
+    st.session_state.ledger_session.stage(new_entries)
+    return save_pending_changes()
+
+def replace_data_locally(df):
+    try:
+        st.session_state.ledger_session.shared.replace(df)
+        st.session_state.ledger_session.discard()
+        st.success("Dados salvos localmente")
+        return True
+    except Exception as e:
+        st.error(f"Erro ao salvar localmente: {str(e)}")
+        return False
+
+def current_budgets():
+    # Limites mensais por categoria, gravados no banco junto com o livro do usuário
+    return Budgets(get_ledger_service().store(current_user()).read_budgets())
+
+def budget_ledger():
+    # Orçamentos valem para o consolidado, na moeda base
+    return current_ledger().view(None, current_rate_table())
+
+def save_with_budget_alerts(new_entries):
+    # Compara os níveis de antes e depois só nos meses do lote; os alertas ficam na sessão para sobreviver ao st.rerun
+    budgets = current_budgets()
+    months = expense_months(new_entries) if len(budgets) else []
+    if not months:
+        return save_data_locally(new_entries)
+    ledger = budget_ledger()
+    before = {month: budgets.levels(ledger.spending(month)) for month in months}
+    saved = save_data_locally(new_entries)
+    if saved:
+        # Níveis por nome de categoria: valem mesmo se outro processo gravou e o livro foi relido
+        ledger = budget_ledger()
+        st.session_state.budget_alerts = st.session_state.get('budget_alerts', []) + [
+            alert for month in months for alert in budgets.alerts(ledger.spending(month), month, before[month])
+        ]
+    return saved
+
+def show_budget_alerts():
+    for alert in st.session_state.pop('budget_alerts', []):
+        message = (
+            f"Orçamento de {alert.categoria} em {alert.mes.strftime('%m/%Y')}: "
+            f"{format_currency(alert.gasto)} de {format_currency(alert.limite)} ({LEVELS[alert.nivel].lower()})"
+        )
+        if alert.nivel == len(LEVELS) - 1:
+            st.error(message, icon="🚨")
+        else:
+            st.warning(message, icon="⚠️")
+
+@st.cache_resource(max_entries=2)
+def get_rules(mtime):
+    # Regras do arquivo (se houver) antes das padrão; relidas só quando o arquivo muda
+    return (load_rules(RULES_PATH) if mtime is not None else []) + DEFAULT_RULES
+
+@st.cache_resource(max_entries=8)
+def get_rule_set(version, rules_mtime, _ledger):
+    # Os mapeamentos aprendidos saem do índice do Ledger, que cada gravação atualiza só com o lote
+    return RuleSet(get_rules(rules_mtime), learned=_ledger.learned_mappings())
+
+def current_rule_set():
+    ledger = current_ledger()
+    mtime = os.path.getmtime(RULES_PATH) if os.path.exists(RULES_PATH) else None
+    try:
+        return get_rule_set(ledger.version, mtime, ledger)
+    except ValueError as e:
+        st.warning(f"Regras de {RULES_PATH} ignoradas: {e}")
+        return get_rule_set(ledger.version, None, ledger)
+
+@st.cache_resource(max_entries=2)
+def get_rate_table(mtime):
+    # Relido só quando o arquivo muda; a versão da tabela é a chave das conversões em cache no Ledger
+    return load_rates(RATES_PATH) if mtime is not None else RateTable()
+
+def current_rate_table():
+    return get_rate_table(os.path.getmtime(RATES_PATH) if os.path.exists(RATES_PATH) else None)
+
+def currency_options():
+    return sorted(set(CURRENCY_SYMBOLS) | set(current_rate_table().currencies))
+
+def export_callback(ledger, fmt, start_date=None, end_date=None):
+    # Executado só quando o botão é clicado, fora da thread do script: não pode usar st.session_state
+    def build():
+        df = ledger.df if start_date is None else ledger.between(start_date, end_date)
+        return export_file(df, fmt)
+    return build
+
+def table_next_page(cursor):
+    st.session_state.table_cursors.append(cursor)
+
+def table_previous_page():
+    # Cada página guarda o cursor que a abriu; voltar é descartar o último
+    if len(st.session_state.table_cursors) > 1:
+        st.session_state.table_cursors.pop()
+
+# --- Inicialização de Dados ---
+user = current_user()
+profile = RerunProfile(get_metrics_registry(), started=SCRIPT_STARTED, usuario=user)
+profile.section("Inicialização")
+if st.session_state.get('ledger_user') != user:
+    st.session_state.ledger_session = SessionLedger(get_shared_ledger(user))
+    st.session_state.ledger_user = user
+else:
+    # Traz as gravações feitas por outros processos no mesmo banco
+    st.session_state.ledger_session.shared.refresh()
 
 # --- Header ---
 col1, col2 = st.columns([1, 3])
 with col1:
-    st.image("https://placehold.co/150x50/4e73df/ffffff?text=Granazen", width=150)
+    st.image(LOGO_PATH, width=150)
 with col2:
     st.title("Dashboard Financeiro")
 
 st.markdown("Visualize e analise suas finanças pessoais com insights poderosos")
 
 # --- Seção para Gerenciamento de Dados ---
+profile.section("Gerenciamento")
 st.header("💾 Gerenciamento de Dados")
 col1, col2 = st.columns(2)
 with col1:
     if st.button("🔄 Recarregar Dados do GitHub", help="Carrega os dados mais recentes do repositório GitHub"):
-        st.session_state.df = load_data_from_github()
-        st.rerun()
+        st.session_state.github_ticket = get_github_refresher().request()
+    if 'github_error' in st.session_state:
+        st.error(st.session_state.pop('github_error'))
+    # Enquanto houver recarga pendente, só este trecho é reexecutado, a cada segundo
+    st.fragment(github_reload_status, run_every=1 if 'github_ticket' in st.session_state else None)()
+    st.fragment(github_update_notice, run_every=GITHUB_NOTICE_INTERVAL)()
 
 with col2:
-    st.markdown(get_csv_download_link(), unsafe_allow_html=True)
+    # Preenchido depois dos filtros, pois a exportação pode se limitar ao período selecionado
+    export_slot = st.container()
+
+pending_changes = len(st.session_state.ledger_session.pending)
+if pending_changes:
+    st.warning(f"{pending_changes} transações ainda não foram salvas localmente")
+    if st.button("💾 Tentar salvar novamente", key="retry_save") and save_pending_changes():
+        st.rerun()
 
 # --- Seção 1: Gerenciar Lançamentos ---
 st.header("📝 Gerenciar Lançamentos")
+show_budget_alerts()
 tab1, tab2 = st.tabs(["📤 Carregar CSV", "✏️ Inserir Manualmente"])
 
 with tab1:
@@ -517,27 +423,94 @@ with tab1:
     uploaded_file = st.file_uploader(
         "Selecione seu arquivo CSV",
         type="csv",
-        help="O arquivo deve conter colunas: Data, Descrição, Valor, Tipo, Categoria",
+        help="O arquivo deve conter colunas: Data, Descrição, Valor, Tipo e, opcionalmente, Categoria, Conta e Moeda",
         key="file_uploader"
     )
     
-    if uploaded_file is not None:
+    import_mode = st.radio(
+        "Modo de importação",
+        ["Mesclar com os dados atuais", "Substituir os dados atuais"],
+        horizontal=True,
+        key="import_mode"
+    )
+    merge_import = import_mode == "Mesclar com os dados atuais"
+    skip_duplicates = st.checkbox(
+        "Ignorar transações já existentes", value=True, disabled=not merge_import, key="import_dedup"
+    )
+    fuzzy_duplicates = st.checkbox(
+        "Considerar descrições parecidas como repetidas",
+        help="Compara descrições de transações com mesma data, valor e tipo (ex.: 'PIX Maria José' e 'Pix MARIA JOSE')",
+        disabled=not (merge_import and skip_duplicates),
+        key="import_fuzzy"
+    )
+    auto_categorize = st.checkbox(
+        "Categorizar automaticamente",
+        value=True,
+        help="Preenche categorias vazias pelo histórico do livro e por regras de palavras-chave",
+        key="import_auto_categorize"
+    )
+    recategorize = st.checkbox(
+        "Recategorizar também linhas que já têm categoria",
+        disabled=not auto_categorize,
+        key="import_recategorize"
+    )
+    account_col, currency_col = st.columns(2)
+    with account_col:
+        import_account = st.text_input(
+            "Conta",
+            value=DEFAULT_ACCOUNT,
+            help="Usada nas linhas sem a coluna Conta (ex.: um extrato de cartão)",
+            key="import_account"
+        ).strip() or DEFAULT_ACCOUNT
+    with currency_col:
+        currencies = currency_options()
+        import_currency = st.selectbox(
+            "Moeda",
+            currencies,
+            index=currencies.index(BASE_CURRENCY),
+            help="Usada nas linhas sem a coluna Moeda",
+            key="import_currency"
+        )
+    
+    if uploaded_file is not None and st.button("📥 Importar Extrato", key="import_button"):
+        progress_bar = st.progress(0.0, text="Lendo arquivo...")
+        
+        def update_progress(fraction, rows_read):
+            progress_bar.progress(fraction or 0.0, text=f"{rows_read:,} linhas lidas")
+        
         try:
-            temp_df = pd.read_csv(uploaded_file)
-            required_cols = ['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria']
-            if all(col in temp_df.columns for col in required_cols):
-                st.session_state.df = temp_df
-                st.session_state.df['Data'] = pd.to_datetime(st.session_state.df['Data'], errors='coerce')
-                st.session_state.df = st.session_state.df.dropna(subset=['Data'])
-                save_data_locally()
-                st.success("Dados carregados e salvos com sucesso!")
-                
-                with st.expander("Visualizar dados carregados"):
-                    st.dataframe(st.session_state.df.head(), use_container_width=True)
-                st.rerun()
+            # Leitura em blocos com tipos explícitos; linhas inválidas são descartadas e contadas
+            temp_df, report = ingest_csv(
+                uploaded_file, progress=update_progress, total_bytes=uploaded_file.size,
+                rules=current_rule_set() if auto_categorize else None, recategorize=recategorize,
+                account=import_account, currency=import_currency
+            )
+            progress_bar.progress(1.0, text=f"{report.rows_read:,} linhas lidas")
+            
+            if merge_import:
+                duplicates = 0
+                if skip_duplicates:
+                    temp_df, duplicates = current_ledger().deduplicate(temp_df, fuzzy=fuzzy_duplicates)
+                saved = save_with_budget_alerts(temp_df)
+                show_budget_alerts()
+                if duplicates:
+                    st.info(f"{duplicates:,} transações já existentes foram ignoradas")
             else:
-                missing_cols = [col for col in required_cols if col not in temp_df.columns]
-                st.error(f"O arquivo não contém todas as colunas necessárias. Faltando: {', '.join(missing_cols)}")
+                saved = replace_data_locally(temp_df)
+            # Em caso de falha o erro já foi mostrado; na mesclagem as linhas ficam pendentes nesta sessão
+            if saved:
+                st.success(f"{len(temp_df):,} transações carregadas e salvas com sucesso!")
+            if report.auto_categorized:
+                st.info(f"{report.auto_categorized:,} transações categorizadas automaticamente")
+            
+            if report.rows_rejected:
+                reasons = ", ".join(f"{reason}: {count}" for reason, count in report.rejected.items() if count)
+                st.warning(f"{report.rows_rejected:,} linhas ignoradas ({reasons})")
+            
+            with st.expander("Visualizar dados carregados"):
+                st.dataframe(temp_df.head(), use_container_width=True)
+        except IngestError as e:
+            st.error(str(e))
         except Exception as e:
             st.error(f"Erro ao processar arquivo: {str(e)}")
 
@@ -549,13 +522,16 @@ with tab2:
         with cols[0]:
             data = st.date_input("Data*", value=datetime.now())
             tipo = st.selectbox("Tipo*", ["Receita", "Despesa"])
+            conta = st.selectbox(
+                "Conta*", sorted(set(current_ledger().accounts()) | {DEFAULT_ACCOUNT}),
+                accept_new_options=True, help="Escolha uma conta ou digite o nome de uma nova"
+            )
         
         with cols[1]:
-            valor = st.number_input("Valor (R$)*", min_value=0.01, format="%.2f", step=0.01)
-            categoria = st.selectbox(
-                "Categoria*",
-                ["Moradia", "Alimentação", "Transporte", "Lazer", "Saúde", "Educação", "Outros", "Salário", "Freelance", "Bônus"]
-            )
+            valor = st.number_input("Valor*", min_value=0.01, format="%.2f", step=0.01)
+            categoria = st.selectbox("Categoria*", [AUTO_CATEGORY] + CATEGORIAS)
+            currencies = currency_options()
+            moeda = st.selectbox("Moeda*", currencies, index=currencies.index(BASE_CURRENCY))
         
         with cols[2]:
             descricao = st.text_input("Descrição*")
@@ -569,17 +545,20 @@ with tab2:
                     'Descrição': descricao,
                     'Valor': valor,
                     'Tipo': tipo,
-                    'Categoria': categoria
+                    'Categoria': '' if categoria == AUTO_CATEGORY else categoria,
+                    'Conta': (conta or DEFAULT_ACCOUNT).strip(),
+                    'Moeda': moeda
                 }])
-                st.session_state.df = pd.concat([st.session_state.df, new_entry], ignore_index=True)
-                st.session_state.df['Data'] = pd.to_datetime(st.session_state.df['Data'], errors='coerce')
-                save_data_locally()
-                st.success("Transação adicionada e dados salvos!")
+                if categoria == AUTO_CATEGORY:
+                    new_entry, _ = current_rule_set().fill(new_entry)
+                if save_with_budget_alerts(new_entry):
+                    st.success("Transação adicionada e dados salvos!")
                 st.rerun()
             else:
                 st.warning("Preencha todos os campos obrigatórios (*)")
 
 # --- Filtro de Período ---
+profile.section("Filtros")
 st.header("🔍 Filtros de Período")
 col1, col2, col3 = st.columns([2, 3, 1])
 
@@ -629,42 +608,75 @@ with col3:
         st.session_state.period_radio = "Este Mês"
         st.rerun()
 
-# Filtra os dados
-df_filtered = pd.DataFrame()
-if not st.session_state.df.empty:
-    df_temp = st.session_state.df.copy()
-    df_temp['Data'] = pd.to_datetime(df_temp['Data'], errors='coerce')
-    df_temp = df_temp.dropna(subset=['Data'])
-    
-    df_filtered = df_temp[
-        (df_temp['Data'].dt.date >= start_date) & 
-        (df_temp['Data'].dt.date <= end_date)
-    ].copy()
+ledger = current_ledger()
+accounts = ledger.accounts()
+rates = current_rate_table()
+account = None
+if len(accounts) > 1:
+    account_choice = st.selectbox("Conta", [ALL_ACCOUNTS] + accounts, key="account_filter")
+    account = None if account_choice == ALL_ACCOUNTS else account_choice
+# Conta na própria moeda; o consolidado (ou conta com várias moedas) convertido pelas cotações.
+# As visões ficam no Ledger: trocar de conta não refaz a conversão
+account_ledger = ledger.account(account)
+view = ledger.view(account, rates)
+currency = view.currency
+missing_rates = [] if account_ledger.currency else [c for c in account_ledger.labels('Moeda') if not rates.covers(c)]
+if missing_rates:
+    st.warning(
+        f"Sem cotação para {', '.join(missing_rates)}: esses lançamentos ficam fora dos valores em "
+        f"{currency}. Inclua as cotações (colunas Data, Moeda, Taxa) em {os.path.relpath(RATES_PATH)}."
+    )
+
+# Filtra os dados: busca binária sobre as datas ordenadas, devolvendo uma view
+df_filtered = view.between(start_date, end_date)
+profile.add(rows=len(df_filtered))
+# Agregações pesadas vão para o pool de processos; os gráficos começam a ser calculados já aqui
+analytics = get_analytics_pool().view(view)
+if not df_filtered.empty:
+    analytics.prefetch(start_date, end_date)
+
+with export_slot:
+    export_cols = st.columns(2)
+    with export_cols[0]:
+        export_format = st.selectbox(
+            "Formato",
+            list(EXPORT_FORMATS),
+            format_func=lambda fmt: EXPORT_FORMATS[fmt][0],
+            key="export_format"
+        )
+    with export_cols[1]:
+        st.markdown("<div style='height: 28px;'></div>", unsafe_allow_html=True)
+        export_filtered = st.checkbox("Apenas o período filtrado", key="export_filtered")
+    st.download_button(
+        "📥 Baixar Dados Atualizados",
+        data=export_callback(account_ledger, export_format, *((start_date, end_date) if export_filtered else ())),
+        file_name=export_file_name(export_format),
+        mime=EXPORT_FORMATS[export_format][2],
+        on_click="ignore",
+        key="download_export"
+    )
 
 # --- Cards de Métricas ---
+profile.section("Visão Geral")
 st.header("📊 Visão Geral")
 
 if not df_filtered.empty:
     first_day_current_filter_month = start_date.replace(day=1)
     last_day_prev_filter_month = first_day_current_filter_month - timedelta(days=1)
-    first_day_prev_filter_month = last_day_prev_filter_month.replace(day=1)
 
-    total_receitas, total_despesas, saldo_atual, prev_month_saldo = calculate_metrics(
-        df_filtered, start_date, end_date,
-        first_day_prev_filter_month, last_day_prev_filter_month
+    (total_receitas, total_despesas, saldo_atual, prev_month_saldo), period_totals = analytics.metrics(
+        start_date, end_date, last_day_prev_filter_month
     )
+    profile.add(rows=period_totals.n_receitas + period_totals.n_despesas)
     
-    if prev_month_saldo != 0:
-        saldo_variation = ((saldo_atual - prev_month_saldo) / abs(prev_month_saldo)) * 100
-    else:
-        saldo_variation = 0
+    saldo_variation = balance_variation(saldo_atual, prev_month_saldo)
     
     cols = st.columns(4)
     with cols[0]:
         st.markdown(f"""
         <div class="metric-card primary">
             <div class="metric-title">Saldo Total</div>
-            <div class="metric-value metric-primary">{format_currency(saldo_atual)}</div>
+            <div class="metric-value metric-primary">{format_currency(saldo_atual, currency)}</div>
             <div class="metric-period">
                 <i>📅</i> {start_date.strftime('%d/%m')} - {end_date.strftime('%d/%m/%Y')}
             </div>
@@ -675,9 +687,9 @@ if not df_filtered.empty:
         st.markdown(f"""
         <div class="metric-card success">
             <div class="metric-title">Receitas</div>
-            <div class="metric-value metric-success">{format_currency(total_receitas)}</div>
+            <div class="metric-value metric-success">{format_currency(total_receitas, currency)}</div>
             <div class="metric-period">
-                <i>📈</i> {len(df_filtered[df_filtered['Tipo'] == 'Receita'])} transações
+                <i>📈</i> {period_totals.n_receitas} transações
             </div>
         </div>
         """, unsafe_allow_html=True)
@@ -686,9 +698,9 @@ if not df_filtered.empty:
         st.markdown(f"""
         <div class="metric-card danger">
             <div class="metric-title">Despesas</div>
-            <div class="metric-value metric-danger">{format_currency(total_despesas)}</div>
+            <div class="metric-value metric-danger">{format_currency(total_despesas, currency)}</div>
             <div class="metric-period">
-                <i>📉</i> {len(df_filtered[df_filtered['Tipo'] == 'Despesa'])} transações
+                <i>📉</i> {period_totals.n_despesas} transações
             </div>
         </div>
         """, unsafe_allow_html=True)
@@ -702,66 +714,243 @@ if not df_filtered.empty:
             <div class="metric-title">Variação do Saldo</div>
             <div class="metric-value metric-info">{variation_text}</div>
             <div class="metric-period">
-                <i>🔄</i> Mês anterior: {format_currency(prev_month_saldo)}
+                <i>🔄</i> Mês anterior: {format_currency(prev_month_saldo, currency)}
             </div>
         </div>
         """, unsafe_allow_html=True)
 
 else:
     st.info("Nenhuma transação encontrada para o período selecionado. Carregue dados ou adicione transações para ver as métricas.")
+# Tempo até os primeiros números na tela; a primeira execução do processo inclui as importações
+profile.mark("cold_first_metric_card" if COLD_START else "first_metric_card", budget=FIRST_CARD_BUDGET)
+
+if not df_filtered.empty and account is None and len(accounts) > 1:
+    # Cada conta na sua moeda e o saldo convertido; vem depois dos cards para não atrasá-los
+    with st.expander("Resumo por conta"):
+        st.dataframe(
+            account_totals(ledger, start_date, end_date, rates),
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Saldo_Base": st.column_config.NumberColumn(f"Saldo ({currency_symbol(currency)})", format="%.2f"),
+            }
+        )
 
 # --- Gráficos Principais ---
+profile.section("Análise Detalhada")
 st.header("📈 Análise Detalhada")
 
 if not df_filtered.empty:
-    tab1, tab2, tab3 = st.tabs(["Fluxo Mensal", "Distribuição de Despesas", "Evolução do Saldo"])
+    tab1, tab2, tab3, tab4 = st.tabs(["Fluxo Mensal", "Distribuição de Despesas", "Evolução do Saldo", "Previsão"])
     
     with tab1:
-        fig1 = create_monthly_flow_chart(df_filtered)
+        fig1 = cached_figure(
+            view, 'fluxo', start_date, end_date,
+            lambda: create_monthly_flow_chart(analytics, start_date, end_date, currency)
+        )
         if fig1:
             st.plotly_chart(fig1, use_container_width=True)
+            profile.add(nbytes=estimate_figure_bytes(fig1))
         else:
             st.warning("Não há dados suficientes para exibir o gráfico de fluxo mensal.")
     
     with tab2:
-        fig2 = create_expense_pie_chart(df_filtered)
+        fig2 = cached_figure(
+            view, 'despesas', start_date, end_date,
+            lambda: create_expense_pie_chart(analytics, start_date, end_date, currency)
+        )
         if fig2:
             st.plotly_chart(fig2, use_container_width=True)
+            profile.add(nbytes=estimate_figure_bytes(fig2))
         else:
             st.warning("Nenhuma despesa encontrada no período selecionado para o gráfico de pizza.")
     
     with tab3:
-        fig3 = create_balance_chart(df_filtered)
+        fig3 = cached_figure(
+            view, 'saldo', start_date, end_date,
+            lambda: create_balance_chart(analytics.running_balance(start_date, end_date), currency)
+        )
         if fig3:
             st.plotly_chart(fig3, use_container_width=True)
+            profile.add(nbytes=estimate_figure_bytes(fig3))
         else:
             st.warning("Não há dados suficientes para exibir o gráfico de evolução do saldo.")
 
+    with tab4:
+        # A projeção parte do último lançamento do livro, independente do filtro de período
+        forecast_months = st.select_slider(
+            "Horizonte da previsão (meses)", options=FORECAST_MONTHS, value=6, key="forecast_months"
+        )
+        forecast = view.forecast(forecast_months)
+        fig4 = cached_figure(
+            view, f'previsao_{forecast_months}', None, None,
+            lambda: create_forecast_chart(
+                view.running_balance(forecast.as_of - pd.DateOffset(months=12), forecast.as_of), forecast, currency
+            )
+        )
+        if fig4:
+            st.plotly_chart(fig4, use_container_width=True)
+            profile.add(nbytes=estimate_figure_bytes(fig4))
+            st.caption(
+                f"Saldo projetado em {forecast.daily.index[-1].strftime('%d/%m/%Y')}: "
+                f"{format_currency(forecast.daily['saldo'].iloc[-1], currency)} · recorrentes detectados mais a média "
+                f"mensal dos demais lançamentos"
+            )
+            if forecast.recurring.empty:
+                st.info("Nenhum lançamento recorrente identificado ainda (são necessárias ao menos 3 ocorrências regulares).")
+            else:
+                st.dataframe(
+                    forecast.recurring.drop(columns=['Intervalo', 'Primeira']),
+                    hide_index=True,
+                    use_container_width=True,
+                    column_config={
+                        "Valor": st.column_config.NumberColumn("Valor", format=f"{currency_symbol(currency)} %.2f"),
+                        "Ultima": st.column_config.DateColumn("Última", format="DD/MM/YYYY"),
+                        "Ocorrencias": st.column_config.NumberColumn("Ocorrências"),
+                        "Periodo": st.column_config.TextColumn("Período"),
+                        "Dia": st.column_config.NumberColumn("Dia do mês"),
+                    }
+                )
+        else:
+            st.warning("Não há dados suficientes para projetar o saldo.")
+
+# --- Orçamentos ---
+profile.section("Orçamentos")
+st.header("🎯 Orçamentos")
+budgets = current_budgets()
+budget_month = pd.Timestamp(end_date).to_period('M').start_time
+spending = budget_ledger().spending(budget_month)
+budget_status = budgets.status(spending)
+
+with st.expander("Definir limites mensais", expanded=not len(budgets)):
+    # Categorias com limite primeiro, depois as que já tiveram despesas
+    limits_df = pd.DataFrame({
+        'Categoria': list(budgets.limits) + [c for c in spending.index if c and c not in budgets.limits],
+    })
+    limits_df['Limite'] = limits_df['Categoria'].map(budgets.limits)
+    edited_limits = st.data_editor(
+        limits_df,
+        hide_index=True,
+        num_rows="dynamic",
+        use_container_width=True,
+        column_config={
+            "Limite": st.column_config.NumberColumn(
+                f"Limite mensal ({currency_symbol(BASE_CURRENCY)})", min_value=0.0, format="%.2f"
+            ),
+        },
+        key="budget_editor"
+    )
+    if st.button("💾 Salvar limites", key="save_budgets"):
+        edited_limits = edited_limits.dropna()
+        get_ledger_service().store(user).write_budgets(
+            dict(zip(edited_limits['Categoria'].astype(str).str.strip(), edited_limits['Limite']))
+        )
+        st.rerun()
+
+if len(budgets):
+    st.caption(f"Gasto de {budget_month.strftime('%m/%Y')} (mês do fim do filtro) em todas as contas, em {BASE_CURRENCY}")
+    budget_col, chart_col = st.columns([2, 3])
+    with budget_col:
+        st.dataframe(
+            budget_status,
+            hide_index=True,
+            use_container_width=True,
+            column_config={
+                "Limite": st.column_config.NumberColumn("Limite", format="%.2f"),
+                "Gasto": st.column_config.NumberColumn("Gasto", format="%.2f"),
+                "Restante": st.column_config.NumberColumn("Restante", format="%.2f"),
+                "Percentual": st.column_config.ProgressColumn("Usado", format="%.1f%%", min_value=0, max_value=100),
+            }
+        )
+    with chart_col:
+        fig5 = cached_figure(
+            budget_ledger(), f'orcamento_{hash(tuple(budgets.limits.items()))}', budget_month, budget_month,
+            lambda: create_budget_chart(budget_status)
+        )
+        if fig5:
+            st.plotly_chart(fig5, use_container_width=True)
+            profile.add(nbytes=estimate_figure_bytes(fig5))
+else:
+    st.info("Nenhum orçamento definido. Informe limites mensais por categoria para acompanhar os gastos.")
+
 # --- Tabela de Transações ---
+profile.section("Últimas Transações")
 st.header("🧾 Últimas Transações")
 if not df_filtered.empty:
-    search_query = st.text_input("🔍 Pesquisar transações", key="search_transactions")
+    search_col, rank_col = st.columns([4, 1])
+    with search_col:
+        search_query = st.text_input("🔍 Pesquisar transações", key="search_transactions")
+    with rank_col:
+        st.markdown("<div style='height: 28px;'></div>", unsafe_allow_html=True)
+        ranked_search = st.checkbox("Ordenar por relevância", key="search_ranked")
+    
+    sort_col, order_col, size_col = st.columns([2, 2, 1])
+    with sort_col:
+        sort_column = st.selectbox(
+            "Ordenar por", COLUMNS, key="table_sort",
+            disabled=bool(search_query) and ranked_search
+        )
+    with order_col:
+        sort_order = st.radio("Ordem", ["Decrescente", "Crescente"], horizontal=True, key="table_order")
+    with size_col:
+        page_size = st.selectbox(
+            "Linhas por página", PAGE_SIZES,
+            index=PAGE_SIZES.index(DEFAULT_PAGE_SIZE), key="table_page_size"
+        )
     
-    if search_query:
-        df_display = df_filtered[
-            df_filtered['Descrição'].str.contains(search_query, case=False, na=False) |
-            df_filtered['Categoria'].str.contains(search_query, case=False, na=False)
-        ]
-    else:
-        df_display = df_filtered
+    # Mudou o que está sendo listado: volta para a primeira página
+    table_state = (account, start_date, end_date, search_query, ranked_search, sort_column, sort_order, page_size)
+    if st.session_state.get('table_state') != table_state:
+        st.session_state.table_state = table_state
+        st.session_state.table_cursors = [None]
+    
+    def load_page():
+        # Só a página visível é montada e enviada ao navegador; valores na moeda de cada lançamento
+        return table_page(
+            account_ledger, start_date, end_date,
+            sort=sort_column, descending=sort_order == "Decrescente",
+            cursor=st.session_state.table_cursors[-1], page_size=page_size,
+            query=search_query, ranked=ranked_search
+        )
+    
+    page = load_page()
+    if page.frame.empty and len(st.session_state.table_cursors) > 1:
+        # O livro encolheu (ex.: recarga do GitHub) e o cursor ficou além do fim
+        st.session_state.table_cursors = [None]
+        page = load_page()
+    profile.add(rows=len(page.frame), nbytes=page.frame.memory_usage(index=False).sum())
     
     st.dataframe(
-        df_display.sort_values('Data', ascending=False)[['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria']],
+        page.frame,
         column_config={
             "Data": st.column_config.DateColumn("Data", format="DD/MM/YYYY"),
-            "Valor": st.column_config.NumberColumn("Valor (R$)", format="%.2f"),
+            "Valor": st.column_config.NumberColumn("Valor", format="%.2f"),
             "Tipo": st.column_config.TextColumn("Tipo"),
-            "Categoria": st.column_config.TextColumn("Categoria")
+            "Categoria": st.column_config.TextColumn("Categoria"),
+            "Conta": st.column_config.TextColumn("Conta"),
+            "Moeda": st.column_config.TextColumn("Moeda")
         },
         use_container_width=True,
         hide_index=True,
         height=400
     )
+    
+    prev_col, info_col, next_col = st.columns([1, 3, 1])
+    with prev_col:
+        st.button(
+            "◀ Anterior", key="table_prev", on_click=table_previous_page,
+            disabled=len(st.session_state.table_cursors) <= 1
+        )
+    with info_col:
+        if page.total:
+            st.caption(f"Linhas {page.start + 1}–{page.start + len(page.frame)} de {page.total}")
+        else:
+            st.caption("Nenhuma transação encontrada para a pesquisa")
+    with next_col:
+        st.button(
+            "Próxima ▶", key="table_next", on_click=table_next_page, args=(page.next_cursor,),
+            disabled=page.next_cursor is None
+        )
 else:
     st.info("Nenhuma transação encontrada para o período selecionado")
 
@@ -773,3 +962,24 @@ st.markdown("""
     <p>© 2024 Todos os direitos reservados</p>
 </div>
 """, unsafe_allow_html=True)
+profile.finish()
+
+# --- Painel de Desempenho (?dev=1) ---
+if dev_panel_enabled():
+    metrics_registry = get_metrics_registry()
+    with st.expander("🛠️ Desempenho desta execução"):
+        st.caption(f"Total: {profile.total_seconds * 1000:.1f} ms · {metrics_registry.reruns} execuções no processo")
+        st.dataframe(pd.DataFrame([span.as_dict() for span in profile.spans]), hide_index=True, use_container_width=True)
+        for mark, seconds in profile.marks.items():
+            st.caption(f"{mark}: {seconds * 1000:.1f} ms (orçamento {FIRST_CARD_BUDGET * 1000:.0f} ms)")
+        st.markdown("**Acumulado do processo**")
+        st.dataframe(pd.DataFrame(metrics_registry.summary()), hide_index=True, use_container_width=True)
+        st.dataframe(pd.DataFrame(metrics_registry.marks_summary()), hide_index=True, use_container_width=True)
+        st.download_button(
+            "📄 Exportar métricas (Prometheus)",
+            data=metrics_registry.to_prometheus,
+            file_name="financeorganize.prom",
+            mime="text/plain",
+            on_click="ignore",
+            key="download_metrics"
+        )
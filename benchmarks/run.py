@@ -0,0 +1,279 @@
+"""Benchmarks do pipeline do painel, sem navegador.
+
+Gera livros sintéticos de vários tamanhos e mede cada etapa de uma
+execução do app chamando diretamente as funções de dados e de figuras:
+importação e categorização, carga, conversão de moedas, filtro de
+período, métricas, os três gráficos, busca, a tabela e a checagem de
+orçamentos após uma inserção.
+A etapa cold_import mede, num interpretador novo, a importação do pacote
+e quais dependências pesadas ela puxa. O resultado sai em JSON para
+comparar versões.
+
+    python -m benchmarks.run --rows 10000 100000 1000000 --output bench.json
+"""
+import argparse
+import io
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+import pyarrow
+
+from financeorganize import (
+    Budgets,
+    Ledger,
+    RateTable,
+    RuleSet,
+    SpendingTracker,
+    calculate_metrics,
+    create_balance_chart,
+    create_expense_pie_chart,
+    create_monthly_flow_chart,
+    estimate_figure_bytes,
+    forecast_balance,
+    ingest_csv,
+    learn_mappings,
+    table_page,
+)
+
+from .synthetic import FOREIGN_ACCOUNTS, generate_ledger, generate_rates
+
+DEFAULT_ROWS = [10_000, 100_000, 1_000_000]
+STAGES = [
+    'cold_import', 'ingest_csv', 'categorize', 'load', 'convert', 'switch_account', 'filter', 'metrics',
+    'chart_flow', 'chart_pie', 'chart_balance', 'search_cold', 'search', 'table_page', 'table_sort',
+    'recurring', 'forecast', 'budget_check',
+]
+SEARCH_QUERY = 'mercado'
+FOREIGN_SHARE = 0.1  # fração das despesas em moeda estrangeira no livro das etapas de câmbio
+# Dependências que não deveriam ser carregadas antes do primeiro gráfico ou da primeira busca remota
+HEAVY_MODULES = ['plotly.express', 'requests', 'pyarrow.parquet']
+COLD_IMPORT_SCRIPT = (
+    'import json, sys, time\n'
+    'start = time.perf_counter()\n'
+    'import financeorganize\n'
+    'elapsed = time.perf_counter() - start\n'
+    'print(json.dumps([elapsed, [m for m in sys.argv[1:] if m in sys.modules]]))\n'
+)
+
+
+def _time(fn, repeat):
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return result, samples
+
+
+def _record(results, rows, stage, samples, window=None, **extra):
+    results.append({
+        'rows': rows,
+        'stage': stage,
+        'window': window,
+        'samples_ms': [round(sample, 3) for sample in samples],
+        'min_ms': round(min(samples), 3),
+        'median_ms': round(statistics.median(samples), 3),
+        'mean_ms': round(statistics.fmean(samples), 3),
+        **extra,
+    })
+
+
+def _windows(df):
+    # Último ano (o filtro padrão do painel) e o histórico inteiro
+    end = df['Data'].iloc[-1].date()
+    start = df['Data'].iloc[0].date()
+    return {'ano': (end - timedelta(days=364), end), 'tudo': (start, end)}
+
+
+def bench_size(n_rows, stages, repeat, seed, years):
+    results = []
+    df, samples = _time(lambda: generate_ledger(n_rows, years=years, seed=seed), 1)
+    _record(results, n_rows, 'generate', samples)
+
+    if 'ingest_csv' in stages:
+        csv_bytes = df.to_csv(index=False).encode('utf-8')
+        _, samples = _time(lambda: ingest_csv(io.BytesIO(csv_bytes)), repeat)
+        _record(results, n_rows, 'ingest_csv', samples, bytes_in=len(csv_bytes))
+        del csv_bytes
+
+    if 'categorize' in stages:
+        # Importação sem a coluna Categoria: mapeamentos aprendidos com o próprio livro e regras padrão
+        uncategorized = df.assign(Categoria='')
+        rules, samples = _time(lambda: RuleSet(learned=learn_mappings(df)), 1)
+        _record(results, n_rows, 'learn_mappings', samples, rules_learned=len(rules.learned))
+        (_, categorized), samples = _time(lambda: rules.fill(uncategorized), repeat)
+        _record(results, n_rows, 'categorize', samples, rows_out=categorized)
+        del uncategorized
+
+    ledger, samples = _time(lambda: Ledger(df), repeat if 'load' in stages else 1)
+    if 'load' in stages:
+        _record(results, n_rows, 'load', samples)
+
+    if 'convert' in stages or 'switch_account' in stages:
+        bench_currencies(results, n_rows, stages, repeat, seed, years)
+
+    windows = _windows(ledger.df)
+    for window, (start_date, end_date) in windows.items():
+        prev_month = start_date.replace(day=1) - timedelta(days=1)
+        if 'filter' in stages:
+            view, samples = _time(lambda: ledger.between(start_date, end_date), repeat)
+            _record(results, n_rows, 'filter', samples, window, rows_out=len(view))
+        if 'metrics' in stages:
+            _, samples = _time(lambda: calculate_metrics(ledger, start_date, end_date, prev_month), repeat)
+            _record(results, n_rows, 'metrics', samples, window)
+        charts = {
+            'chart_flow': lambda: create_monthly_flow_chart(ledger, start_date, end_date),
+            'chart_pie': lambda: create_expense_pie_chart(ledger, start_date, end_date),
+            'chart_balance': lambda: create_balance_chart(ledger.running_balance(start_date, end_date)),
+        }
+        for stage, build in charts.items():
+            if stage in stages:
+                fig, samples = _time(build, repeat)
+                _record(results, n_rows, stage, samples, window,
+                        payload_bytes=estimate_figure_bytes(fig) if fig is not None else 0)
+        if 'table_page' in stages:
+            page, samples = _time(lambda: table_page(ledger, start_date, end_date), repeat)
+            _record(results, n_rows, 'table_page', samples, window, rows_out=len(page.frame))
+        if 'table_sort' in stages:
+            # A primeira execução inclui a ordenação pré-calculada da coluna
+            page, samples = _time(lambda: table_page(ledger, start_date, end_date, sort='Valor'), repeat)
+            _record(results, n_rows, 'table_sort', samples, window, rows_out=len(page.frame))
+
+    start_date, end_date = windows['tudo']
+    if 'search_cold' in stages:
+        # Primeira busca de um Ledger novo: inclui a montagem do índice invertido
+        def cold_search():
+            fresh = ledger.appended(ledger.df.iloc[:0], take_indexes=False)
+            return fresh.search(SEARCH_QUERY, start_date, end_date)
+        _, samples = _time(cold_search, min(repeat, 3))
+        _record(results, n_rows, 'search_cold', samples, 'tudo')
+    if 'search' in stages:
+        ledger.search(SEARCH_QUERY, start_date, end_date)
+        positions, samples = _time(lambda: ledger.search(SEARCH_QUERY, start_date, end_date), repeat)
+        _record(results, n_rows, 'search', samples, 'tudo', rows_out=len(positions))
+    if 'recurring' in stages:
+        # Detecção completa sobre o livro inteiro (Ledger novo a cada amostra, sem o índice pronto)
+        def detect():
+            fresh = ledger.appended(ledger.df.iloc[:0], take_indexes=False)
+            return fresh.recurring()
+        table, samples = _time(detect, min(repeat, 3))
+        _record(results, n_rows, 'recurring', samples, 'tudo', rows_out=len(table))
+    if 'forecast' in stages:
+        ledger.recurring()
+        _, samples = _time(lambda: forecast_balance(ledger, 12), repeat)
+        _record(results, n_rows, 'forecast', samples, 'tudo')
+    if 'budget_check' in stages:
+        bench_budgets(results, n_rows, ledger, repeat)
+    return results
+
+
+def bench_budgets(results, n_rows, ledger, repeat):
+    # Um limite por categoria de despesa; cada amostra insere um lançamento e confere todos os limites do mês
+    tracker, samples = _time(lambda: SpendingTracker.from_cube(ledger.monthly), 1)
+    _record(results, n_rows, 'budget_seed', samples, categories=len(tracker.categories))
+    budgets = Budgets({categoria: 1000.0 for categoria in tracker.categories})
+    entry = ledger.df.iloc[-1:].assign(Tipo='Despesa')
+    month = entry['Data'].iloc[0]
+
+    def insert_and_check():
+        before = budgets.levels(tracker.totals(month))
+        tracker.add(entry)
+        return budgets.alerts(tracker.totals(month), month, before)
+    _, samples = _time(insert_and_check, repeat)
+    _record(results, n_rows, 'budget_check', samples, categories=len(tracker.categories))
+
+
+def bench_currencies(results, n_rows, stages, repeat, seed, years):
+    fx_ledger = Ledger(generate_ledger(n_rows, years=years, seed=seed, foreign_share=FOREIGN_SHARE))
+    rates_frame = generate_rates(years=years, seed=seed)
+    if 'convert' in stages:
+        # Cotações recarregadas a cada amostra: a junção as-of roda de novo sobre o livro inteiro
+        view, samples = _time(lambda: fx_ledger.view(None, RateTable(rates_frame)), repeat)
+        _record(results, n_rows, 'convert', samples, rows_out=len(view))
+    if 'switch_account' in stages:
+        rates = RateTable(rates_frame)
+        fx_ledger.view(None, rates)
+        accounts = [None] + [account[0] for account in FOREIGN_ACCOUNTS]
+        # Primeira visão de cada conta (fatia dos valores já convertidos) e depois as trocas, já em cache
+        _, samples = _time(lambda: [fx_ledger.view(account, rates) for account in accounts[1:]], 1)
+        _record(results, n_rows, 'account_views', samples, accounts=len(accounts) - 1)
+        _, samples = _time(lambda: [fx_ledger.view(account, rates) for account in accounts], repeat)
+        _record(results, n_rows, 'switch_account', samples, accounts=len(accounts))
+
+
+def bench_cold_import(repeat):
+    # Interpretador novo a cada amostra: nada em sys.modules nem no cache de bytecode em memória
+    samples, loaded = [], []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', COLD_IMPORT_SCRIPT, *HEAVY_MODULES],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        elapsed, loaded = json.loads(output)
+        samples.append(elapsed * 1000)
+    results = []
+    _record(results, 0, 'cold_import', samples, heavy_modules_loaded=loaded)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', 'HEAD'], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS,
+                        help='tamanhos do livro sintético (ex.: 10000 1000000 10000000)')
+    parser.add_argument('--stages', nargs='+', choices=STAGES, default=STAGES)
+    parser.add_argument('--repeat', type=int, default=5, help='repetições por etapa')
+    parser.add_argument('--years', type=int, default=5, help='anos cobertos pelo livro sintético')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help='arquivo JSON de saída (padrão: stdout)')
+    args = parser.parse_args(argv)
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'packages': {
+                'numpy': np.__version__, 'pandas': pd.__version__,
+                'pyarrow': pyarrow.__version__, 'plotly': plotly.__version__,
+            },
+            'repeat': args.repeat,
+            'years': args.years,
+            'seed': args.seed,
+        },
+        'results': [],
+    }
+    if 'cold_import' in args.stages:
+        report['results'].extend(bench_cold_import(args.repeat))
+    for n_rows in args.rows:
+        print(f'{n_rows} linhas...', file=sys.stderr)
+        report['results'].extend(bench_size(n_rows, args.stages, args.repeat, args.seed, args.years))
+
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+
+
+if __name__ == '__main__':
+    main()
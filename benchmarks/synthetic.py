@@ -0,0 +1,98 @@
+"""Gerador de livros-caixa sintéticos para os benchmarks.
+
+Produz N lançamentos espalhados por vários anos, com a mistura de
+categorias, valores e descrições repetidas típica de um extrato real. Tudo
+é vetorizado (descrições como categorias), então 10 milhões de linhas
+cabem em poucos segundos e em memória proporcional às colunas numéricas.
+"""
+import numpy as np
+import pandas as pd
+
+from financeorganize import BASE_CURRENCY, DEFAULT_ACCOUNT, TIPOS
+
+# (Tipo, Categoria, fração das linhas, valor mediano, dispersão log-normal, descrições)
+CATEGORY_PROFILES = [
+    ('Despesa', 'Alimentação', 0.30, 60, 0.8, ['Supermercado', 'Padaria', 'Restaurante', 'iFood', 'Feira']),
+    ('Despesa', 'Transporte', 0.18, 35, 0.7, ['Uber', '99 Táxi', 'Combustível', 'Estacionamento', 'Metrô']),
+    ('Despesa', 'Moradia', 0.06, 900, 0.5, ['Aluguel', 'Condomínio', 'Conta de Luz', 'Internet', 'Água e Esgoto']),
+    ('Despesa', 'Lazer', 0.12, 80, 0.9, ['Cinema', 'Streaming', 'Bar', 'Show', 'Viagem']),
+    ('Despesa', 'Saúde', 0.06, 150, 0.9, ['Farmácia', 'Consulta Médica', 'Plano de Saúde', 'Academia']),
+    ('Despesa', 'Educação', 0.03, 300, 0.6, ['Mensalidade', 'Livraria', 'Curso Online']),
+    ('Despesa', 'Outros', 0.10, 70, 1.0, ['Transferência', 'Presente', 'Tarifa Bancária', 'Loja de Departamento']),
+    ('Receita', 'Salário', 0.05, 5000, 0.2, ['Salário', 'Adiantamento Salarial']),
+    ('Receita', 'Freelance', 0.07, 800, 0.7, ['Freelance', 'Projeto Cliente', 'Consultoria']),
+    ('Receita', 'Bônus', 0.03, 1500, 0.6, ['Bônus', 'PLR', 'Reembolso']),
+]
+VARIANTS = 40  # filiais/números que multiplicam cada descrição base (ex.: "Uber #12")
+# Cartões em moeda estrangeira: (conta, moeda, cotação inicial em reais)
+FOREIGN_ACCOUNTS = [('Cartão Internacional', 'USD', 5.0), ('Conta Europa', 'EUR', 5.4)]
+
+
+def _vocabulary():
+    descriptions, owners = [], []
+    for profile_id, profile in enumerate(CATEGORY_PROFILES):
+        for base in profile[5]:
+            descriptions.append(base)
+            owners.append(profile_id)
+            for variant in range(1, VARIANTS):
+                descriptions.append(f'{base} #{variant}')
+                owners.append(profile_id)
+    return descriptions, np.array(owners)
+
+
+def generate_ledger(n_rows, years=5, end_date='2024-12-31', seed=0, foreign_share=0.0):
+    # foreign_share: fração das despesas lançada nas contas em moeda estrangeira
+    rng = np.random.default_rng(seed)
+    shares = np.array([profile[2] for profile in CATEGORY_PROFILES])
+    profile_ids = rng.choice(len(CATEGORY_PROFILES), size=n_rows, p=shares / shares.sum())
+
+    end = pd.Timestamp(end_date).normalize()
+    start = end - pd.DateOffset(years=years) + pd.Timedelta(days=1)
+    n_days = (end - start).days + 1
+    days = np.sort(rng.integers(0, n_days, size=n_rows))
+    data = start.to_datetime64().astype('datetime64[D]') + days
+
+    medians = np.array([profile[3] for profile in CATEGORY_PROFILES], dtype='float64')
+    sigmas = np.array([profile[4] for profile in CATEGORY_PROFILES], dtype='float64')
+    valor = np.round(np.exp(np.log(medians[profile_ids]) + sigmas[profile_ids] * rng.standard_normal(n_rows)), 2)
+    valor = np.maximum(valor, 0.01)
+
+    # Cada linha escolhe uma descrição do vocabulário da sua categoria
+    descriptions, owners = _vocabulary()
+    offsets = np.searchsorted(owners, np.arange(len(CATEGORY_PROFILES)))
+    sizes = np.bincount(owners, minlength=len(CATEGORY_PROFILES))
+    codes = offsets[profile_ids] + (rng.random(n_rows) * sizes[profile_ids]).astype('int64')
+
+    tipo_codes = np.array([TIPOS.index(profile[0]) for profile in CATEGORY_PROFILES])
+    categorias = [profile[1] for profile in CATEGORY_PROFILES]
+
+    # Conta 0 é a principal, em reais; despesas sorteadas vão para as estrangeiras, no valor convertido
+    account_codes = np.zeros(n_rows, dtype='int8')
+    if foreign_share:
+        foreign = (tipo_codes[profile_ids] == TIPOS.index('Despesa')) & (rng.random(n_rows) < foreign_share)
+        account_codes[foreign] = rng.integers(1, len(FOREIGN_ACCOUNTS) + 1, size=int(foreign.sum()))
+        initial_rates = np.array([1.0] + [account[2] for account in FOREIGN_ACCOUNTS])
+        valor = np.maximum(np.round(valor / initial_rates[account_codes], 2), 0.01)
+    accounts = [DEFAULT_ACCOUNT] + [account[0] for account in FOREIGN_ACCOUNTS]
+    currencies = [BASE_CURRENCY] + [account[1] for account in FOREIGN_ACCOUNTS]
+    return pd.DataFrame({
+        'Data': data.astype('datetime64[ns]'),
+        'Descrição': pd.Categorical.from_codes(codes, categories=descriptions),
+        'Valor': valor,
+        'Tipo': pd.Categorical.from_codes(tipo_codes[profile_ids], categories=TIPOS),
+        'Categoria': pd.Categorical.from_codes(profile_ids, categories=categorias),
+        'Conta': pd.Categorical.from_codes(account_codes, categories=accounts),
+        'Moeda': pd.Categorical.from_codes(account_codes, categories=currencies),
+    })
+
+
+def generate_rates(years=5, end_date='2024-12-31', seed=0):
+    # Cotações em dias úteis, num passeio aleatório em torno da inicial de cada moeda
+    rng = np.random.default_rng(seed)
+    end = pd.Timestamp(end_date).normalize()
+    days = pd.bdate_range(end - pd.DateOffset(years=years), end)
+    frames = []
+    for _, currency, initial in FOREIGN_ACCOUNTS:
+        walk = initial * np.exp(np.cumsum(rng.normal(0, 0.005, size=len(days))))
+        frames.append(pd.DataFrame({'Data': days, 'Moeda': currency, 'Taxa': np.round(walk, 4)}))
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,39 @@
+from .schema import (
+    BASE_CURRENCY, COLUMNS, CURRENCY_SYMBOLS, DEFAULT_ACCOUNT, TIPOS, CATEGORIAS, complete_columns, currency_symbol,
+    empty_frame, to_cents, from_cents, signed_cents,
+)
+from .storage import LedgerStore
+from .remote import RemoteCSVLoader, read_csv_stream
+from .aggregates import DailyAggregates, WindowTotals
+from .cube import MonthlyCube, month_pieces
+from .categorize import (
+    DEFAULT_RULES, LearnedMappings, Rule, RuleSet, description_key, description_keys, learn_mappings, load_rules,
+    normalize_descriptions,
+)
+from .forecast import FORECAST_MONTHS, Forecast, RecurringIndex, forecast_balance
+from .budgets import BUDGET_COLUMNS, LEVELS, THRESHOLDS, Alert, Budgets, SpendingTracker, expense_months
+from .currency import RATE_COLUMNS, RateTable, load_rates
+from .ledger import Ledger, concat_compact, sort_by_date
+from .downsampling import minmax_downsample, choose_flow_frequency, resample_flow
+from .charts import (
+    account_totals, balance_variation, calculate_metrics, create_balance_chart, create_budget_chart, create_expense_pie_chart,
+    create_forecast_chart, create_monthly_flow_chart, format_currency,
+)
+from .figcache import FigureCache, estimate_figure_bytes
+from .search import SearchIndex, fold
+from .ingest import (
+    DEFAULT_CATEGORY, OPTIONAL_COLUMNS, REQUIRED_COLUMNS, IngestError, IngestReport, ambiguous_valor, clean_chunk,
+    ingest_csv, iter_csv_chunks, parse_valor,
+)
+from .dedup import DedupIndex, fingerprints, near_duplicates_mask, normalize_description
+from .session import SessionLedger, SharedLedger, read_ledger
+from .database import DEFAULT_USER, ConnectionPool, LedgerService, SQLiteLedgerStore
+from .refresh import BackgroundRefresher, Snapshot
+from .profiling import MetricsRegistry, RerunProfile, Span
+from .pagination import DEFAULT_PAGE_SIZE, PAGE_SIZES, Page, table_page
+from .export import EXPORT_FORMATS, export_file, export_file_name, iter_csv_bytes, write_export
+from .analytics import AnalyticsPool, PooledLedger, run_query, share_columns
+from .reports import (
+    REPORT_FORMATS, ReportJob, generate_reports, jobs_from_paths, load_job, month_bounds, monthly_report, report_figures,
+    write_report,
+)
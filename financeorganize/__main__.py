@@ -0,0 +1,54 @@
+"""Relatórios mensais em lote, sem o painel.
+
+Cada livro (CSV, diretório do armazenamento Arrow ou usuário de um banco
+SQLite) vira um relatório do mês em JSON, HTML e PNG, gerados em paralelo.
+
+    python -m financeorganize --month 2024-03 --db data/ledger.db --output relatorios --deadline 3600
+    python -m financeorganize extratos/*.csv --formats json --workers 8
+"""
+import argparse
+import sys
+from datetime import date
+
+import pandas as pd
+
+from .reports import MANIFEST_FILE, REPORT_FORMATS, generate_reports, jobs_from_paths
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m financeorganize', description=__doc__.splitlines()[0])
+    parser.add_argument('paths', nargs='*', help='arquivos CSV, diretórios do armazenamento Arrow ou bancos SQLite')
+    parser.add_argument('--db', action='append', default=[], help='banco SQLite: um relatório por usuário')
+    parser.add_argument('--users', nargs='+', help='só estes usuários dos bancos (padrão: todos)')
+    parser.add_argument('--month', help='mês do relatório, AAAA-MM (padrão: o mês anterior)')
+    parser.add_argument('--output', default='relatorios', help='diretório de saída')
+    parser.add_argument('--formats', nargs='+', choices=REPORT_FORMATS, default=REPORT_FORMATS)
+    parser.add_argument('--rates', help='cotações (CSV com Data, Moeda, Taxa) para consolidar outras moedas')
+    parser.add_argument('--workers', type=int, help='processos em paralelo (padrão: um por núcleo; 0 = sem pool)')
+    parser.add_argument('--deadline', type=float, help='segundos até parar de agendar novos livros')
+    args = parser.parse_args(argv)
+
+    try:
+        jobs = jobs_from_paths(args.paths + args.db, args.users)
+    except ValueError as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error('nenhum livro para processar')
+    month = pd.Timestamp(args.month) if args.month else pd.Timestamp(date.today().replace(day=1)) - pd.DateOffset(months=1)
+
+    def report_progress(result):
+        print(f"{result['status']:8} {result['livro']} ({result.get('segundos', 0):.2f}s)"
+              + (f" {result['erro']}" if 'erro' in result else ''), file=sys.stderr)
+
+    results = generate_reports(
+        jobs, month, args.output, args.formats, args.workers, args.deadline, args.rates, report_progress,
+    )
+    counts = pd.Series([result['status'] for result in results]).value_counts()
+    print(f"{len(results)} livros: " + ', '.join(f'{count} {status}' for status, count in counts.items())
+          + f" · manifesto em {args.output}/{MANIFEST_FILE}", file=sys.stderr)
+    # Livros com erro dão 1; livros que ficaram de fora pelo prazo, 2
+    return 1 if 'erro' in counts else 2 if 'ignorado' in counts else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
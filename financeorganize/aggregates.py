@@ -0,0 +1,138 @@
+"""Agregados diários mantidos incrementalmente para os cards de métricas.
+
+Guarda os totais por (dia, Tipo, Categoria) e, a partir deles, somas
+prefixadas por dia. O total de qualquer janela de datas sai de duas buscas
+binárias, sem varrer os lançamentos.
+
+Um lote a partir do último dia só acrescenta linhas no fim: as do lote e o
+trecho do prefixo que começa nele, em O(lote), num buffer compartilhado com
+a versão anterior. Um dia pode então ter mais de uma linha (uma por lote),
+somadas nas consultas. Só um lote com dias anteriores ao último refaz as
+tabelas, em O(dias), já juntando as linhas repetidas.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .buffers import AppendBuffer, AppendTable
+from .schema import to_cents, from_cents
+
+DAILY_COLUMNS = ['receitas', 'despesas', 'n_receitas', 'n_despesas']
+KEY_COLUMNS = ['Dia', 'Tipo', 'Categoria']
+
+
+class WindowTotals(namedtuple('WindowTotals', DAILY_COLUMNS)):
+    __slots__ = ()
+
+    @property
+    def saldo(self):
+        return self.receitas - self.despesas
+
+
+def _to_day(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+def _daily_table(days, values):
+    return AppendTable({'Dia': np.asarray(days, dtype='datetime64[D]'), 'Valores': np.asarray(values, dtype='int64')})
+
+
+def _key_columns(keys):
+    return {
+        'Dia': keys['Dia'].to_numpy().astype('datetime64[D]'),
+        'Tipo': keys['Tipo'].to_numpy(dtype=object),
+        'Categoria': keys['Categoria'].to_numpy(dtype=object),
+        'Valor': keys['Valor'].to_numpy(dtype='int64'),
+        'Quantidade': keys['Quantidade'].to_numpy(dtype='int64'),
+    }
+
+
+class DailyAggregates:
+    def __init__(self, df=None):
+        # _daily: totais por dia em ordem de dia; _prefix[i] soma as i primeiras linhas
+        self._daily = _daily_table([], np.empty((0, len(DAILY_COLUMNS))))
+        self._prefix = AppendBuffer(np.zeros((1, len(DAILY_COLUMNS)), dtype='int64'))
+        # _keys: totais por (dia, Tipo, Categoria), também em ordem de dia
+        self._keys = AppendTable(_key_columns(pd.DataFrame(columns=KEY_COLUMNS + ['Valor', 'Quantidade'])))
+        if df is not None:
+            self.add(df)
+
+    def add(self, df):
+        # Reatribui as tabelas em vez de alterá-las: uma cópia rasa deste objeto continua válida
+        data = pd.to_datetime(df['Data'], errors='coerce')
+        valid = data.notna().to_numpy()
+        if not valid.any():
+            return
+        batch = pd.DataFrame({
+            'Dia': data[valid].dt.normalize().to_numpy(),
+            'Tipo': df['Tipo'][valid].astype(str).to_numpy(),
+            'Categoria': df['Categoria'][valid].astype(str).to_numpy(),
+            'Valor': to_cents(df['Valor'][valid]),
+        })
+        keys = batch.assign(Quantidade=1).groupby(KEY_COLUMNS, as_index=False).sum()
+        is_receita = batch['Tipo'] == 'Receita'
+        is_despesa = batch['Tipo'] == 'Despesa'
+        daily = pd.DataFrame({
+            'receitas': batch['Valor'].where(is_receita, 0),
+            'despesas': batch['Valor'].where(is_despesa, 0),
+            'n_receitas': is_receita.astype('int64'),
+            'n_despesas': is_despesa.astype('int64'),
+        }).groupby(batch['Dia']).sum()
+        days = daily.index.to_numpy().astype('datetime64[D]')
+        values = daily.to_numpy(dtype='int64')
+
+        size = len(self._daily)
+        if size and days[0] < self._daily['Dia'][-1]:
+            self._rebuild(days, values, keys)
+            return
+        self._daily = self._daily.extended({'Dia': days, 'Valores': values})
+        last = self._prefix.view(size + 1)[-1]
+        self._prefix = self._prefix.extended(size + 1, last + np.cumsum(values, axis=0))
+        self._keys = self._keys.extended(_key_columns(keys))
+
+    def _rebuild(self, days, values, keys):
+        # Lote fora de ordem: junta as linhas antigas e as novas por dia e refaz o prefixo
+        daily = pd.DataFrame(
+            np.vstack([self._daily['Valores'], values]),
+            index=np.concatenate([self._daily['Dia'], days]),
+        ).groupby(level=0).sum()
+        self._daily = _daily_table(daily.index.to_numpy(), daily.to_numpy())
+        self._prefix = AppendBuffer(np.vstack([
+            np.zeros((1, len(DAILY_COLUMNS)), dtype='int64'),
+            np.cumsum(self._daily['Valores'], axis=0),
+        ]))
+        old = pd.DataFrame({name: self._keys[name] for name in KEY_COLUMNS + ['Valor', 'Quantidade']})
+        old['Dia'] = old['Dia'].astype('datetime64[ns]')
+        merged = pd.concat([old, keys], ignore_index=True).groupby(KEY_COLUMNS).sum().reset_index()
+        self._keys = AppendTable(_key_columns(merged))
+
+    def _rows(self, table, start_date, end_date):
+        days = table['Dia']
+        lo = np.searchsorted(days, _to_day(start_date), side='left')
+        hi = np.searchsorted(days, _to_day(end_date), side='right')
+        return lo, max(hi, lo)
+
+    def window(self, start_date, end_date):
+        lo, hi = self._rows(self._daily, start_date, end_date)
+        prefix = self._prefix.view(len(self._daily) + 1)
+        receitas, despesas, n_receitas, n_despesas = prefix[hi] - prefix[lo]
+        return WindowTotals(
+            float(from_cents(receitas)), float(from_cents(despesas)),
+            int(n_receitas), int(n_despesas),
+        )
+
+    def daily(self, start_date, end_date):
+        lo, hi = self._rows(self._daily, start_date, end_date)
+        index = pd.DatetimeIndex(self._daily['Dia'][lo:hi].astype('datetime64[ns]'), name='Dia')
+        daily = pd.DataFrame(self._daily['Valores'][lo:hi, :2], index=index, columns=['receitas', 'despesas'])
+        return daily.groupby(level=0).sum() / 100
+
+    def by_category(self, start_date, end_date, tipo='Despesa'):
+        lo, hi = self._rows(self._keys, start_date, end_date)
+        selected = self._keys['Tipo'][lo:hi] == tipo
+        subset = pd.Series(
+            self._keys['Valor'][lo:hi][selected],
+            index=pd.Index(self._keys['Categoria'][lo:hi][selected], name='Categoria'), name='Valor',
+        )
+        return subset.groupby(level='Categoria').sum() / 100
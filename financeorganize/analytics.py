@@ -0,0 +1,274 @@
+"""Agregações pesadas fora da thread do script, num pool de processos.
+
+As datas e os centavos com sinal do Ledger são copiados uma vez por versão
+para um bloco de memória compartilhada; cada tarefa leva só o nome do
+bloco, e o processo de trabalho guarda as colunas e o saldo acumulado
+delas, sem pickle das linhas nem um Ledger inteiro para remontar. Os
+resultados ficam em cache por (versão, consulta): sessões que pedem a
+mesma coisa ao mesmo tempo esperam o mesmo Future. Só a série do
+saldo, que percorre todas as linhas do período, vai ao pool; as consultas
+respondidas pelos agregados incrementais e os livros pequenos são
+calculados na própria thread, onde o custo de ida e volta não compensa.
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+
+from .charts import calculate_metrics
+from .downsampling import minmax_downsample
+from .ledger import Ledger, _day_bound
+from .schema import from_cents
+
+DEFAULT_MIN_ROWS = 100_000
+SHARED_COLUMNS = ['Data', 'Sinal']  # datas e centavos com sinal, já ordenados pelo Ledger
+
+
+def _metrics(ledger, start_date, end_date, prev_month):
+    # (receitas, despesas, saldo, saldo do mês anterior) e os totais do período com as contagens
+    return calculate_metrics(ledger, start_date, end_date, prev_month), ledger.aggregates.window(start_date, end_date)
+
+
+def _balance(ledger, start_date, end_date):
+    # Já reduzida a mínimo/máximo por faixa: só o que o gráfico vai usar volta do processo
+    balance = ledger.running_balance(start_date, end_date)
+    x, y = minmax_downsample(balance.index.to_numpy(), balance.to_numpy())
+    return pd.Series(y, index=pd.DatetimeIndex(x, name=balance.index.name), name=balance.name)
+
+
+QUERIES = {
+    'metrics': _metrics,
+    'flow': Ledger.flow,
+    'by_category': Ledger.by_category,
+    'balance': _balance,
+}
+# Só o que é O(n) vai ao pool. Métricas, fluxo e categorias leem as somas prefixadas e o cubo, mantidos a cada
+# inserção, e custam milissegundos na thread; no processo o saldo sai de duas colunas, sem remontar o Ledger
+POOLED_QUERIES = {'balance'}
+
+
+def run_query(ledger, query, *args):
+    return QUERIES[query](ledger, *args)
+
+
+def share_columns(ledger):
+    # Copia as colunas para um bloco novo; devolve (bloco, descritor que as tarefas levam)
+    arrays = {
+        'Data': ledger.df['Data'].to_numpy().view('int64'),
+        'Sinal': ledger.signed,
+    }
+    layout, offset = [], 0
+    for col in SHARED_COLUMNS:
+        array = arrays[col]
+        layout.append((col, array.dtype.str, offset))
+        offset += array.nbytes
+    block = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+    for (col, dtype, start), array in zip(layout, arrays.values()):
+        np.ndarray(len(array), dtype=dtype, buffer=block.buf, offset=start)[:] = array
+    descriptor = {'name': block.name, 'version': ledger.version, 'rows': len(ledger), 'layout': layout}
+    return block, descriptor
+
+
+# --- Lado do processo de trabalho ---
+_worker_ledgers = OrderedDict()  # versão -> ColumnLedger montado a partir do bloco
+_WORKER_LEDGERS = 2
+
+
+class ColumnLedger:
+    # No processo: datas e saldo acumulado, o bastante para running_balance sem remontar um Ledger
+    def __init__(self, dates, signed):
+        self._dates = dates
+        self._balance = np.cumsum(signed)
+
+    def running_balance(self, start_date, end_date):
+        lo = np.searchsorted(self._dates, _day_bound(start_date), side='left')
+        hi = max(lo, np.searchsorted(self._dates, _day_bound(end_date) + np.timedelta64(1, 'D'), side='left'))
+        return pd.Series(
+            from_cents(self._balance[lo:hi]), index=pd.DatetimeIndex(self._dates[lo:hi], name='Data'),
+            name='Saldo_Acumulado',
+        )
+
+
+def _attach(name):
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Python < 3.13: o processo usa o mesmo rastreador de recursos do pai, e o registro repetido é inócuo
+        return shared_memory.SharedMemory(name=name)
+
+
+def _worker_ledger(descriptor):
+    version = descriptor['version']
+    ledger = _worker_ledgers.get(version)
+    if ledger is not None:
+        _worker_ledgers.move_to_end(version)
+        return ledger
+    block = _attach(descriptor['name'])
+    try:
+        rows = descriptor['rows']
+        # Cópias: o bloco pode ser fechado (e liberado pelo pai) logo depois
+        columns = {
+            col: np.ndarray(rows, dtype=dtype, buffer=block.buf, offset=start).copy()
+            for col, dtype, start in descriptor['layout']
+        }
+        ledger = ColumnLedger(columns['Data'].view('datetime64[ns]'), columns['Sinal'])
+        del columns
+    finally:
+        block.close()
+    _worker_ledgers[version] = ledger
+    while len(_worker_ledgers) > _WORKER_LEDGERS:
+        _worker_ledgers.popitem(last=False)
+    return ledger
+
+
+def _run_shared(descriptor, query, args):
+    return run_query(_worker_ledger(descriptor), query, *args)
+
+
+class AnalyticsPool:
+    def __init__(self, max_workers=None, min_rows=DEFAULT_MIN_ROWS, cache_size=256, keep_versions=4):
+        # max_workers=0 desliga os processos: tudo roda na thread de quem pede, ainda com cache
+        self.max_workers = min(4, os.cpu_count() or 1) if max_workers is None else max_workers
+        self.min_rows = min_rows
+        self.cache_size = cache_size
+        self.keep_versions = keep_versions
+        self.hits = 0
+        self.misses = 0
+        self._results = OrderedDict()  # (versão, consulta, argumentos) -> Future
+        self._blocks = OrderedDict()  # versão -> [bloco, descritor, tarefas pendentes]
+        self._executor = None
+        # Reentrante: o callback de uma tarefa já concluída roda na hora, ainda com o lock
+        self._lock = threading.RLock()
+        atexit.register(self.close)
+
+    def submit(self, ledger, query, *args):
+        if query not in QUERIES:
+            raise ValueError(f"Consulta desconhecida: {query}")
+        key = (ledger.version, query, args)
+        with self._lock:
+            future = self._results.get(key)
+            if future is not None:
+                self._results.move_to_end(key)
+                self.hits += 1
+                return future
+            self.misses += 1
+            inline = not (self.max_workers and len(ledger) >= self.min_rows and query in POOLED_QUERIES)
+            future = Future() if inline else self._submit_shared(ledger, query, args)
+            self._results[key] = future
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+        if inline:
+            # Quem pedir a mesma consulta enquanto isto roda espera este mesmo Future
+            self._run_inline(future, ledger, query, args)
+        future.add_done_callback(lambda done: self._forget_failure(key, done))
+        return future
+
+    def compute(self, ledger, query, *args, timeout=None):
+        return self.submit(ledger, query, *args).result(timeout)
+
+    def view(self, ledger):
+        return PooledLedger(self, ledger)
+
+    def close(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            blocks = [entry[0] for entry in self._blocks.values()]
+            self._blocks.clear()
+        if executor is not None:
+            executor.shutdown(wait=True, cancel_futures=True)
+        for block in blocks:
+            _release(block)
+
+    def _run_inline(self, future, ledger, query, args):
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(run_query(ledger, query, *args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    def _submit_shared(self, ledger, query, args):
+        # Chamado com o lock: publica a versão (uma vez) e agenda a tarefa no pool
+        entry = self._blocks.get(ledger.version)
+        if entry is None:
+            block, descriptor = share_columns(ledger)
+            entry = self._blocks[ledger.version] = [block, descriptor, 0]
+            self._evict_blocks()
+        else:
+            self._blocks.move_to_end(ledger.version)
+        if self._executor is None:
+            methods = multiprocessing.get_all_start_methods()
+            # Nada de fork: o processo do Streamlit tem várias threads
+            context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+            self._executor = ProcessPoolExecutor(self.max_workers, mp_context=context)
+        entry[2] += 1
+        future = self._executor.submit(_run_shared, entry[1], query, args)
+        future.add_done_callback(lambda _: self._task_done(ledger.version))
+        return future
+
+    def _task_done(self, version):
+        with self._lock:
+            entry = self._blocks.get(version)
+            if entry is not None:
+                entry[2] -= 1
+            self._evict_blocks()
+
+    def _evict_blocks(self):
+        # Versões antigas saem quando não há tarefa pendente lendo o bloco
+        for version in list(self._blocks)[:-self.keep_versions]:
+            if self._blocks[version][2] <= 0:
+                _release(self._blocks.pop(version)[0])
+
+    def _forget_failure(self, key, future):
+        # Erros não ficam em cache: o próximo pedido tenta de novo
+        if future.cancelled() or future.exception() is not None:
+            with self._lock:
+                if self._results.get(key) is future:
+                    del self._results[key]
+
+
+def _release(block):
+    block.close()
+    try:
+        block.unlink()
+    except FileNotFoundError:
+        pass
+
+
+class PooledLedger:
+    # Mesmas leituras que os gráficos fazem no Ledger, respondidas (e guardadas) pelo pool
+    def __init__(self, pool, ledger):
+        self.pool = pool
+        self.ledger = ledger
+
+    @property
+    def version(self):
+        return self.ledger.version
+
+    def __len__(self):
+        return len(self.ledger)
+
+    def prefetch(self, start_date, end_date):
+        # Dispara a série do saldo sem esperar; roda no processo enquanto o script monta os cards.
+        # Em livros pequenos (calculados na hora) não há o que adiantar
+        if not self.pool.max_workers or len(self.ledger) < self.pool.min_rows:
+            return
+        self.pool.submit(self.ledger, 'balance', start_date, end_date)
+
+    def metrics(self, start_date, end_date, prev_month):
+        return self.pool.compute(self.ledger, 'metrics', start_date, end_date, prev_month)
+
+    def flow(self, start_date, end_date, freq):
+        return self.pool.compute(self.ledger, 'flow', start_date, end_date, freq)
+
+    def by_category(self, start_date, end_date, tipo='Despesa'):
+        return self.pool.compute(self.ledger, 'by_category', start_date, end_date, tipo)
+
+    def running_balance(self, start_date, end_date):
+        return self.pool.compute(self.ledger, 'balance', start_date, end_date)
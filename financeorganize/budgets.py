@@ -0,0 +1,151 @@
+"""Orçamentos mensais por categoria.
+
+O gasto de cada mês fica materializado num vetor de centavos com uma
+posição por categoria: a carga inicial sai do cubo mensal e cada inserção
+só soma o seu lote. Conferir todos os limites de um mês compara o gasto
+das categorias com orçamento com os limites, O(categorias), então os
+alertas podem ser calculados a cada gravação sem varrer o livro.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .schema import from_cents, to_cents
+
+THRESHOLDS = [0.8, 1.0]  # frações do limite que mudam o nível do alerta
+LEVELS = ['Dentro do limite', 'Atenção', 'Estourado']
+BUDGET_COLUMNS = ['Categoria', 'Limite', 'Gasto', 'Restante', 'Percentual', 'Situação']
+
+# mes: Timestamp do primeiro dia; limite/gasto em reais; nivel: índice em LEVELS
+Alert = namedtuple('Alert', ['categoria', 'mes', 'limite', 'gasto', 'nivel'])
+
+
+def _month_keys(dates):
+    return pd.to_datetime(dates).to_numpy().astype('datetime64[M]').astype('int64')
+
+
+def _month_start(key):
+    return pd.Timestamp(np.datetime64(int(key), 'M'))
+
+
+def expense_months(df):
+    # Meses (Timestamps do primeiro dia) com despesas num lote
+    despesa = (df['Tipo'] == 'Despesa').to_numpy()
+    return [_month_start(key) for key in np.unique(_month_keys(df['Data'][despesa]))]
+
+
+class SpendingTracker:
+    def __init__(self):
+        self._ids = {}  # categoria -> posição nos vetores
+        self._months = {}  # mês (datetime64[M] como inteiro) -> centavos gastos por categoria
+
+    @classmethod
+    def from_cube(cls, cube):
+        # Parte dos totais mês × Tipo × Categoria, sem reler os lançamentos
+        tracker = cls()
+        totals = cube.totals['Valor']
+        despesas = totals[totals.index.get_level_values('Tipo') == 'Despesa']
+        tracker._add(
+            _month_keys(despesas.index.get_level_values('Mes')),
+            despesas.index.get_level_values('Categoria').to_numpy(),
+            despesas.to_numpy(),
+        )
+        return tracker
+
+    @property
+    def categories(self):
+        return list(self._ids)
+
+    def add(self, df):
+        despesa = (df['Tipo'] == 'Despesa').to_numpy()
+        if despesa.any():
+            df = df[despesa]
+            self._add(_month_keys(df['Data']), df['Categoria'].astype(str).to_numpy(), to_cents(df['Valor']))
+
+    def month(self, month):
+        # Centavos gastos no mês que contém a data, um por categoria (na ordem de categories)
+        spent = self._months.get(int(_month_keys([month])[0]))
+        if spent is None:
+            return np.zeros(len(self._ids), dtype='int64')
+        return np.pad(spent, (0, len(self._ids) - len(spent)))
+
+    def totals(self, month):
+        # Gasto do mês em reais por categoria (todas as já vistas, zero sem despesas no mês); uma cópia
+        return pd.Series(from_cents(self.month(month)), index=pd.Index(self.categories, name='Categoria'), name='Gasto')
+
+    def _category_id(self, categoria):
+        category_id = self._ids.get(categoria)
+        if category_id is None:
+            category_id = self._ids[categoria] = len(self._ids)
+        return category_id
+
+    def _add(self, months, categories, cents):
+        codes, uniques = pd.factorize(categories)
+        ids = np.array([self._category_id(categoria) for categoria in uniques], dtype='int64')[codes]
+        size = len(self._ids)
+        for month in np.unique(months):
+            rows = months == month
+            batch = np.zeros(size, dtype='int64')
+            np.add.at(batch, ids[rows], cents[rows])
+            current = self._months.get(int(month))
+            if current is not None:
+                batch[:len(current)] += current
+            self._months[int(month)] = batch
+
+
+class Budgets:
+    # Tudo é indexado pelo nome da categoria: níveis calculados em versões diferentes do livro
+    # (ou num tracker remontado) se comparam sem depender das posições internas de cada tracker
+    def __init__(self, limits=None, thresholds=THRESHOLDS):
+        # limits: {categoria: limite mensal em reais}
+        self.limits = {categoria: float(limite) for categoria, limite in (limits or {}).items()}
+        self.thresholds = list(thresholds)
+        self._categories = pd.Index(list(self.limits), dtype='object', name='Categoria')
+        self._cents = to_cents(list(self.limits.values())).astype('int64')
+
+    def __len__(self):
+        return len(self.limits)
+
+    def levels(self, spending):
+        # spending: gasto do mês por categoria (Ledger.spending). Nível de cada categoria com limite
+        spent = self._spent(spending)
+        limits = self._cents
+        with np.errstate(divide='ignore', invalid='ignore'):
+            fraction = np.where(limits > 0, spent / np.maximum(limits, 1), np.where(spent > 0, np.inf, 0.0))
+        return pd.Series(np.searchsorted(self.thresholds, fraction, side='right'), index=self._categories, name='Nivel')
+
+    def alerts(self, spending, month, before=None):
+        # Categorias acima de algum limiar; com before (levels de antes da gravação), só as que subiram de nível
+        levels = self.levels(spending)
+        previous = 0 if before is None else before.reindex(levels.index, fill_value=0).to_numpy()
+        raised = np.flatnonzero(levels.to_numpy() > previous)
+        spent = from_cents(self._spent(spending))
+        start = pd.Timestamp(month).to_period('M').start_time
+        return [
+            Alert(self._categories[i], start, self.limits[self._categories[i]], float(spent[i]), int(levels.iloc[i]))
+            for i in raised
+        ]
+
+    def status(self, spending):
+        # Limite, gasto e situação de cada categoria com orçamento no mês
+        if not self.limits:
+            return pd.DataFrame(columns=BUDGET_COLUMNS)
+        levels = self.levels(spending).to_numpy()
+        gasto = from_cents(self._spent(spending))
+        limite = np.array(list(self.limits.values()), dtype='float64')
+        with np.errstate(divide='ignore', invalid='ignore'):
+            percentual = np.where(limite > 0, gasto / limite * 100, np.where(gasto > 0, np.inf, 0.0))
+        status = pd.DataFrame({
+            'Categoria': list(self.limits),
+            'Limite': limite,
+            'Gasto': gasto,
+            'Restante': limite - gasto,
+            'Percentual': np.round(percentual, 1),
+            'Situação': np.array(LEVELS, dtype=object)[levels],
+        })
+        return status.sort_values('Percentual', ascending=False, ignore_index=True)
+
+    def _spent(self, spending):
+        # Centavos gastos nas categorias com limite, na ordem de limits (zero nas sem despesas)
+        return to_cents(spending.reindex(self._categories, fill_value=0.0)).astype('int64')
@@ -0,0 +1,68 @@
+"""Arrays que crescem pelo fim, compartilhados entre versões.
+
+Um buffer tem folga depois das linhas ocupadas e cada versão guarda só
+quantas linhas são suas, então acrescentar um lote escreve apenas o lote.
+Quem acrescenta a partir do fim ocupado escreve no próprio buffer; outra
+versão derivada do mesmo ponto (ex.: a camada de uma sessão ao lado da
+base) não pode sobrescrever essas linhas e copia o seu prefixo para um
+buffer novo. As linhas que uma versão enxerga nunca mudam.
+"""
+import threading
+
+import numpy as np
+
+GROWTH = 0.25  # folga acrescentada a cada cópia, em fração do tamanho
+MIN_SLACK = 1024
+
+
+class AppendBuffer:
+    def __init__(self, values, capacity=0, dtype=None):
+        values = np.asarray(values, dtype=dtype)
+        self._data = np.empty((max(capacity, len(values)),) + values.shape[1:], dtype=values.dtype)
+        self._data[:len(values)] = values
+        self._used = len(values)  # linhas já ocupadas por alguma versão
+        self._lock = threading.Lock()
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def view(self, size):
+        return self._data[:size]
+
+    def extended(self, size, values):
+        # Buffer com as size primeiras linhas seguidas de values: este mesmo, quando size é o fim ocupado e
+        # o lote cabe na folga; senão uma cópia. Um dtype diferente em values (ex.: códigos mais largos) também copia
+        values = np.asarray(values)
+        end = size + len(values)
+        if values.dtype == self.dtype:
+            with self._lock:
+                if size == self._used and end <= len(self._data):
+                    self._data[size:end] = values
+                    self._used = end
+                    return self
+        grown = AppendBuffer(self._data[:size], capacity=end + max(int(end * GROWTH), MIN_SLACK), dtype=values.dtype)
+        grown._data[size:end] = values
+        grown._used = end
+        return grown
+
+
+class AppendTable:
+    # Colunas de mesmo comprimento; extended devolve outra tabela e esta continua igual
+    def __init__(self, columns, size=None):
+        self._buffers = {
+            name: column if isinstance(column, AppendBuffer) else AppendBuffer(column)
+            for name, column in columns.items()
+        }
+        self._size = len(next(iter(columns.values()))) if size is None else size
+
+    def __len__(self):
+        return self._size
+
+    def __getitem__(self, name):
+        return self._buffers[name].view(self._size)
+
+    def extended(self, columns):
+        size = len(next(iter(columns.values())))
+        buffers = {name: buffer.extended(self._size, columns[name]) for name, buffer in self._buffers.items()}
+        return AppendTable(buffers, self._size + size)
@@ -0,0 +1,284 @@
+"""Categorização automática de lançamentos importados.
+
+Primeiro valem os mapeamentos aprendidos com o próprio livro (a categoria
+mais usada para cada descrição normalizada e Tipo); o que sobrar passa
+pelas regras, na ordem: palavras-chave, expressão regular, faixa de valor e
+Tipo, a primeira que casar vence. Todas as palavras-chave (de uma ou mais
+palavras) ficam numa única tabela de n-gramas; os textos distintos são
+normalizados e quebrados em palavras de forma vetorizada e os n-gramas de
+todos eles são procurados nessa tabela de uma vez, sem laço de regras por
+texto. O tratamento de texto roda nas funções de string do Arrow, sobre o
+array inteiro; por linha restam só operações vetorizadas sobre códigos.
+"""
+import json
+import re
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from .schema import TIPOS
+
+# Condições vazias (None/()) não restringem; valores em reais, limites inclusivos
+Rule = namedtuple(
+    'Rule', ['categoria', 'keywords', 'pattern', 'tipo', 'min_valor', 'max_valor'],
+    defaults=((), None, None, None, None),
+)
+
+DEFAULT_RULES = [
+    Rule('Salário', ('salario', 'folha de pagamento', 'adiantamento salarial', 'vencimentos'), tipo='Receita'),
+    Rule('Freelance', ('freelance', 'freela', 'consultoria', 'projeto'), tipo='Receita'),
+    Rule('Bônus', ('bonus', 'plr', 'participacao nos lucros', 'decimo terceiro', 'reembolso'), tipo='Receita'),
+    Rule('Moradia', (
+        'aluguel', 'condominio', 'conta de luz', 'energia', 'agua e esgoto', 'saneamento', 'internet',
+        'gas', 'iptu', 'seguro residencial',
+    ), tipo='Despesa'),
+    Rule('Alimentação', (
+        'supermercado', 'mercado', 'padaria', 'restaurante', 'ifood', 'feira', 'lanchonete', 'acougue',
+        'hortifruti', 'pizzaria',
+    ), tipo='Despesa'),
+    Rule('Transporte', (
+        'uber', '99', 'taxi', 'combustivel', 'posto', 'estacionamento', 'metro', 'onibus', 'pedagio',
+        'bilhete unico',
+    ), tipo='Despesa'),
+    Rule('Saúde', (
+        'farmacia', 'drogaria', 'consulta', 'medico', 'plano de saude', 'academia', 'hospital', 'exame',
+        'dentista', 'laboratorio',
+    ), tipo='Despesa'),
+    Rule('Educação', ('mensalidade', 'escola', 'faculdade', 'curso', 'livraria', 'material escolar'), tipo='Despesa'),
+    Rule('Lazer', (
+        'cinema', 'netflix', 'spotify', 'streaming', 'bar', 'show', 'viagem', 'ingresso', 'hotel', 'teatro',
+    ), tipo='Despesa'),
+]
+
+
+def normalize_descriptions(texts):
+    # normalize_description sobre um array inteiro de textos, pelas funções de string do Arrow
+    array = pc.utf8_normalize(pa.array(texts, type=pa.string()), form='NFKD')
+    array = pc.utf8_lower(pc.replace_substring_regex(array, pattern=r'\p{Mn}+', replacement=''))
+    return pc.utf8_trim_whitespace(pc.replace_substring_regex(array, pattern='[^0-9a-z]+', replacement=' '))
+
+
+def description_keys(texts):
+    # Chave de agrupamento: sem acentos, pontuação e números ("Luz 03/24" = "Luz 04/24")
+    array = pc.replace_substring_regex(normalize_descriptions(texts), pattern='[0-9 ]+', replacement=' ')
+    return pc.utf8_trim_whitespace(array).to_numpy(zero_copy_only=False)
+
+
+def description_key(text):
+    return description_keys([text])[0]
+
+
+def _row_tipos(df):
+    # Código do Tipo por linha (-1 para desconhecido), sem converter a coluna inteira em texto
+    return pd.Categorical(df['Tipo'], categories=TIPOS).codes.astype('int64')
+
+
+def _text_codes(values):
+    # Código do texto distinto por linha; texto ausente vira a descrição vazia (último do array)
+    codes, uniques = pd.factorize(values)
+    return np.where(codes < 0, len(uniques), codes), np.append(np.asarray(uniques, dtype=object), '')
+
+
+def _mapping_counts(df, start=0):
+    # Vezes e última posição (start + linha) de cada (chave da descrição, Tipo, categoria); None sem categorias
+    categorias = df['Categoria'].astype('category')
+    known = (categorias.notna() & (categorias != '')).to_numpy()
+    if not known.any():
+        return None
+    codes, texts = _text_codes(df['Descrição'])
+    key_codes, keys = pd.factorize(description_keys(texts))
+    counts = pd.DataFrame({
+        'chave': key_codes[codes][known],
+        'tipo': _row_tipos(df)[known],
+        'categoria': categorias.cat.codes.to_numpy()[known],
+        'ordem': start + np.arange(len(df))[known],
+    }).groupby(['chave', 'tipo', 'categoria'], sort=False).agg(n=('ordem', 'size'), ultima=('ordem', 'max'))
+    counts = counts.reset_index()
+    keys = np.asarray(keys, dtype=object)[counts['chave'].to_numpy()]
+    valid = (counts['tipo'].to_numpy() >= 0) & (keys != '')
+    return pd.DataFrame({
+        'chave': keys[valid],
+        'tipo': np.array(TIPOS, dtype=object)[counts['tipo'].to_numpy()[valid]],
+        'categoria': np.asarray(categorias.cat.categories, dtype=object)[counts['categoria'].to_numpy()[valid]],
+        'n': counts['n'].to_numpy()[valid],
+        'ultima': counts['ultima'].to_numpy()[valid],
+    })
+
+
+def learn_mappings(df, min_count=1):
+    # {(chave da descrição, Tipo): categoria mais frequente}; empates ficam com a mais recente
+    counts = _mapping_counts(df)
+    if counts is None:
+        return {}
+    counts = counts[counts['n'] >= min_count].sort_values(['n', 'ultima'])
+    best = counts.drop_duplicates(['chave', 'tipo'], keep='last')
+    return dict(zip(zip(best['chave'], best['tipo']), best['categoria']))
+
+
+class LearnedMappings:
+    # learn_mappings mantido por lote, para livros que só crescem pelo fim: cada lote soma as suas contagens
+    # e só as chaves que ele tocou têm a categoria revista
+    def __init__(self, df=None):
+        self._counts = {}  # (chave, Tipo) -> {categoria: (vezes, última posição)}
+        self._best = {}  # (chave, Tipo) -> (categoria, vezes)
+        self._size = 0  # linhas já vistas; as do próximo lote vêm depois delas
+        if df is not None:
+            self.add(df)
+
+    def add(self, df):
+        counts = _mapping_counts(df, start=self._size)
+        self._size += len(df)
+        if counts is None:
+            return
+        touched = set()
+        for chave, tipo, categoria, n, ultima in zip(
+            counts['chave'], counts['tipo'], counts['categoria'], counts['n'], counts['ultima'],
+        ):
+            by_category = self._counts.setdefault((chave, tipo), {})
+            previous = by_category.get(categoria, (0, -1))[0]
+            by_category[categoria] = (previous + int(n), int(ultima))
+            touched.add((chave, tipo))
+        for key in touched:
+            categoria, (n, _) = max(self._counts[key].items(), key=lambda item: item[1])
+            self._best[key] = (categoria, n)
+
+    def mappings(self, min_count=1):
+        # Mesmo resultado de learn_mappings sobre todas as linhas vistas
+        return {key: categoria for key, (categoria, n) in self._best.items() if n >= min_count}
+
+
+def load_rules(path):
+    # JSON: lista de {"categoria", "palavras", "regex", "tipo", "valor_min", "valor_max"} (só categoria é obrigatória).
+    # Uma regra inválida dá ValueError com a posição dela no arquivo
+    with open(path, encoding='utf-8') as f:
+        items = json.load(f)
+    rules = []
+    for position, item in enumerate(items, start=1):
+        if not item.get('categoria'):
+            raise ValueError(f"Regra {position} do arquivo de regras: falta a categoria")
+        tipo = item.get('tipo')
+        if tipo is not None and tipo not in TIPOS:
+            raise ValueError(
+                f"Regra {position} ({item['categoria']}) do arquivo de regras: tipo '{tipo}' inválido "
+                f"(use {' ou '.join(TIPOS)})"
+            )
+        rules.append(Rule(
+            item['categoria'], tuple(item.get('palavras', ())), item.get('regex'), tipo,
+            item.get('valor_min'), item.get('valor_max'),
+        ))
+    return rules
+
+
+class RuleSet:
+    def __init__(self, rules=DEFAULT_RULES, learned=None):
+        # learned: saída de learn_mappings, consultada antes das regras
+        self.rules = list(rules)
+        self.learned = dict(learned or {})
+        rule_keywords = [normalize_descriptions(rule.keywords).to_pylist() for rule in self.rules]
+        keywords = list(dict.fromkeys(kw for words in rule_keywords for kw in words))
+        # Tabela única de todas as palavras-chave
+        self._keywords = pa.array(keywords, type=pa.string())
+        self._keyword_lengths = sorted({len(kw.split()) for kw in keywords})
+        keyword_ids = {kw: i for i, kw in enumerate(keywords)}
+        self._rule_keywords = [np.unique([keyword_ids[kw] for kw in words]).astype('int64') for words in rule_keywords]
+        self._patterns = [re.compile(rule.pattern, re.IGNORECASE) if rule.pattern else None for rule in self.rules]
+
+    def categorize(self, df):
+        # Categoria sugerida por linha ('' quando nada casa) e a origem ('aprendido', 'regra' ou '')
+        n = len(df)
+        result = np.full(n, '', dtype=object)
+        source = np.full(n, '', dtype=object)
+        if n == 0:
+            return result, source
+        codes, texts = _text_codes(df['Descrição'])
+        tipos = _row_tipos(df)
+
+        pending = np.ones(n, dtype=bool)
+        if self.learned:
+            # Consulta por par distinto (texto, Tipo), não por linha
+            stride = len(TIPOS) + 1
+            pairs, inverse = np.unique(codes * stride + tipos + 1, return_inverse=True)
+            keys = description_keys(texts)
+            lookup = []
+            for pair in pairs:
+                text_code, tipo_code = divmod(int(pair), stride)
+                lookup.append(self.learned.get((keys[text_code], TIPOS[tipo_code - 1]), '') if tipo_code else '')
+            found = np.array(lookup, dtype=object)[inverse.ravel()]
+            hit = found != ''
+            result[hit] = found[hit]
+            source[hit] = 'aprendido'
+            pending &= ~hit
+
+        if self.rules and pending.any():
+            text_ok = self._text_matches(texts)
+            valores = df['Valor'].to_numpy(dtype='float64')
+            for index, rule in enumerate(self.rules):
+                mask = pending & text_ok[index][codes]
+                if rule.tipo is not None:
+                    mask &= tipos == TIPOS.index(rule.tipo)
+                if rule.min_valor is not None:
+                    mask &= valores >= rule.min_valor
+                if rule.max_valor is not None:
+                    mask &= valores <= rule.max_valor
+                result[mask] = rule.categoria
+                source[mask] = 'regra'
+                pending &= ~mask
+                if not pending.any():
+                    break
+        return result, source
+
+    def fill(self, df, default='Outros', override=False):
+        # Preenche as categorias vazias (ou sugere para todas, com override); o que nada casar e
+        # continuar vazio fica com default. Devolve (quadro, linhas categorizadas automaticamente)
+        df = df.copy()
+        values = df['Categoria'].astype(object).where(df['Categoria'].notna(), '').astype(str).str.strip()
+        values = values.to_numpy(dtype=object)
+        rows = np.arange(len(df)) if override else np.flatnonzero(values == '')
+        if not len(rows):
+            return df, 0
+        suggested, _ = self.categorize(df.iloc[rows])
+        matched = suggested != ''
+        values[rows[matched]] = suggested[matched]
+        values[values == ''] = default
+        df['Categoria'] = values
+        return df, int(matched.sum())
+
+    def _text_matches(self, texts):
+        # Matriz regra x texto distinto: palavras-chave e regex; regras sem condição de texto valem sempre
+        hit_texts, hit_keywords = self._keyword_hits(texts)
+        text_ok = []
+        for keyword_ids, pattern in zip(self._rule_keywords, self._patterns):
+            if len(keyword_ids):
+                ok = np.zeros(len(texts), dtype=bool)
+                ok[hit_texts[np.isin(hit_keywords, keyword_ids)]] = True
+            else:
+                ok = np.ones(len(texts), dtype=bool)
+            if pattern is not None:
+                ok &= pd.Series(texts, dtype='object').str.contains(pattern, regex=True).to_numpy(dtype=bool)
+            text_ok.append(ok)
+        return text_ok
+
+    def _keyword_hits(self, texts):
+        # Pares (texto, palavra-chave) encontrados: n-gramas de palavras de todos os textos contra a tabela
+        if not len(self._keywords):
+            return np.empty(0, dtype='int64'), np.empty(0, dtype='int64')
+        tokens = pc.utf8_split_whitespace(normalize_descriptions(texts))
+        owners = pc.list_parent_indices(tokens).to_numpy()
+        words = pc.list_flatten(tokens)
+        hit_texts, hit_keywords = [], []
+        for length in self._keyword_lengths:
+            n_grams = len(words) - length + 1
+            if n_grams <= 0:
+                break
+            grams = pc.binary_join_element_wise(
+                *(words.slice(offset, n_grams) for offset in range(length)), ' '
+            ) if length > 1 else words
+            ids = pc.index_in(grams, value_set=self._keywords).fill_null(-1).to_numpy()
+            # Só janelas que não atravessam o fim de um texto
+            found = (ids >= 0) & (owners[:n_grams] == owners[length - 1:])
+            hit_texts.append(owners[:n_grams][found])
+            hit_keywords.append(ids[found].astype('int64'))
+        return np.concatenate(hit_texts), np.concatenate(hit_keywords)
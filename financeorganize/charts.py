@@ -0,0 +1,308 @@
+"""Métricas e figuras do painel, independentes do Streamlit.
+
+Recebem o Ledger e o período e devolvem números ou figuras Plotly, então
+podem ser chamadas tanto pelo app quanto por scripts sem navegador
+(benchmarks, relatórios). O Plotly só é importado quando a primeira figura
+é montada, para não pesar na partida de quem só precisa das métricas.
+"""
+import pandas as pd
+
+from .downsampling import MARKERS_THRESHOLD, WEBGL_THRESHOLD, choose_flow_frequency, minmax_downsample
+from .schema import BASE_CURRENCY, currency_symbol
+
+
+def format_currency(value, currency=BASE_CURRENCY):
+    return f"{currency_symbol(currency)} {value:,.2f}"
+
+
+def calculate_metrics(ledger, start_date, end_date, prev_month):
+    # Somas prefixadas por dia para o período; o mês anterior é uma linha do cubo mensal
+    current_period = ledger.aggregates.window(start_date, end_date)
+    prev_month = ledger.monthly.month(prev_month)
+    return current_period.receitas, current_period.despesas, current_period.saldo, prev_month.saldo
+
+
+def balance_variation(saldo, prev_saldo):
+    # Variação percentual do saldo sobre o do mês anterior (0 sem saldo anterior)
+    return (saldo - prev_saldo) / abs(prev_saldo) * 100 if prev_saldo != 0 else 0
+
+
+def account_totals(ledger, start_date, end_date, rates=None):
+    # Receitas, despesas e saldo do período por conta, na moeda da conta e convertidos para a base
+    rows = []
+    for account in ledger.accounts():
+        view = ledger.view(account, rates)
+        native = view.aggregates.window(start_date, end_date)
+        converted = ledger.view(account, rates, native=False).aggregates.window(start_date, end_date)
+        rows.append({
+            'Conta': account,
+            'Moeda': view.currency,
+            'Receitas': native.receitas,
+            'Despesas': native.despesas,
+            'Saldo': native.saldo,
+            'Saldo_Base': converted.saldo,
+        })
+    return pd.DataFrame(rows, columns=['Conta', 'Moeda', 'Receitas', 'Despesas', 'Saldo', 'Saldo_Base'])
+
+
+def create_monthly_flow_chart(ledger, start_date, end_date, currency=BASE_CURRENCY):
+    # Granularidade que mantém o número de barras limitado; de mensal para cima lê o cubo mensal
+    freq, freq_label = choose_flow_frequency(start_date, end_date)
+    monthly_summary = ledger.flow(start_date, end_date, freq)
+    if monthly_summary.empty:
+        return None
+
+    import plotly.graph_objects as go
+
+    symbol = currency_symbol(currency)
+    fig = go.Figure()
+    
+    fig.add_trace(go.Bar(
+        x=monthly_summary.index,
+        y=monthly_summary['receitas'],
+        name='Receitas',
+        marker_color='#1cc88a',
+        hovertemplate=f'<b>%{{x}}</b><br>Receitas: {symbol} %{{y:,.2f}}<extra></extra>'
+    ))
+    
+    fig.add_trace(go.Bar(
+        x=monthly_summary.index,
+        y=-monthly_summary['despesas'],
+        name='Despesas',
+        marker_color='#e74a3b',
+        hovertemplate=f'<b>%{{x}}</b><br>Despesas: {symbol} %{{y:,.2f}}<extra></extra>'
+    ))
+    
+    fig.update_layout(
+        title=f'Fluxo {freq_label} de Receitas e Despesas',
+        barmode='relative',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        hovermode='x unified',
+        height=450,
+        margin=dict(t=50, b=50, l=50, r=50),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        xaxis=dict(
+            showgrid=False,
+            tickangle=-45
+        ),
+        yaxis=dict(
+            gridcolor='#e3e6f0',
+            tickprefix=f"{symbol} "
+        )
+    )
+    
+    return fig
+
+
+def create_expense_pie_chart(ledger, start_date, end_date, currency=BASE_CURRENCY):
+    expense_by_category = ledger.by_category(start_date, end_date, tipo='Despesa')
+    if expense_by_category.empty:
+        return None
+    
+    expense_by_category = expense_by_category.rename_axis('Categoria').reset_index(name='Valor')
+
+    import plotly.express as px
+    
+    fig = px.pie(
+        expense_by_category,
+        values='Valor',
+        names='Categoria',
+        title='Distribuição das Despesas por Categoria',
+        hole=0.5,
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    
+    fig.update_traces(
+        textposition='inside',
+        textinfo='percent+label',
+        hovertemplate=(
+            f'<b>%{{label}}</b><br>Valor: {currency_symbol(currency)} %{{value:,.2f}}'
+            '<br>Percentual: %{percent}<extra></extra>'
+        ),
+        marker=dict(line=dict(color='#fff', width=1))
+    )
+    fig.update_layout(
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=450,
+        showlegend=False,
+        margin=dict(t=50, b=50, l=50, r=50),
+        uniformtext_minsize=12,
+        uniformtext_mode='hide'
+    )
+    
+    return fig
+
+
+def create_balance_chart(balance, currency=BASE_CURRENCY):
+    # balance: saldo acumulado por lançamento (Ledger.running_balance), já ordenado por data
+    if balance.empty:
+        return None
+
+    import plotly.graph_objects as go
+    
+    # Mínimo/máximo por faixa de tempo e WebGL acima do limite mantêm o payload pequeno
+    x, y = minmax_downsample(balance.index.to_numpy(), balance.to_numpy())
+    scatter = go.Scattergl if len(x) > WEBGL_THRESHOLD else go.Scatter
+    symbol = currency_symbol(currency)
+    
+    fig = go.Figure()
+    
+    fig.add_trace(scatter(
+        x=x,
+        y=y,
+        mode='lines+markers' if len(x) <= MARKERS_THRESHOLD else 'lines',
+        name='Saldo Acumulado',
+        line=dict(color='#4e73df', width=3),
+        marker=dict(size=8, color='#4e73df'),
+        hovertemplate=f'<b>%{{x|%d/%m/%Y}}</b><br>Saldo: {symbol} %{{y:,.2f}}<extra></extra>',
+        fill='tozeroy',
+        fillcolor='rgba(78, 115, 223, 0.1)'
+    ))
+    
+    fig.update_layout(
+        title='Evolução do Saldo Acumulado',
+        xaxis_title='Data',
+        yaxis_title=f'Saldo ({symbol})',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=450,
+        hovermode='x unified',
+        margin=dict(t=50, b=50, l=50, r=50),
+        xaxis=dict(
+            showgrid=False,
+            tickformat='%d/%m'
+        ),
+        yaxis=dict(
+            gridcolor='#e3e6f0',
+            tickprefix=f"{symbol} "
+        )
+    )
+    
+    return fig
+
+
+def create_forecast_chart(history, forecast, currency=BASE_CURRENCY):
+    # history: saldo acumulado recente (Ledger.running_balance); forecast: Ledger.forecast
+    if forecast is None or forecast.daily.empty:
+        return None
+
+    import plotly.graph_objects as go
+
+    symbol = currency_symbol(currency)
+    fig = go.Figure()
+
+    if not history.empty:
+        x, y = minmax_downsample(history.index.to_numpy(), history.to_numpy())
+        fig.add_trace(go.Scatter(
+            x=x,
+            y=y,
+            mode='lines',
+            name='Saldo Realizado',
+            line=dict(color='#4e73df', width=3),
+            hovertemplate=f'<b>%{{x|%d/%m/%Y}}</b><br>Saldo: {symbol} %{{y:,.2f}}<extra></extra>'
+        ))
+
+    projected = forecast.daily['saldo']
+    fig.add_trace(go.Scatter(
+        x=projected.index,
+        y=projected.to_numpy(),
+        mode='lines',
+        name='Saldo Projetado',
+        line=dict(color='#36b9cc', width=3, dash='dash'),
+        hovertemplate=f'<b>%{{x|%d/%m/%Y}}</b><br>Projeção: {symbol} %{{y:,.2f}}<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title='Projeção do Saldo',
+        xaxis_title='Data',
+        yaxis_title=f'Saldo ({symbol})',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=450,
+        hovermode='x unified',
+        margin=dict(t=50, b=50, l=50, r=50),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        xaxis=dict(
+            showgrid=False
+        ),
+        yaxis=dict(
+            gridcolor='#e3e6f0',
+            tickprefix=f"{symbol} "
+        )
+    )
+
+    return fig
+
+
+def create_budget_chart(status, currency=BASE_CURRENCY):
+    # status: Budgets.status do mês; barra do gasto sobre a do limite, na cor da situação
+    if status.empty:
+        return None
+
+    import plotly.graph_objects as go
+
+    from .budgets import LEVELS
+
+    symbol = currency_symbol(currency)
+    colors = dict(zip(LEVELS, ['#1cc88a', '#f6c23e', '#e74a3b']))
+    status = status.iloc[::-1]
+    fig = go.Figure()
+
+    fig.add_trace(go.Bar(
+        x=status['Limite'],
+        y=status['Categoria'],
+        orientation='h',
+        name='Limite',
+        marker_color='#e3e6f0',
+        hovertemplate=f'<b>%{{y}}</b><br>Limite: {symbol} %{{x:,.2f}}<extra></extra>'
+    ))
+
+    fig.add_trace(go.Bar(
+        x=status['Gasto'],
+        y=status['Categoria'],
+        orientation='h',
+        name='Gasto',
+        marker_color=status['Situação'].map(colors).tolist(),
+        width=0.5,
+        customdata=status['Percentual'],
+        hovertemplate=f'<b>%{{y}}</b><br>Gasto: {symbol} %{{x:,.2f}} (%{{customdata:.1f}}%)<extra></extra>'
+    ))
+
+    fig.update_layout(
+        title='Orçamento x Realizado',
+        barmode='overlay',
+        plot_bgcolor='rgba(0,0,0,0)',
+        paper_bgcolor='rgba(0,0,0,0)',
+        height=max(300, 60 * len(status) + 120),
+        margin=dict(t=50, b=50, l=50, r=50),
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1
+        ),
+        xaxis=dict(
+            gridcolor='#e3e6f0',
+            tickprefix=f"{symbol} "
+        ),
+        yaxis=dict(
+            showgrid=False
+        )
+    )
+
+    return fig
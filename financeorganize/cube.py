@@ -0,0 +1,109 @@
+"""Cubo mensal (mês × Tipo × Categoria) mantido incrementalmente.
+
+O fluxo mensal, a distribuição por categoria e a comparação com o mês
+anterior leem este cubo, que tem uma linha por combinação presente em cada
+mês: um painel de vários anos custa O(meses), não O(lançamentos). Os meses
+cortados pelo filtro de datas são completados com os agregados diários.
+
+Cada lote refaz o cubo inteiro, em O(meses × categorias) e não
+O(lançamentos); como os totais são reatribuídos e nunca alterados, uma
+cópia rasa do cubo (a versão anterior do Ledger) continua válida.
+"""
+import pandas as pd
+
+from .aggregates import DAILY_COLUMNS, WindowTotals
+from .schema import to_cents, from_cents
+
+KEY_COLUMNS = ['Mes', 'Tipo', 'Categoria']
+ROLLUP_NAME = 'monthly'  # nome do arquivo gravado ao lado do livro
+
+
+def month_pieces(start_date, end_date):
+    # (primeiro mês inteiro, último mês inteiro, pontas [início, fim] fora deles)
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    first, last = start.to_period('M'), end.to_period('M')
+    edges = []
+    if end < start:
+        return first, first - 1, edges
+    if start != first.start_time:
+        edges.append((start, min(end, first.end_time.normalize())))
+        first += 1
+    if last >= first and end != last.end_time.normalize():
+        edges.append((max(start, last.start_time), end))
+        last -= 1
+    return first, last, edges
+
+
+class MonthlyCube:
+    def __init__(self, df=None):
+        self.totals = pd.DataFrame(
+            {'Valor': pd.Series(dtype='int64'), 'Quantidade': pd.Series(dtype='int64')},
+            index=pd.MultiIndex.from_arrays(
+                [pd.DatetimeIndex([], dtype='datetime64[ns]'), [], []], names=KEY_COLUMNS
+            ),
+        )
+        self._monthly = pd.DataFrame(
+            columns=DAILY_COLUMNS, dtype='int64', index=pd.DatetimeIndex([], dtype='datetime64[ns]', name='Mes')
+        )
+        if df is not None:
+            self.add(df)
+
+    @classmethod
+    def from_frame(cls, frame):
+        # Inverso de to_frame, usado ao ler o cubo gravado junto ao livro
+        cube = cls()
+        frame = frame.astype({'Mes': 'datetime64[ns]', 'Tipo': str, 'Categoria': str})
+        cube._merge(frame.set_index(KEY_COLUMNS)[['Valor', 'Quantidade']].astype('int64'))
+        return cube
+
+    def to_frame(self):
+        return self.totals.reset_index()
+
+    def add(self, df):
+        data = pd.to_datetime(df['Data'], errors='coerce')
+        valid = data.notna().to_numpy()
+        if not valid.any():
+            return
+        batch = pd.DataFrame({
+            'Mes': data[valid].to_numpy().astype('datetime64[M]').astype('datetime64[ns]'),
+            'Tipo': df['Tipo'][valid].astype(str).to_numpy(),
+            'Categoria': df['Categoria'][valid].astype(str).to_numpy(),
+            'Valor': to_cents(df['Valor'][valid]),
+        })
+        self._merge(batch.assign(Quantidade=1).groupby(KEY_COLUMNS).sum())
+
+    def _merge(self, grouped):
+        self.totals = self.totals.add(grouped, fill_value=0).astype('int64').sort_index()
+        # O resumo por mês só recebe as linhas do lote, já reduzidas a mês × Tipo × Categoria
+        tipo = grouped.index.get_level_values('Tipo')
+        is_receita = tipo == 'Receita'
+        is_despesa = tipo == 'Despesa'
+        monthly = pd.DataFrame({
+            'receitas': grouped['Valor'].where(is_receita, 0),
+            'despesas': grouped['Valor'].where(is_despesa, 0),
+            'n_receitas': grouped['Quantidade'].where(is_receita, 0),
+            'n_despesas': grouped['Quantidade'].where(is_despesa, 0),
+        }).groupby(level='Mes').sum()
+        self._monthly = self._monthly.add(monthly, fill_value=0).astype('int64').sort_index()
+
+    def month(self, value):
+        # Totais do mês de calendário que contém a data
+        key = pd.Timestamp(value).to_period('M').start_time
+        if key not in self._monthly.index:
+            return WindowTotals(0.0, 0.0, 0, 0)
+        receitas, despesas, n_receitas, n_despesas = self._monthly.loc[key].tolist()
+        return WindowTotals(
+            float(from_cents(receitas)), float(from_cents(despesas)),
+            int(n_receitas), int(n_despesas),
+        )
+
+    def flow(self, first_month, last_month):
+        # Receitas/despesas em reais por mês, de first_month a last_month (Periods mensais)
+        subset = self._monthly.loc[first_month.start_time:last_month.start_time]
+        return subset[['receitas', 'despesas']] / 100
+
+    def by_category(self, first_month, last_month, tipo='Despesa'):
+        subset = self.totals['Valor'].loc[first_month.start_time:last_month.start_time]
+        subset = subset[subset.index.get_level_values('Tipo') == tipo]
+        return subset.groupby(level='Categoria').sum() / 100
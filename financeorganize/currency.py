@@ -0,0 +1,79 @@
+"""Cotações e conversão de lançamentos para a moeda base.
+
+As cotações vêm de um arquivo local (CSV com Data, Moeda e Taxa, o valor
+de uma unidade da moeda em reais) e ficam ordenadas por moeda e data. A
+conversão é uma junção as-of, como a do merge_asof: para cada moeda, uma
+busca binária das datas dos lançamentos nas datas das cotações dá a
+última cotação até aquele dia, para todas as linhas de uma vez. Datas
+anteriores à primeira cotação usam a primeira.
+"""
+import itertools
+
+import numpy as np
+import pandas as pd
+
+from .ingest import parse_valor
+from .schema import BASE_CURRENCY
+
+RATE_COLUMNS = ['Data', 'Moeda', 'Taxa']
+
+# Como as do Ledger, versões únicas no processo servem de chave de cache
+_versions = itertools.count(1)
+
+
+def load_rates(path, base=BASE_CURRENCY):
+    frame = pd.read_csv(path, dtype=str)
+    missing = [col for col in RATE_COLUMNS if col not in frame.columns]
+    if missing:
+        raise ValueError(f"O arquivo de cotações não contém as colunas: {', '.join(missing)}")
+    return RateTable(frame, base)
+
+
+class RateTable:
+    def __init__(self, df=None, base=BASE_CURRENCY):
+        self.base = base
+        self.version = next(_versions)
+        self._rates = {}  # moeda -> (datas ordenadas, taxas)
+        if df is None or df.empty:
+            return
+        frame = pd.DataFrame({
+            'Data': pd.to_datetime(df['Data'], errors='coerce').astype('datetime64[ns]'),
+            'Moeda': df['Moeda'].astype(str).str.strip().str.upper(),
+            # Cotações não têm separador de milhar: "5.432" é decimal
+            'Taxa': parse_valor(df['Taxa'], grouping=False),
+        }).dropna()
+        frame = frame[frame['Taxa'] > 0].sort_values(['Moeda', 'Data'], kind='stable')
+        for currency, group in frame.groupby('Moeda', sort=False):
+            # Duas cotações no mesmo dia: vale a última do arquivo
+            group = group.drop_duplicates('Data', keep='last')
+            self._rates[currency] = (group['Data'].to_numpy(), group['Taxa'].to_numpy(dtype='float64'))
+
+    def __len__(self):
+        return sum(len(dates) for dates, _ in self._rates.values())
+
+    @property
+    def currencies(self):
+        return sorted(set(self._rates) | {self.base})
+
+    def covers(self, currency):
+        return currency == self.base or currency in self._rates
+
+    def rates(self, dates, currencies):
+        # Taxa de cada linha; NaN nas moedas sem cotação
+        dates = np.asarray(dates, dtype='datetime64[ns]')
+        currencies = pd.Categorical(currencies)
+        codes = currencies.codes
+        result = np.full(len(dates), np.nan)
+        for code, currency in enumerate(currencies.categories):
+            rows = np.flatnonzero(codes == code)
+            if currency == self.base:
+                result[rows] = 1.0
+            elif currency in self._rates and len(rows):
+                quote_dates, values = self._rates[currency]
+                found = np.searchsorted(quote_dates, dates[rows], side='right') - 1
+                result[rows] = values[np.maximum(found, 0)]
+        return result
+
+    def convert(self, values, dates, currencies):
+        # Valores na moeda base, arredondados em centavos
+        return np.round(np.asarray(values, dtype='float64') * self.rates(dates, currencies), 2)
@@ -0,0 +1,307 @@
+"""Serviço de livros-caixa por usuário sobre SQLite em modo WAL.
+
+Cada usuário tem seu próprio livro e contador de versão no mesmo banco.
+Gravações são inserções em lote numa única transação (custo proporcional
+ao lote, não ao livro) e, com WAL, leitores nunca bloqueiam quem grava.
+As conexões ficam num pool por processo, compartilhado por todas as
+sessões do Streamlit; processos diferentes podem usar o mesmo arquivo.
+"""
+import itertools
+import pathlib
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from .ledger import Ledger
+from .schema import BASE_CURRENCY, COLUMNS, DEFAULT_ACCOUNT, complete_columns, empty_frame, to_cents, from_cents
+from .session import SharedLedger
+
+DEFAULT_USER = 'padrao'
+
+_SCHEMA_SQL = """
+CREATE TABLE IF NOT EXISTS ledgers (
+    usuario TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lancamentos (
+    id INTEGER PRIMARY KEY,
+    usuario TEXT NOT NULL,
+    data INTEGER NOT NULL,   -- nanossegundos desde a época
+    descricao TEXT NOT NULL,
+    valor INTEGER NOT NULL,  -- centavos
+    tipo TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    conta TEXT NOT NULL DEFAULT 'Principal',
+    moeda TEXT NOT NULL DEFAULT 'BRL'
+);
+CREATE INDEX IF NOT EXISTS lancamentos_usuario_data ON lancamentos (usuario, data, id);
+CREATE TABLE IF NOT EXISTS orcamentos (
+    usuario TEXT NOT NULL,
+    categoria TEXT NOT NULL,
+    limite INTEGER NOT NULL,  -- centavos por mês
+    PRIMARY KEY (usuario, categoria)
+);
+CREATE TABLE IF NOT EXISTS rollups (
+    usuario TEXT NOT NULL,
+    nome TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (usuario, nome)
+);
+"""
+
+# Colunas que bancos criados por versões anteriores ainda não têm
+_ADDED_COLUMNS = [
+    ('conta', f"TEXT NOT NULL DEFAULT '{DEFAULT_ACCOUNT}'"),
+    ('moeda', f"TEXT NOT NULL DEFAULT '{BASE_CURRENCY}'"),
+]
+
+
+def _migrate(conn):
+    existing = {row[1] for row in conn.execute('PRAGMA table_info(lancamentos)')}
+    for name, definition in _ADDED_COLUMNS:
+        if name not in existing:
+            conn.execute(f'ALTER TABLE lancamentos ADD COLUMN {name} {definition}')
+
+
+class ConnectionPool:
+    def __init__(self, path, size=8, timeout=30.0, read_only=False):
+        # read_only: só lê um banco existente, sem criá-lo nem criar ou migrar o esquema (ex.: relatórios)
+        self.path = path
+        self.timeout = timeout
+        self.read_only = read_only
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+        if read_only:
+            return
+        with self.connection() as conn:
+            conn.executescript(_SCHEMA_SQL)
+        # Na transação de escrita, dois processos abrindo o banco antigo não migram ao mesmo tempo
+        with self.transaction() as conn:
+            _migrate(conn)
+
+    @contextmanager
+    def connection(self):
+        # Limita as conexões abertas; uma conexão ociosa é reaproveitada antes de abrir outra
+        self._slots.acquire()
+        try:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                yield conn
+            finally:
+                self._idle.put(conn)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def transaction(self):
+        # BEGIN IMMEDIATE reserva a escrita já no início: gravações concorrentes esperam, sem deadlock
+        with self.connection() as conn:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.execute('ROLLBACK')
+                raise
+            conn.execute('COMMIT')
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+    def _connect(self):
+        if self.read_only:
+            uri = pathlib.Path(self.path).resolve().as_uri() + '?mode=ro'
+            return sqlite3.connect(uri, uri=True, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn = sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None, check_same_thread=False)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+
+def _records(user, df):
+    df = complete_columns(df)
+    data = pd.to_datetime(df['Data'], errors='coerce')
+    valid = data.notna()
+    return zip(
+        itertools.repeat(user),
+        data[valid].astype('datetime64[ns]').to_numpy().view('int64').tolist(),
+        df['Descrição'][valid].astype(object).fillna('').astype(str).tolist(),
+        to_cents(df['Valor'][valid]).tolist(),
+        df['Tipo'][valid].astype(str).tolist(),
+        df['Categoria'][valid].astype(str).tolist(),
+        df['Conta'][valid].astype(str).tolist(),
+        df['Moeda'][valid].astype(str).tolist(),
+    )
+
+
+class SQLiteLedgerStore:
+    # Mesma interface de LedgerStore, restrita aos lançamentos de um usuário
+
+    def __init__(self, pool, user=DEFAULT_USER):
+        self.pool = pool
+        self.user = user
+
+    @property
+    def version(self):
+        with self.pool.connection() as conn:
+            return self._version(conn)
+
+    def is_empty(self):
+        return self.version == 0
+
+    def read(self):
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                'SELECT data, descricao, valor, tipo, categoria, conta, moeda FROM lancamentos '
+                'WHERE usuario = ? ORDER BY data, id',
+                (self.user,),
+            ).fetchall()
+        if not rows:
+            return empty_frame()
+        data, descricao, valor, tipo, categoria, conta, moeda = zip(*rows)
+        df = pd.DataFrame({
+            'Data': np.array(data, dtype='int64').view('datetime64[ns]'),
+            'Descrição': descricao,
+            'Valor': from_cents(np.array(valor, dtype='int64')),
+            'Tipo': pd.Categorical(tipo),
+            'Categoria': pd.Categorical(categoria),
+            'Conta': pd.Categorical(conta),
+            'Moeda': pd.Categorical(moeda),
+        })
+        return df[COLUMNS]
+
+    def append(self, df):
+        # Devolve a versão resultante; cada gravação avança a versão em exatamente um
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                'INSERT INTO lancamentos (usuario, data, descricao, valor, tipo, categoria, conta, moeda) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                _records(self.user, df),
+            )
+            return self._bump(conn)
+
+    def replace(self, df):
+        with self.pool.transaction() as conn:
+            conn.execute('DELETE FROM lancamentos WHERE usuario = ?', (self.user,))
+            conn.executemany(
+                'INSERT INTO lancamentos (usuario, data, descricao, valor, tipo, categoria, conta, moeda) '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                _records(self.user, df),
+            )
+            return self._bump(conn)
+
+    def compact(self):
+        # Devolve ao banco o espaço do WAL; os dados não mudam
+        with self.pool.connection() as conn:
+            conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def read_budgets(self):
+        # {categoria: limite mensal em reais}
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                'SELECT categoria, limite FROM orcamentos WHERE usuario = ? ORDER BY categoria', (self.user,)
+            ).fetchall()
+        return {categoria: float(from_cents(limite)) for categoria, limite in rows}
+
+    def write_budgets(self, limits):
+        # Substitui todos os limites do usuário; a versão do livro não muda
+        with self.pool.transaction() as conn:
+            conn.execute('DELETE FROM orcamentos WHERE usuario = ?', (self.user,))
+            conn.executemany(
+                'INSERT INTO orcamentos (usuario, categoria, limite) VALUES (?, ?, ?)',
+                [(self.user, categoria, int(to_cents([limite])[0])) for categoria, limite in limits.items()],
+            )
+
+    def write_rollup(self, name, df, version=None):
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        with self.pool.transaction() as conn:
+            if version is None:
+                version = self._version(conn)
+            conn.execute(
+                'INSERT OR REPLACE INTO rollups (usuario, nome, version, payload) VALUES (?, ?, ?, ?)',
+                (self.user, name, version, sink.getvalue().to_pybytes()),
+            )
+
+    def read_rollup(self, name):
+        # None quando não existe ou foi gravado para outra versão do livro
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT r.payload FROM rollups r JOIN ledgers l ON l.usuario = r.usuario '
+                'WHERE r.usuario = ? AND r.nome = ? AND r.version = l.version',
+                (self.user, name),
+            ).fetchone()
+        if row is None:
+            return None
+        return pa.ipc.open_stream(row[0]).read_all().to_pandas()
+
+    def _version(self, conn):
+        row = conn.execute('SELECT version FROM ledgers WHERE usuario = ?', (self.user,)).fetchone()
+        return row[0] if row else 0
+
+    def _bump(self, conn):
+        conn.execute(
+            'INSERT INTO ledgers (usuario, version) VALUES (?, 1) '
+            'ON CONFLICT (usuario) DO UPDATE SET version = version + 1',
+            (self.user,),
+        )
+        return self._version(conn)
+
+
+class LedgerService:
+    def __init__(self, path, pool_size=8, read_only=False):
+        self.pool = ConnectionPool(path, pool_size, read_only=read_only)
+        self._ledgers = {}
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    def store(self, user=DEFAULT_USER):
+        return SQLiteLedgerStore(self.pool, user)
+
+    def has_ledgers(self):
+        # Se o arquivo tem a tabela de livros deste serviço; sqlite3.DatabaseError se nem for um banco SQLite
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'ledgers'").fetchone()
+        return row is not None
+
+    def users(self):
+        # Usuários com lançamentos gravados
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute('SELECT DISTINCT usuario FROM lancamentos ORDER BY usuario')]
+
+    def shared(self, user=DEFAULT_USER, load_initial=empty_frame):
+        # Um SharedLedger por usuário no processo; load_initial só é chamado para livros ainda vazios
+        with self._lock:
+            shared = self._ledgers.get(user)
+            if shared is not None:
+                return shared
+            user_lock = self._locks.setdefault(user, threading.Lock())
+        # A carga de um usuário (que pode ir à rede) não bloqueia os demais
+        with user_lock:
+            shared = self._ledgers.get(user)
+            if shared is None:
+                store = self.store(user)
+                if store.is_empty():
+                    shared = SharedLedger(Ledger(load_initial()), store=store)
+                else:
+                    shared = SharedLedger.load(store)
+                self._ledgers[user] = shared
+        return shared
+
+    def close(self):
+        self.pool.close()
+
@@ -0,0 +1,103 @@
+"""Detecção de lançamentos repetidos em importações sobrepostas.
+
+Cada lançamento recebe uma impressão digital (hash de 64 bits) do dia,
+valor em centavos, Tipo, conta, moeda e Descrição normalizada. O índice conta quantas
+vezes cada impressão já existe no livro; uma importação mantém apenas as
+ocorrências que excedem essa contagem, o que preserva compras legítimas
+repetidas (dois cafés iguais no mesmo dia) e custa O(N) no tamanho da
+importação.
+"""
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+
+import numpy as np
+import pandas as pd
+
+from .schema import to_cents
+from .search import fold
+
+_NON_ALNUM_RE = re.compile(r'[^0-9a-z]+')
+FUZZY_THRESHOLD = 0.85
+
+
+def normalize_description(text):
+    return _NON_ALNUM_RE.sub(' ', fold(text)).strip()
+
+
+def _normalized_descriptions(values):
+    # Normaliza só os textos distintos; extratos repetem muito as mesmas descrições
+    codes, uniques = pd.factorize(values)
+    # Código -1 (texto ausente) cai no último elemento, a descrição vazia
+    normalized = np.array([normalize_description(text) for text in uniques] + [''], dtype=object)
+    return normalized[codes]
+
+
+def _key_frame(df, descriptions=True):
+    key = pd.DataFrame({
+        'Dia': pd.to_datetime(df['Data']).to_numpy().astype('datetime64[D]').astype('int64'),
+        'Valor': to_cents(df['Valor']),
+        'Tipo': df['Tipo'].astype(str).to_numpy(),
+        'Conta': df['Conta'].astype(str).to_numpy(),
+        'Moeda': df['Moeda'].astype(str).to_numpy(),
+    })
+    if descriptions:
+        key['Descrição'] = _normalized_descriptions(df['Descrição'])
+    return key
+
+
+def fingerprints(df):
+    return pd.util.hash_pandas_object(_key_frame(df), index=False).to_numpy()
+
+
+class DedupIndex:
+    def __init__(self, df=None, merge_after=50_000):
+        self.merge_after = merge_after
+        self._counts = pd.Series(dtype='int64', index=pd.Index([], dtype='uint64'))
+        self._pending = Counter()
+        if df is not None:
+            self.add(df)
+
+    def add(self, df):
+        fps = fingerprints(df)
+        if self._counts.empty and not self._pending:
+            self._counts = pd.Series(fps).value_counts()
+            return
+        self._pending.update(fps.tolist())
+        if len(self._pending) > self.merge_after:
+            pending = pd.Series(
+                list(self._pending.values()),
+                index=pd.Index(list(self._pending.keys()), dtype='uint64'),
+                dtype='int64',
+            )
+            self._counts = self._counts.add(pending, fill_value=0).astype('int64')
+            self._pending.clear()
+
+    def new_rows_mask(self, df):
+        fps = fingerprints(df)
+        existing = self._counts.reindex(fps, fill_value=0).to_numpy()
+        if self._pending:
+            existing = existing + np.fromiter((self._pending.get(fp, 0) for fp in fps.tolist()), dtype='int64', count=len(fps))
+        # n-ésima ocorrência dentro da importação só é nova se o livro tiver menos de n cópias
+        occurrence = pd.Series(fps).groupby(fps).cumcount().to_numpy()
+        return occurrence >= existing
+
+
+def near_duplicates_mask(candidates, existing, threshold=FUZZY_THRESHOLD):
+    # Compara descrições apenas entre lançamentos com mesmo dia, valor, Tipo, conta e moeda
+    mask = np.zeros(len(candidates), dtype=bool)
+    if candidates.empty or existing.empty:
+        return mask
+    blocks = defaultdict(list)
+    existing_keys = pd.util.hash_pandas_object(_key_frame(existing, descriptions=False), index=False).to_numpy()
+    for key, text in zip(existing_keys.tolist(), _normalized_descriptions(existing['Descrição'])):
+        blocks[key].append(text)
+
+    candidate_keys = pd.util.hash_pandas_object(_key_frame(candidates, descriptions=False), index=False).to_numpy()
+    for i, (key, text) in enumerate(zip(candidate_keys.tolist(), _normalized_descriptions(candidates['Descrição']))):
+        for other in blocks.get(key, ()):
+            # Textos idênticos já foram decididos pela contagem exata
+            if other != text and SequenceMatcher(None, text, other).ratio() >= threshold:
+                mask[i] = True
+                break
+    return mask
@@ -0,0 +1,68 @@
+"""Redução do volume de pontos enviados aos gráficos.
+
+A série de saldo é reduzida a mínimo/máximo por faixa de tempo (o envelope
+da curva é preservado) e o fluxo de caixa é agregado na granularidade mais
+fina que ainda caiba no limite de barras. Assim o payload do Plotly fica
+limitado independentemente do número de lançamentos.
+"""
+import numpy as np
+import pandas as pd
+
+MAX_LINE_POINTS = 2000
+WEBGL_THRESHOLD = 1000
+MARKERS_THRESHOLD = 200
+MAX_BARS = 120
+
+# (frequência do Period, rótulo usado no título do gráfico)
+FLOW_FREQUENCIES = [
+    ('D', 'Diário'),
+    ('W', 'Semanal'),
+    ('M', 'Mensal'),
+    ('Q', 'Trimestral'),
+    ('Y', 'Anual'),
+]
+
+
+def minmax_downsample(x, y, max_points=MAX_LINE_POINTS):
+    x = np.asarray(x)
+    y = np.asarray(y)
+    n = len(x)
+    if n <= max_points:
+        return x, y
+
+    # Faixas de largura igual no intervalo visível; cada uma contribui com seu mínimo e máximo
+    n_buckets = max(1, (max_points - 2) // 2)
+    t = x.astype('int64').astype('float64')
+    span = t[-1] - t[0]
+    if span > 0:
+        bucket = ((t - t[0]) / span * (n_buckets - 1e-9)).astype('int64')
+    else:
+        bucket = np.arange(n) * n_buckets // n
+
+    order = np.lexsort((y, bucket))
+    sorted_buckets = bucket[order]
+    starts = np.flatnonzero(np.r_[True, sorted_buckets[1:] != sorted_buckets[:-1]])
+    ends = np.r_[starts[1:], n] - 1
+    keep = np.unique(np.r_[0, n - 1, order[starts], order[ends]])
+    return x[keep], y[keep]
+
+
+def choose_flow_frequency(start_date, end_date, max_bars=MAX_BARS):
+    for freq, label in FLOW_FREQUENCIES:
+        n_periods = (pd.Period(end_date, freq) - pd.Period(start_date, freq)).n + 1
+        if n_periods <= max_bars:
+            return freq, label
+    return FLOW_FREQUENCIES[-1]
+
+
+def resample_flow(daily, freq):
+    # daily: receitas/despesas por dia (DailyAggregates.daily)
+    if daily.empty:
+        return daily
+    periods = daily.index.to_period(freq)
+    summary = daily.groupby(periods).sum().sort_index()
+    if freq == 'W':
+        summary.index = summary.index.start_time.strftime('%d/%m/%Y')
+    else:
+        summary.index = summary.index.astype(str)
+    return summary
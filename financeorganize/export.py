@@ -0,0 +1,73 @@
+"""Exportação do livro-caixa sob demanda.
+
+O arquivo só é gerado quando alguém pede o download, em blocos de linhas
+gravados direto no buffer de saída, sem montar o CSV inteiro como string
+nem codificá-lo em base64.
+
+Não é streaming até o navegador: export_file monta o arquivo inteiro num
+BytesIO, e o download_button do Streamlit lê tudo para um único bytes
+antes de servir (um arquivo temporário não ajudaria). O pico de memória é
+o tamanho do arquivo exportado; write_export aceita qualquer destino com
+write, como um arquivo em disco, para quem exporta fora do app.
+"""
+import gzip
+import io
+
+import pyarrow as pa
+
+from .schema import COLUMNS
+
+EXPORT_CHUNK_ROWS = 50_000
+
+# formato -> (rótulo, extensão, MIME)
+EXPORT_FORMATS = {
+    'csv': ('CSV', 'csv', 'text/csv'),
+    'csv.gz': ('CSV compactado (gzip)', 'csv.gz', 'application/gzip'),
+    'parquet': ('Parquet', 'parquet', 'application/vnd.apache.parquet'),
+}
+
+
+def iter_csv_bytes(df, chunk_rows=EXPORT_CHUNK_ROWS):
+    df = df[COLUMNS]
+    if df.empty:
+        yield df.to_csv(index=False).encode('utf-8')
+        return
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        yield chunk.to_csv(index=False, header=start == 0).encode('utf-8')
+
+
+def write_export(df, fmt, sink, chunk_rows=EXPORT_CHUNK_ROWS):
+    if fmt == 'csv':
+        for block in iter_csv_bytes(df, chunk_rows):
+            sink.write(block)
+    elif fmt == 'csv.gz':
+        with gzip.GzipFile(fileobj=sink, mode='wb') as gz:
+            for block in iter_csv_bytes(df, chunk_rows):
+                gz.write(block)
+    elif fmt == 'parquet':
+        import pyarrow.parquet as pq  # só quem exporta Parquet paga pela importação
+
+        df = df[COLUMNS]
+        if df.empty:
+            # Categorias vazias (livro vazio) viram o tipo nulo no Arrow, que não converte de volta
+            df = df.astype({col: str for col, dtype in df.dtypes.items() if dtype == 'category'})
+        schema = pa.Schema.from_pandas(df.iloc[:0], preserve_index=False)
+        with pq.ParquetWriter(sink, schema) as writer:
+            for start in range(0, max(len(df), 1), chunk_rows):
+                chunk = df.iloc[start:start + chunk_rows]
+                writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+    else:
+        raise ValueError(f"Formato de exportação desconhecido: {fmt}")
+
+
+def export_file(df, fmt='csv', chunk_rows=EXPORT_CHUNK_ROWS):
+    # O arquivo inteiro em memória: é o que o download_button aceita e lê de uma vez
+    sink = io.BytesIO()
+    write_export(df, fmt, sink, chunk_rows)
+    sink.seek(0)
+    return sink
+
+
+def export_file_name(fmt, base_name='lancamentos'):
+    return f"{base_name}.{EXPORT_FORMATS[fmt][1]}"
@@ -0,0 +1,84 @@
+"""Cache LRU de figuras Plotly com limite de memória.
+
+As chaves incluem a versão do livro-caixa (única no processo), então uma
+figura só deixa de valer quando o livro muda por upload ou lançamento
+manual; reruns causados por outros widgets reaproveitam a figura pronta.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+_MISSING = object()
+_BASE_FIGURE_BYTES = 4096  # layout, cores, templates etc.
+
+
+def estimate_figure_bytes(fig):
+    if fig is None:
+        return 0
+    total = _BASE_FIGURE_BYTES
+    for trace in fig.data:
+        for attr in ('x', 'y', 'values', 'labels', 'text', 'customdata'):
+            values = getattr(trace, attr, None)
+            if values is None:
+                continue
+            array = np.asarray(values)
+            total += array.nbytes
+            if array.dtype == object:
+                total += sum(len(str(v)) for v in array.ravel())
+    return total
+
+
+class FigureCache:
+    def __init__(self, max_entries=64, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # chave -> (figura, bytes estimados)
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        return self._bytes
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, fig):
+        size = estimate_figure_bytes(fig)
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[1]
+            # Uma figura maior que o limite inteiro não vale a pena guardar
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (fig, size)
+            self._bytes += size
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+
+    def get_or_build(self, key, build):
+        fig = self.get(key, _MISSING)
+        if fig is _MISSING:
+            fig = build()
+            self.put(key, fig)
+        return fig
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,220 @@
+"""Lançamentos recorrentes e projeção do saldo.
+
+Um lançamento é recorrente quando a mesma descrição (sem números, acentos
+e maiúsculas) e o mesmo Tipo aparecem com valores parecidos em intervalos
+regulares: salário, aluguel, contas mensais, assinaturas. A detecção é
+vetorizada: os lançamentos são agrupados, os valores de cada grupo viram
+faixas (um salto de mais de 20% começa outra) e os intervalos entre datas
+de cada faixa são comparados com períodos conhecidos. Ao entrar um
+lançamento, só os grupos tocados são recalculados.
+
+A projeção parte do saldo atual, aplica as ocorrências futuras de cada
+recorrente ativo e espalha por dia a média mensal do que não é recorrente.
+"""
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from .categorize import description_keys
+from .schema import TIPOS, to_cents
+
+# (dias, rótulo, meses do período; 0 = conta em dias)
+PERIODS = [
+    (7.0, 'Semanal', 0),
+    (14.0, 'Quinzenal', 0),
+    (30.436875, 'Mensal', 1),
+    (91.310625, 'Trimestral', 3),
+    (182.62125, 'Semestral', 6),
+    (365.2425, 'Anual', 12),
+]
+DAYS_PER_MONTH = 30.436875
+FORECAST_MONTHS = list(range(3, 13))
+MIN_OCCURRENCES = 3
+AMOUNT_TOLERANCE = 0.2  # variação relativa de valor dentro de uma mesma faixa
+PERIOD_TOLERANCE = 0.2  # desvio relativo aceito entre o intervalo típico e o período
+BASELINE_MONTHS = 6  # meses completos usados na média do que não é recorrente
+
+RECURRING_COLUMNS = [
+    'Descrição', 'Tipo', 'Categoria', 'Periodo', 'Intervalo', 'Dia', 'Valor', 'Ocorrencias', 'Primeira', 'Ultima',
+]
+
+# daily: entradas/saídas recorrentes, variáveis e saldo por dia; monthly: o mesmo por mês;
+# recurring: recorrentes usados; opening: saldo de partida; as_of: último dia com lançamentos
+Forecast = namedtuple('Forecast', ['daily', 'monthly', 'recurring', 'opening', 'as_of'])
+
+
+def _empty_recurring():
+    return pd.DataFrame({column: pd.Series(dtype='object') for column in RECURRING_COLUMNS})
+
+
+def _detect(days, cents, groups, rows, df):
+    # days/cents/groups: arrays das linhas candidatas; rows: posições delas em df
+    if len(days) == 0:
+        return _empty_recurring(), np.empty(0, dtype='int64')
+
+    # Faixas de valor: ordena por (grupo, valor) e corta nos saltos relativos grandes
+    order = np.lexsort((cents, groups))
+    g, c = groups[order], cents[order]
+    new_band = np.ones(len(order), dtype=bool)
+    new_band[1:] = (g[1:] != g[:-1]) | (c[1:] > c[:-1] * (1 + AMOUNT_TOLERANCE) + 1)
+    band = np.empty(len(order), dtype='int64')
+    band[order] = np.cumsum(new_band) - 1
+
+    # Intervalos entre datas consecutivas de cada faixa
+    order = np.lexsort((days, band))
+    b, d = band[order], days[order]
+    first_of_band = np.ones(len(order), dtype=bool)
+    first_of_band[1:] = b[1:] != b[:-1]
+    intervals = pd.Series(np.where(first_of_band, np.nan, np.diff(d, prepend=d[0]).astype('float64')))
+    by_band = intervals.groupby(b)
+    counts = np.bincount(b)
+    median = by_band.median().reindex(np.arange(len(counts))).to_numpy()
+    deviation = (intervals - median[b]).abs().groupby(b).median().reindex(np.arange(len(counts))).to_numpy()
+
+    # Período conhecido mais próximo (em escala logarítmica) e regularidade dos intervalos
+    period_days = np.array([period[0] for period in PERIODS])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        nearest = np.abs(np.log(median[:, None] / period_days[None, :])).argmin(axis=1)
+    period = period_days[nearest]
+    regular = (
+        (counts >= MIN_OCCURRENCES)
+        & (np.abs(median / period - 1) <= PERIOD_TOLERANCE)
+        & (deviation <= np.maximum(3.0, PERIOD_TOLERANCE * period))
+    )
+    kept = np.flatnonzero(regular)
+    if not len(kept):
+        return _empty_recurring(), np.empty(0, dtype='int64')
+
+    # Descrição e categoria do lançamento mais recente de cada faixa
+    last_pos = np.flatnonzero(np.r_[b[1:] != b[:-1], True])
+    first_pos = np.flatnonzero(first_of_band)
+    last_rows = rows[order[last_pos]][kept]
+    dates = pd.to_datetime(days[order].astype('datetime64[D]'))
+    median_cents = pd.Series(cents[order]).groupby(b).median().to_numpy()[kept]
+    median_day = pd.Series(dates.day).groupby(b).median().to_numpy()[kept]
+    table = pd.DataFrame({
+        'Descrição': df['Descrição'].iloc[last_rows].astype(str).to_numpy(),
+        'Tipo': df['Tipo'].iloc[last_rows].astype(str).to_numpy(),
+        'Categoria': df['Categoria'].iloc[last_rows].astype(str).to_numpy(),
+        'Periodo': np.array([label for _, label, _ in PERIODS], dtype=object)[nearest[kept]],
+        'Intervalo': np.round(median[kept], 1),
+        'Dia': np.rint(median_day).astype('int64'),
+        'Valor': np.rint(median_cents).astype('int64') / 100,
+        'Ocorrencias': counts[kept],
+        'Primeira': dates[first_pos][kept],
+        'Ultima': dates[last_pos][kept],
+    })
+    return table, _band_groups(groups, band)[kept]
+
+
+def _band_groups(groups, band):
+    # Grupo de cada faixa (todas as linhas de uma faixa têm o mesmo grupo)
+    result = np.empty(band.max() + 1, dtype='int64')
+    result[band] = groups
+    return result
+
+
+class RecurringIndex:
+    def __init__(self, df=None):
+        self._key_ids = {}  # chave normalizada -> id
+        self._table = _empty_recurring()
+        self._table_groups = np.empty(0, dtype='int64')  # grupo de cada linha de _table
+        if df is not None:
+            self.rebuild(df)
+
+    def rebuild(self, df):
+        days, cents, groups = self._row_arrays(df)
+        self._table, self._table_groups = _detect(days, cents, groups, np.arange(len(df)), df)
+
+    def add(self, df, new_entries):
+        # df já inclui new_entries; só os grupos que receberam lançamentos são refeitos
+        if new_entries.empty:
+            return
+        days, cents, groups = self._row_arrays(df)
+        touched = np.unique(self._groups(new_entries))
+        rows = np.flatnonzero(np.isin(groups, touched))
+        table, table_groups = _detect(days[rows], cents[rows], groups[rows], rows, df)
+        keep = ~np.isin(self._table_groups, touched)
+        self._table = pd.concat([self._table[keep], table], ignore_index=True)
+        self._table_groups = np.concatenate([self._table_groups[keep], table_groups])
+
+    def table(self, as_of=None):
+        # Recorrentes ativos: a próxima ocorrência esperada ainda não passou de meio período
+        table = self._table
+        if as_of is not None and not table.empty:
+            limit = pd.Timestamp(as_of) - pd.to_timedelta(table['Intervalo'].astype('float64') * 1.5, unit='D')
+            table = table[table['Ultima'] >= limit]
+        return table.sort_values(['Tipo', 'Valor'], ascending=[False, False], ignore_index=True)
+
+    def _row_arrays(self, df):
+        days = df['Data'].to_numpy().astype('datetime64[D]').astype('int64')
+        return days, to_cents(df['Valor']), self._groups(df)
+
+    def _groups(self, df):
+        # Grupo = (chave da descrição, Tipo); a chave só é calculada para os textos distintos
+        codes, uniques = pd.factorize(df['Descrição'])
+        # "Conta de Luz 03/2024" e "Conta de Luz 04/2024" caem no mesmo grupo; código -1 (vazio) é o último
+        keys = description_keys(np.append(np.asarray(uniques, dtype=object), ''))
+        key_ids = np.fromiter((self._key_id(key) for key in keys), dtype='int64', count=len(keys))
+        tipos = pd.Categorical(df['Tipo'], categories=TIPOS).codes.astype('int64')
+        return key_ids[codes] * (len(TIPOS) + 1) + tipos + 1
+
+    def _key_id(self, key):
+        key_id = self._key_ids.get(key)
+        if key_id is None:
+            key_id = self._key_ids[key] = len(self._key_ids)
+        return key_id
+
+
+def _occurrences(item, start, end):
+    # Datas futuras de um recorrente entre start e end (inclusive)
+    days, _, months = next(period for period in PERIODS if period[1] == item.Periodo)
+    if months:
+        # Períodos em meses mantêm o dia do mês (limitado ao último dia de meses curtos)
+        first = item.Ultima.to_period('M') + months
+        month_starts = pd.period_range(first, end.to_period('M'), freq=f'{months}M').to_timestamp()
+        offsets = np.minimum(item.Dia, month_starts.days_in_month) - 1
+        dates = month_starts + pd.to_timedelta(offsets, unit='D')
+    else:
+        dates = pd.date_range(item.Ultima + pd.Timedelta(days=days), end, freq=f'{int(days)}D')
+    # Ocorrências atrasadas (esperadas antes de start) entram no primeiro dia da projeção
+    dates = dates[dates <= end]
+    return dates.where(dates >= start, start)
+
+
+def forecast_balance(ledger, months=6, recurring=None):
+    # recurring: tabela de recorrentes (padrão: ledger.recurring())
+    if ledger.empty:
+        return None
+    as_of = pd.Timestamp(ledger.df['Data'].iloc[-1]).normalize()
+    start = as_of + pd.Timedelta(days=1)
+    end = (as_of + pd.DateOffset(months=months)).normalize()
+    index = pd.date_range(start, end, freq='D', name='Data')
+    recurring = ledger.recurring() if recurring is None else recurring
+
+    inflow = np.zeros(len(index))
+    outflow = np.zeros(len(index))
+    for item in recurring.itertuples(index=False):
+        positions = index.get_indexer(_occurrences(item, start, end))
+        target = inflow if item.Tipo == 'Receita' else outflow
+        np.add.at(target, positions[positions >= 0], item.Valor)
+
+    # Média mensal do que não é recorrente, nos últimos meses completos
+    last_full = as_of.to_period('M') - (0 if as_of == as_of.to_period('M').end_time.normalize() else 1)
+    first_full = max(last_full - (BASELINE_MONTHS - 1), pd.Timestamp(ledger.df['Data'].iloc[0]).to_period('M'))
+    n_months = (last_full - first_full).n + 1 if last_full >= first_full else 0
+    variable = 0.0
+    if n_months > 0:
+        flow = ledger.monthly.flow(first_full, last_full)
+        net = (flow['receitas'].sum() - flow['despesas'].sum()) / n_months
+        sign = np.where(recurring['Tipo'] == 'Receita', 1.0, -1.0)
+        recurring_net = float((sign * recurring['Valor'] * DAYS_PER_MONTH / recurring['Intervalo']).sum())
+        variable = (net - recurring_net) / DAYS_PER_MONTH
+
+    opening = ledger.opening_balance(start)
+    daily = pd.DataFrame({'entradas': inflow, 'saidas': outflow, 'variaveis': variable}, index=index)
+    daily['saldo'] = opening + (daily['entradas'] - daily['saidas'] + daily['variaveis']).cumsum()
+    monthly = daily.resample('MS').agg({'entradas': 'sum', 'saidas': 'sum', 'variaveis': 'sum', 'saldo': 'last'})
+    monthly.index.name = 'Mes'
+    return Forecast(daily, monthly, recurring, opening, as_of)
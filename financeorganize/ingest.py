@@ -0,0 +1,152 @@
+"""Importação de extratos CSV em blocos, com tipos explícitos e validação.
+
+Cada bloco é lido com dtypes fixos, validado e limpo antes do próximo, o
+que mantém a memória proporcional ao tamanho do bloco durante o parse e
+permite mostrar o progresso da leitura.
+"""
+from collections import Counter
+
+import pandas as pd
+
+from .schema import BASE_CURRENCY, COLUMNS, DEFAULT_ACCOUNT, TIPOS, empty_frame
+
+# Categoria é opcional: quando falta (ou vem vazia) a linha é categorizada na importação.
+# Sem Conta/Moeda, valem as da importação (por padrão a conta principal, em reais)
+OPTIONAL_COLUMNS = ['Categoria', 'Conta', 'Moeda']
+REQUIRED_COLUMNS = [col for col in COLUMNS if col not in OPTIONAL_COLUMNS]
+DEFAULT_CATEGORY = 'Outros'
+
+# Valor chega como texto para aceitar tanto "1234.56" quanto "1.234,56"
+CSV_DTYPES = {col: 'str' for col in COLUMNS}
+DEFAULT_CHUNKSIZE = 100_000
+
+# Milhar com ponto e decimal com vírgula ("1.234,56") ou o contrário ("1,234.56")
+_BR_GROUPED = r'[+-]?[1-9]\d{0,2}(?:\.\d{3})+(?:,\d+)?'
+_US_GROUPED = r'[+-]?[1-9]\d{0,2}(?:,\d{3})+(?:\.\d+)?'
+# Um único separador seguido de três dígitos: "1.000" tanto pode ser mil quanto um
+_AMBIGUOUS = r'[+-]?[1-9]\d{0,2}[.,]\d{3}'
+
+
+class IngestError(ValueError):
+    def __init__(self, missing_columns):
+        self.missing_columns = missing_columns
+        super().__init__(
+            f"O arquivo não contém todas as colunas necessárias. Faltando: {', '.join(missing_columns)}"
+        )
+
+
+class IngestReport:
+    def __init__(self):
+        self.rows_read = 0
+        self.rows_valid = 0
+        self.rejected = Counter()
+        self.auto_categorized = 0
+
+    @property
+    def rows_rejected(self):
+        return self.rows_read - self.rows_valid
+
+
+def parse_valor(values, grouping=True):
+    # O último separador é o decimal; o outro só vale como separador de milhar em grupos de três.
+    # Valores ambíguos viram NaN (ver ambiguous_valor); sem grouping, um separador sozinho é sempre decimal
+    text = values.astype(str).str.strip()
+    ambiguous = ambiguous_valor(text)
+    br = text.str.fullmatch(_BR_GROUPED, na=False)
+    us = text.str.fullmatch(_US_GROUPED, na=False)
+    if not grouping:
+        br &= ~ambiguous
+        us &= ~ambiguous
+    normalized = text.str.replace(',', '.', regex=False)
+    normalized = normalized.where(~br, text.str.replace('.', '', regex=False).str.replace(',', '.', regex=False))
+    normalized = normalized.where(~us, text.str.replace(',', '', regex=False))
+    numbers = pd.to_numeric(normalized, errors='coerce')
+    return numbers.mask(ambiguous) if grouping else numbers
+
+
+def ambiguous_valor(values):
+    return values.astype(str).str.strip().str.fullmatch(_AMBIGUOUS, na=False)
+
+
+def _text_or_default(values, default):
+    values = values.fillna('').str.strip()
+    return values.where(values != '', default)
+
+
+def clean_chunk(chunk, report=None, rules=None, recategorize=False, account=DEFAULT_ACCOUNT,
+                currency=BASE_CURRENCY):
+    # rules: RuleSet aplicado às categorias vazias (a todas, com recategorize); sem ele, vazias viram 'Outros'.
+    # account/currency: Conta e Moeda das linhas que não trazem as suas
+    missing = [col for col in REQUIRED_COLUMNS if col not in chunk.columns]
+    if missing:
+        raise IngestError(missing)
+
+    absent = {col: pd.Series(index=chunk.index, dtype='str') for col in OPTIONAL_COLUMNS if col not in chunk.columns}
+    chunk = chunk.assign(**absent)[COLUMNS]
+    data = pd.to_datetime(chunk['Data'], errors='coerce')
+    valor = parse_valor(chunk['Valor'])
+    tipo = chunk['Tipo'].str.strip().str.capitalize()
+
+    bad_data = data.isna()
+    # "1.000" pode ser mil ou um: a linha é recusada e contada à parte, em vez de adivinhada
+    ambiguous = ambiguous_valor(chunk['Valor']) & ~bad_data
+    bad_valor = valor.isna() & ~bad_data & ~ambiguous
+    bad_tipo = ~tipo.isin(TIPOS) & ~bad_data & ~bad_valor & ~ambiguous
+    valid = ~(bad_data | bad_valor | ambiguous | bad_tipo)
+
+    if report is not None:
+        report.rows_read += len(chunk)
+        report.rows_valid += int(valid.sum())
+        report.rejected['Data inválida'] += int(bad_data.sum())
+        report.rejected['Valor inválido'] += int(bad_valor.sum())
+        report.rejected['Valor ambíguo'] += int(ambiguous.sum())
+        report.rejected['Tipo desconhecido'] += int(bad_tipo.sum())
+
+    frame = pd.DataFrame({
+        'Data': data[valid],
+        'Descrição': chunk['Descrição'][valid].fillna(''),
+        'Valor': valor[valid].astype('float64'),
+        'Tipo': tipo[valid],
+        'Categoria': chunk['Categoria'][valid].fillna('').str.strip(),
+        'Conta': _text_or_default(chunk['Conta'][valid], account),
+        'Moeda': _text_or_default(chunk['Moeda'][valid].str.upper(), currency),
+    })
+    if rules is None:
+        frame['Categoria'] = frame['Categoria'].where(frame['Categoria'] != '', DEFAULT_CATEGORY)
+        return frame
+    frame, categorized = rules.fill(frame, DEFAULT_CATEGORY, override=recategorize)
+    if report is not None:
+        report.auto_categorized += categorized
+    return frame
+
+
+def iter_csv_chunks(source, chunksize=DEFAULT_CHUNKSIZE, report=None, rules=None, recategorize=False,
+                    account=DEFAULT_ACCOUNT, currency=BASE_CURRENCY):
+    reader = pd.read_csv(
+        source, dtype=CSV_DTYPES, chunksize=chunksize,
+        usecols=lambda col: col in COLUMNS,
+    )
+    with reader:
+        for chunk in reader:
+            yield clean_chunk(chunk, report, rules, recategorize, account, currency)
+
+
+def ingest_csv(source, chunksize=DEFAULT_CHUNKSIZE, progress=None, total_bytes=None, rules=None,
+               recategorize=False, account=DEFAULT_ACCOUNT, currency=BASE_CURRENCY):
+    # progress(fração, linhas lidas) é chamado após cada bloco quando o tamanho é conhecido
+    report = IngestReport()
+    frames = []
+    for frame in iter_csv_chunks(source, chunksize, report, rules, recategorize, account, currency):
+        frames.append(frame)
+        if progress is not None:
+            fraction = None
+            if total_bytes and hasattr(source, 'tell'):
+                fraction = min(source.tell() / total_bytes, 1.0)
+            progress(fraction, report.rows_read)
+
+    if not frames:
+        return empty_frame(), report
+    df = pd.concat(frames, ignore_index=True)
+    for col in ['Tipo', 'Categoria', 'Conta', 'Moeda']:
+        df[col] = df[col].astype('category')
+    return df, report
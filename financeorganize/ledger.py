@@ -0,0 +1,436 @@
+"""Livro-caixa em memória, mantido ordenado pela coluna de datas.
+
+Com as datas ordenadas em um array datetime64, o filtro de período vira
+duas buscas binárias e um fatiamento posicional, que devolve uma view do
+quadro em vez de máscaras booleanas e cópias.
+
+As colunas de texto ficam como categorias (extratos repetem muito as mesmas
+descrições) e o Ledger não é alterado depois de publicado: `appended`
+devolve um novo Ledger, então várias sessões podem ler o mesmo objeto. As
+colunas ficam em buffers que crescem pelo fim (ver buffers.py), então o
+Ledger novo compartilha as linhas do anterior e um lote em ordem de data
+custa O(lote), não uma cópia do livro.
+
+Cada conta e a visão consolidada são Ledgers derivados, numa moeda só: a
+dos próprios lançamentos quando há uma, senão a base das cotações. A
+conversão do livro inteiro é feita uma vez por versão e reaproveitada
+por todas as contas, e as visões já montadas recebem só a sua parte de
+cada lote novo.
+"""
+import copy
+import itertools
+import threading
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import CategoricalDtype, union_categoricals
+
+from .aggregates import DailyAggregates
+from .budgets import SpendingTracker
+from .buffers import AppendBuffer, AppendTable
+from .categorize import LearnedMappings
+from .currency import RateTable
+from .cube import MonthlyCube, month_pieces
+from .dedup import DedupIndex, near_duplicates_mask
+from .downsampling import resample_flow
+from .forecast import RecurringIndex, forecast_balance
+from .schema import BASE_CURRENCY, COLUMNS, complete_columns, from_cents, signed_cents
+from .search import SearchIndex, fold
+
+# Versões são únicas no processo, então servem de chave de cache entre sessões
+_versions = itertools.count(1)
+
+CATEGORICAL_COLUMNS = ['Descrição', 'Tipo', 'Categoria', 'Conta', 'Moeda']
+# Sem arquivo de cotações só a moeda base é conhecida
+NO_RATES = RateTable()
+
+
+def sort_by_date(df):
+    df = df.copy()
+    df['Data'] = pd.to_datetime(df['Data'], errors='coerce').astype('datetime64[ns]')
+    df = df.dropna(subset=['Data'])
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, CategoricalDtype):
+            df[col] = df[col].fillna('').astype(str).astype('category')
+    return df.sort_values('Data', kind='stable', ignore_index=True)
+
+
+def concat_compact(frames):
+    # pd.concat converteria categorias diferentes em object; une-as coluna a coluna
+    data = {}
+    for col in COLUMNS:
+        if col in CATEGORICAL_COLUMNS:
+            data[col] = union_categoricals([frame[col] for frame in frames], ignore_order=True)
+        else:
+            data[col] = np.concatenate([frame[col].to_numpy() for frame in frames])
+    return pd.DataFrame(data)
+
+
+def _view_part(df, account, rates=None):
+    # Linhas de um lote que entram numa visão: as da conta e, em visões convertidas, na moeda base
+    if account is not None:
+        df = df[(df['Conta'] == account).to_numpy()]
+    if rates is None or df.empty:
+        return df
+    valor = rates.convert(df['Valor'], df['Data'].to_numpy(), df['Moeda'])
+    return df.assign(Valor=valor, Moeda=rates.base)[~np.isnan(valor)]
+
+
+def _codes_dtype(n_categories):
+    # Mesma largura que o pandas dá aos códigos; com outra, from_codes copiaria a coluna
+    for dtype in ('int8', 'int16', 'int32'):
+        if n_categories < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype('int64')
+
+
+def _day_bound(value):
+    return np.datetime64(pd.Timestamp(value).date(), 'D').astype('datetime64[ns]')
+
+
+class Ledger:
+    def __init__(self, df, monthly=None):
+        # monthly: cubo mensal já calculado para df (ex.: lido do armazenamento)
+        df = sort_by_date(complete_columns(df)[COLUMNS])
+        self._load(df)
+        self.aggregates = DailyAggregates(df)
+        self.monthly = MonthlyCube(df) if monthly is None else monthly
+        self.version = next(_versions)
+        self._search = None
+        self._dedup = None
+        self._recurring = None
+        self._spending = None
+        self._learned = None
+        self._orderings = {}
+        self._forecasts = {}
+        self._labels = {}
+        self._converted = None  # (versão das cotações, valores na moeda base alinhados a df)
+        self._views = {}  # (conta, versão das cotações ou None) -> (cotações, Ledger derivado)
+        # Compartilhado pelas versões derivadas com appended: os índices incrementais passam de uma versão
+        # para a seguinte e só são montados, entregues ou alterados com ele
+        self._lock = threading.RLock()
+
+    def _load(self, df):
+        # As colunas ficam em buffers compartilhados com as versões seguintes (ver buffers.py); df é uma
+        # view deles. Nas colunas de texto as categorias só crescem, então os códigos antigos continuam valendo
+        self._dtypes = {col: df[col].dtype for col in CATEGORICAL_COLUMNS}
+        self._columns = AppendTable({
+            'Data': df['Data'].to_numpy(),
+            'Valor': df['Valor'].to_numpy(dtype='float64'),
+            # Centavos com sinal, alinhados às linhas de df
+            'Sinal': signed_cents(df),
+            **{col: df[col].cat.codes.to_numpy() for col in CATEGORICAL_COLUMNS},
+        })
+        self._balance = None  # saldo acumulado sobre Sinal, num buffer que também só cresce
+        self._set_frame()
+
+    def _set_frame(self):
+        data = {}
+        for col in COLUMNS:
+            if col in CATEGORICAL_COLUMNS:
+                data[col] = pd.Categorical.from_codes(self._columns[col], dtype=self._dtypes[col], validate=False)
+            else:
+                data[col] = self._columns[col]
+        self.df = pd.DataFrame(data, copy=False)
+        self._dates = self._columns['Data']
+        self.signed = self._columns['Sinal']
+
+    def __len__(self):
+        return len(self.df)
+
+    @property
+    def empty(self):
+        return self.df.empty
+
+    def appended(self, new_entries, take_indexes=True):
+        # Por padrão os índices incrementais migram para o novo Ledger, que substitui este;
+        # take_indexes=False deixa-os aqui (ex.: camada temporária de uma sessão)
+        # Com o lock, quem lê este Ledger termina de usar um índice antes da entrega, ou depois dela o encontra
+        # vazio e monta o seu; os índices entregues só são alterados aqui, ainda com o lock. A busca é a exceção:
+        # consulta o índice sem o lock, e SearchIndex.add não altera o que uma consulta em andamento lê
+        with self._lock:
+            ledger = copy.copy(self)
+            # add reatribui as tabelas dos agregados e do cubo (ver aggregates.py e cube.py); a cópia rasa basta
+            ledger.aggregates = copy.copy(self.aggregates)
+            ledger.monthly = copy.copy(self.monthly)
+            if take_indexes:
+                self._search = None
+                self._dedup = None
+                self._recurring = None
+                self._spending = None
+                self._learned = None
+            else:
+                ledger._search = None
+                ledger._dedup = None
+                ledger._recurring = None
+                ledger._spending = None
+                ledger._learned = None
+            new_entries = ledger._append(new_entries)
+            views = list(self._views.items())
+        # Visões por conta e moeda recebem só a parte delas do lote
+        ledger._views = {}
+        for key, (rates, view) in views:
+            part = _view_part(new_entries, key[0], rates if key[1] is not None else None)
+            ledger._views[key] = (rates, view.appended(part, take_indexes) if len(part) else view)
+        return ledger
+
+    def _append(self, new_entries):
+        new_entries = sort_by_date(complete_columns(new_entries)[COLUMNS])
+        if new_entries.empty:
+            return new_entries
+        if len(self._dates) and new_entries['Data'].iloc[0] < self._dates[-1]:
+            # Lançamentos anteriores ao último: o livro inteiro é reordenado, em O(n)
+            self._load(concat_compact([self.df, new_entries]).sort_values('Data', kind='stable', ignore_index=True))
+            self._search = None  # posições mudaram; o índice é refeito na próxima busca
+            self._learned = None  # os empates usam as posições
+            self._labels = {}
+        else:
+            # O caso comum: o lote vai para o fim dos buffers, em O(lote)
+            self._extend(new_entries)
+            if self._search is not None:
+                self._search.add(new_entries['Descrição'], new_entries['Categoria'])
+            if self._learned is not None:
+                self._learned.add(new_entries)
+            self._labels = {
+                col: sorted(set(labels).union(new_entries[col].astype(str))) for col, labels in self._labels.items()
+            }
+        self._orderings = {}
+        self._forecasts = {}
+        self._converted = None
+        self.aggregates.add(new_entries)
+        self.monthly.add(new_entries)
+        if self._dedup is not None:
+            self._dedup.add(new_entries)
+        if self._recurring is not None:
+            self._recurring.add(self.df, new_entries)
+        if self._spending is not None:
+            self._spending.add(new_entries)
+        self.version = next(_versions)
+        return new_entries
+
+    def _extend(self, new_entries):
+        size = len(self.df)
+        signed = signed_cents(new_entries)
+        columns = {
+            'Data': new_entries['Data'].to_numpy(),
+            'Valor': new_entries['Valor'].to_numpy(dtype='float64'),
+            'Sinal': signed,
+        }
+        dtypes = dict(self._dtypes)
+        for col in CATEGORICAL_COLUMNS:
+            categories = dtypes[col].categories
+            labels = new_entries[col].cat.categories
+            mapping = categories.get_indexer(labels)
+            unseen = mapping < 0
+            if unseen.any():
+                # Rótulos novos entram no fim das categorias
+                mapping[unseen] = len(categories) + np.arange(unseen.sum())
+                categories = categories.append(labels[unseen])
+                dtypes[col] = CategoricalDtype(categories)
+            # Código -1 (vazio) continua -1; a largura segue a do pandas para o número de categorias
+            codes = np.append(mapping, -1)[new_entries[col].cat.codes.to_numpy()]
+            columns[col] = codes.astype(_codes_dtype(len(categories)))
+        self._dtypes = dtypes
+        self._columns = self._columns.extended(columns)
+        if self._balance is not None:
+            opening = self._balance.view(size)[-1] if size else 0
+            self._balance = self._balance.extended(size, opening + np.cumsum(signed))
+        self._set_frame()
+
+    def deduplicate(self, new_entries, fuzzy=False):
+        # Devolve (lançamentos novos, quantidade descartada como repetida)
+        new_entries = sort_by_date(complete_columns(new_entries))
+        if new_entries.empty or self.df.empty:
+            return new_entries, 0
+        with self._lock:
+            dedup = self._dedup
+            if dedup is None:
+                dedup = self._dedup = DedupIndex(self.df)
+            keep = dedup.new_rows_mask(new_entries)
+        if fuzzy and keep.any():
+            candidates = new_entries[keep]
+            existing = self.between(candidates['Data'].iloc[0], candidates['Data'].iloc[-1])
+            keep[np.flatnonzero(keep)] = ~near_duplicates_mask(candidates, existing)
+        return new_entries[keep].reset_index(drop=True), int((~keep).sum())
+
+    def between(self, start_date, end_date):
+        lo, hi = self.positions(start_date, end_date)
+        return self.df.iloc[lo:hi]
+
+    def search(self, query, start_date, end_date, mode='substring', ranked=False):
+        lo, hi = self.positions(start_date, end_date)
+        # O lock só cobre pegar (ou montar) o índice; a consulta roda fora dele, já que um acréscimo
+        # posterior não altera nada que ela leia (ver search.py) e as linhas além de hi são ignoradas
+        with self._lock:
+            index = self._search
+            if index is None:
+                index = self._search = SearchIndex(self.df['Descrição'], self.df['Categoria'])
+        return index.search(query, lo, hi, mode=mode, ranked=ranked)
+
+    def ordering(self, column):
+        # (posições em ordem crescente da coluna, posto de cada linha); calculado uma vez por versão.
+        # A ordenação é estável, então empates ficam em ordem de data
+        cached = self._orderings.get(column)
+        if cached is not None:
+            return cached
+        if column == 'Data':
+            order = np.arange(len(self.df))
+        else:
+            values = self.df[column]
+            if isinstance(values.dtype, CategoricalDtype):
+                # Ordem alfabética sem acentos/maiúsculas, calculada só sobre as categorias distintas
+                labels = np.array([fold(label) for label in values.cat.categories], dtype=object)
+                label_rank = np.empty(len(labels) + 1, dtype='int64')
+                label_rank[np.argsort(labels, kind='stable')] = np.arange(len(labels))
+                label_rank[-1] = len(labels)  # código -1 (vazio) vai para o fim
+                keys = label_rank[values.cat.codes.to_numpy()]
+            else:
+                keys = values.to_numpy()
+            order = np.argsort(keys, kind='stable')
+        rank = np.empty(len(order), dtype='int64')
+        rank[order] = np.arange(len(order))
+        self._orderings[column] = (order, rank)
+        return order, rank
+
+    def labels(self, column):
+        # Valores presentes numa coluna de texto (ex.: contas, moedas), em ordem; uma vez por versão
+        cached = self._labels.get(column)
+        if cached is None:
+            values = self.df[column]
+            counts = np.bincount(values.cat.codes.to_numpy() + 1, minlength=len(values.cat.categories) + 1)
+            cached = self._labels[column] = sorted(values.cat.categories[counts[1:] > 0])
+        return cached
+
+    def accounts(self):
+        return self.labels('Conta')
+
+    @property
+    def currency(self):
+        # Moeda de todos os lançamentos; None quando o livro mistura moedas
+        currencies = self.labels('Moeda')
+        if not currencies:
+            return BASE_CURRENCY
+        return currencies[0] if len(currencies) == 1 else None
+
+    def account(self, name):
+        # Lançamentos de uma conta, com os valores originais; None é o livro todo
+        if name is None:
+            return self
+        with self._lock:
+            cached = self._views.get((name, None))
+            if cached is None:
+                cached = self._views[(name, None)] = (None, Ledger(self.df.iloc[self._account_rows(name)]))
+            return cached[1]
+
+    def view(self, account=None, rates=None, native=True):
+        # Conta (ou todas, com None) numa moeda só: a dos lançamentos, se for uma, senão a base das
+        # cotações (native=False converte sempre). Lançamentos em moeda sem cotação ficam de fora
+        part = self.account(account)
+        rates = NO_RATES if rates is None else rates
+        if part.currency == rates.base or (native and part.currency is not None):
+            return part
+        with self._lock:
+            cached = self._views.get((account, rates.version))
+            if cached is not None:
+                return cached[1]
+            # Versões antigas das cotações saem do cache
+            self._views = {key: entry for key, entry in self._views.items() if key[1] in (None, rates.version)}
+            rows = np.arange(len(self.df)) if account is None else self._account_rows(account)
+            valor = self.converted_values(rates)[rows]
+            converted = self.df.iloc[rows].assign(Valor=valor, Moeda=rates.base)
+            view = Ledger(converted[~np.isnan(valor)])
+            self._views[(account, rates.version)] = (rates, view)
+            return view
+
+    def converted_values(self, rates):
+        # Valor de cada linha na moeda base (NaN sem cotação); a junção roda uma vez por versão
+        if self._converted is None or self._converted[0] != rates.version:
+            self._converted = (rates.version, rates.convert(self.df['Valor'], self._dates, self.df['Moeda']))
+        return self._converted[1]
+
+    def _account_rows(self, name):
+        categories = self.df['Conta'].cat.categories
+        if name not in categories:
+            return np.empty(0, dtype='int64')
+        return np.flatnonzero(self.df['Conta'].cat.codes.to_numpy() == categories.get_loc(name))
+
+    def recurring(self):
+        # Recorrentes ainda ativos na data do último lançamento
+        with self._lock:
+            index = self._recurring
+            if index is None:
+                index = self._recurring = RecurringIndex(self.df)
+            return index.table(self.df['Data'].iloc[-1] if len(self.df) else None)
+
+    def spending(self, month):
+        # Gasto do mês por categoria, do acumulado materializado a partir do cubo e atualizado a cada inserção.
+        # Devolve uma cópia: o tracker passa para a próxima versão e não sai daqui
+        with self._lock:
+            tracker = self._spending
+            if tracker is None:
+                tracker = self._spending = SpendingTracker.from_cube(self.monthly)
+            return tracker.totals(month)
+
+    def learned_mappings(self):
+        # learn_mappings sobre o livro, mantido por lote em vez de refeito a cada versão; devolve uma cópia
+        with self._lock:
+            index = self._learned
+            if index is None:
+                index = self._learned = LearnedMappings(self.df)
+            return index.mappings()
+
+    def forecast(self, months=6):
+        # Projeção do saldo; calculada uma vez por versão e horizonte
+        cached = self._forecasts.get(months)
+        if cached is None:
+            cached = self._forecasts[months] = forecast_balance(self, months)
+        return cached
+
+    def opening_balance(self, start_date):
+        lo, _ = self.positions(start_date, start_date)
+        return float(from_cents(self.balance_cents()[lo - 1])) if lo else 0.0
+
+    def running_balance(self, start_date, end_date, include_opening=True):
+        lo, hi = self.positions(start_date, end_date)
+        balance = self.balance_cents()[lo:hi]
+        if not include_opening and lo:
+            balance = balance - self.balance_cents()[lo - 1]
+        return pd.Series(from_cents(balance), index=self.df['Data'].iloc[lo:hi], name='Saldo_Acumulado')
+
+    def flow(self, start_date, end_date, freq):
+        # Receitas/despesas por período: D e W saem dos totais diários, M/Q/Y do cubo mensal
+        if freq in ('D', 'W'):
+            return resample_flow(self.aggregates.daily(start_date, end_date), freq)
+        first, last, edges = month_pieces(start_date, end_date)
+        parts = [self.monthly.flow(first, last)]
+        for edge_start, edge_end in edges:
+            totals = self.aggregates.window(edge_start, edge_end)
+            if totals.n_receitas or totals.n_despesas:
+                month = edge_start.to_period('M').start_time
+                parts.append(pd.DataFrame(
+                    {'receitas': [totals.receitas], 'despesas': [totals.despesas]},
+                    index=pd.DatetimeIndex([month], name='Mes'),
+                ))
+        return resample_flow(pd.concat(parts).sort_index(), freq)
+
+    def by_category(self, start_date, end_date, tipo='Despesa'):
+        first, last, edges = month_pieces(start_date, end_date)
+        parts = [self.monthly.by_category(first, last, tipo)]
+        parts += [self.aggregates.by_category(edge_start, edge_end, tipo) for edge_start, edge_end in edges]
+        return pd.concat(parts).groupby(level=0).sum()
+
+    def balance_cents(self):
+        # Soma acumulada de todo o livro: o saldo de qualquer janela é uma fatia dela
+        if self._balance is None:
+            self._balance = AppendBuffer(np.cumsum(self.signed))
+        return self._balance.view(len(self.df))
+
+    @property
+    def dates(self):
+        # Datas de df (datetime64[ns], em ordem crescente), para buscas binárias fora do Ledger; só leitura
+        return self._dates
+
+    def positions(self, start_date, end_date):
+        lo = np.searchsorted(self._dates, _day_bound(start_date), side='left')
+        hi = np.searchsorted(self._dates, _day_bound(end_date) + np.timedelta64(1, 'D'), side='left')
+        return lo, max(lo, hi)
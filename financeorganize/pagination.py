@@ -0,0 +1,78 @@
+"""Paginação da tabela de transações no servidor.
+
+Só a página visível sai do Ledger a cada rerun. Na ordem por data (a
+padrão) a página é um intervalo de posições encontrado por busca binária a
+partir de um cursor (data do último lançamento mostrado e quantos daquele
+mesmo instante já apareceram), então lançamentos novos não deslocam as
+páginas seguintes. As outras colunas usam ordenações pré-calculadas por
+versão do Ledger.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+PAGE_SIZES = [25, 50, 100, 250]
+DEFAULT_PAGE_SIZE = 50
+
+# frame: linhas da página; total: linhas em todas as páginas; start: índice da primeira linha;
+# next_cursor: passe para a próxima página (None na última)
+Page = namedtuple('Page', ['frame', 'total', 'start', 'next_cursor'])
+
+
+def table_page(ledger, start_date, end_date, sort='Data', descending=True, cursor=None,
+               page_size=DEFAULT_PAGE_SIZE, query='', ranked=False):
+    lo, hi = ledger.positions(start_date, end_date)
+    if query:
+        # Índice invertido: ignora acentos e maiúsculas, sem varrer o período inteiro
+        positions = ledger.search(query, start_date, end_date, ranked=ranked)
+        if not ranked:
+            positions = _sort_positions(ledger, positions, sort, descending)
+        return _offset_page(ledger, positions, cursor, page_size)
+    if sort == 'Data':
+        return _date_page(ledger, lo, hi, descending, cursor, page_size)
+    order, _ = ledger.ordering(sort)
+    positions = order[(order >= lo) & (order < hi)]
+    return _offset_page(ledger, positions[::-1] if descending else positions, cursor, page_size)
+
+
+def _sort_positions(ledger, positions, column, descending):
+    # Resultados de busca chegam em ordem de data; outras colunas usam o posto pré-calculado
+    if column != 'Data':
+        _, rank = ledger.ordering(column)
+        positions = positions[np.argsort(rank[positions], kind='stable')]
+    return positions[::-1] if descending else positions
+
+
+def _offset_page(ledger, positions, cursor, page_size):
+    start = cursor or 0
+    stop = min(start + page_size, len(positions))
+    return Page(
+        ledger.df.iloc[positions[start:stop]], len(positions), start,
+        stop if stop < len(positions) else None,
+    )
+
+
+def _date_page(ledger, lo, hi, descending, cursor, page_size):
+    # cursor = (data do último lançamento mostrado, quantos daquele instante já saíram, linhas já mostradas)
+    dates = ledger.dates
+    shown = 0
+    if descending:
+        stop = hi
+        if cursor is not None:
+            value, skip, shown = cursor
+            stop = min(hi, np.searchsorted(dates, value, side='right')) - skip
+        first = max(lo, stop - page_size)
+        frame = ledger.df.iloc[first:stop].iloc[::-1]
+        more, edge = first > lo, first
+        same = min(hi, np.searchsorted(dates, dates[edge], side='right')) - edge if more else 0
+    else:
+        first = lo
+        if cursor is not None:
+            value, skip, shown = cursor
+            first = max(lo, np.searchsorted(dates, value, side='left')) + skip
+        stop = min(hi, first + page_size)
+        frame = ledger.df.iloc[first:stop]
+        more, edge = stop < hi, stop - 1
+        same = edge - max(lo, np.searchsorted(dates, dates[edge], side='left')) + 1 if more else 0
+    next_cursor = (dates[edge], int(same), shown + len(frame)) if more else None
+    return Page(frame, int(hi - lo), shown, next_cursor)
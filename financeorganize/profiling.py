@@ -0,0 +1,243 @@
+"""Medição de tempo por seção de cada execução do script.
+
+Cada rerun abre seções nomeadas em sequência (a próxima fecha a anterior)
+e anota linhas processadas e bytes enviados ao navegador. Marcos (como os
+primeiros cards na tela) guardam o tempo desde o início da execução e
+podem ter um orçamento. Ao final, os tempos vão para histogramas do
+processo, exportáveis no formato texto do Prometheus, e para uma linha JSON
+no log. O custo é um perf_counter por seção e algumas somas sob um lock,
+então pode ficar ligado em produção.
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Limites (em segundos) dos histogramas por seção
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+METRIC_PREFIX = 'financeorganize'
+
+
+class Span:
+    __slots__ = ('name', 'seconds', 'rows', 'nbytes')
+
+    def __init__(self, name):
+        self.name = name
+        self.seconds = 0.0
+        self.rows = 0
+        self.nbytes = 0
+
+    def as_dict(self):
+        return {
+            'section': self.name, 'ms': round(self.seconds * 1000, 3),
+            'rows': self.rows, 'bytes': self.nbytes,
+        }
+
+
+class RerunProfile:
+    def __init__(self, registry=None, started=None, **context):
+        # started: perf_counter do início da execução, se anterior à criação do perfil
+        # context: campos extras da linha de log (ex.: usuário)
+        self.registry = registry
+        self.context = context
+        self.spans = []
+        self.marks = {}  # marco -> segundos desde o início
+        self.over_budget = set()
+        self.total_seconds = None
+        self._started = time.perf_counter() if started is None else started
+        self._current = None
+        self._current_start = None
+
+    def section(self, name):
+        # Fecha a seção aberta (se houver) e começa a próxima
+        now = time.perf_counter()
+        self._close(now)
+        self._current = Span(name)
+        self._current_start = now
+        return self._current
+
+    def add(self, rows=0, nbytes=0):
+        # Soma à seção aberta
+        if self._current is not None:
+            self._current.rows += int(rows)
+            self._current.nbytes += int(nbytes)
+
+    def mark(self, name, budget=None):
+        # Só o primeiro registro de cada marco conta
+        if name in self.marks:
+            return self.marks[name]
+        seconds = self.marks[name] = time.perf_counter() - self._started
+        if budget is not None and seconds > budget:
+            self.over_budget.add(name)
+            logger.warning(json.dumps({
+                'event': 'budget_exceeded', **self.context, 'mark': name,
+                'ms': round(seconds * 1000, 3), 'budget_ms': round(budget * 1000, 3),
+            }, ensure_ascii=False))
+        return seconds
+
+    def finish(self):
+        now = time.perf_counter()
+        self._close(now)
+        self.total_seconds = now - self._started
+        if self.registry is not None:
+            self.registry.observe(self)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({
+                'event': 'rerun', **self.context,
+                'total_ms': round(self.total_seconds * 1000, 3),
+                'sections': [span.as_dict() for span in self.spans],
+                'marks': {name: round(seconds * 1000, 3) for name, seconds in self.marks.items()},
+            }, ensure_ascii=False))
+        return self
+
+    def _close(self, now):
+        if self._current is not None:
+            self._current.seconds = now - self._current_start
+            self.spans.append(self._current)
+            self._current = None
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+class MetricsRegistry:
+    def __init__(self, buckets=DEFAULT_BUCKETS, textfile=None, write_interval=15):
+        # textfile: arquivo reescrito periodicamente para o coletor "textfile" do node_exporter
+        self.buckets = tuple(buckets)
+        self.textfile = textfile
+        self.write_interval = write_interval
+        self.reruns = 0
+        self._sections = {}  # nome -> [contagens por faixa, soma, quantidade, linhas, bytes]
+        self._marks = {}  # marco -> [contagens por faixa, soma, quantidade, último, acima do orçamento]
+        self._rerun_seconds = 0.0
+        self._written_at = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, profile):
+        with self._lock:
+            self.reruns += 1
+            self._rerun_seconds += profile.total_seconds or 0.0
+            for span in profile.spans:
+                stats = self._observe(self._sections, span.name, span.seconds)
+                stats[3] += span.rows
+                stats[4] += span.nbytes
+            for name, seconds in profile.marks.items():
+                stats = self._observe(self._marks, name, seconds)
+                stats[3] = seconds
+                stats[4] += name in profile.over_budget
+            write = self.textfile and time.monotonic() - self._written_at >= self.write_interval
+            if write:
+                self._written_at = time.monotonic()
+        if write:
+            self.write_textfile()
+
+    def _observe(self, table, name, seconds):
+        stats = table.get(name)
+        if stats is None:
+            stats = table[name] = [[0] * (len(self.buckets) + 1), 0.0, 0, 0, 0]
+        index = next((i for i, bound in enumerate(self.buckets) if seconds <= bound), len(self.buckets))
+        stats[0][index] += 1
+        stats[1] += seconds
+        stats[2] += 1
+        return stats
+
+    def summary(self):
+        # Uma linha por seção: execuções, média, p95 estimado pelas faixas e totais
+        rows = []
+        with self._lock:
+            for name, (counts, total, count, n_rows, n_bytes) in self._sections.items():
+                rows.append({
+                    'section': name, 'count': count,
+                    'mean_ms': round(total / count * 1000, 3) if count else 0.0,
+                    'p95_ms': self._quantile(counts, count, 0.95),
+                    'rows': n_rows, 'bytes': n_bytes,
+                })
+        return rows
+
+    def marks_summary(self):
+        # Uma linha por marco: ocorrências, último valor, média, p95 e quantas passaram do orçamento
+        rows = []
+        with self._lock:
+            for name, (counts, total, count, last, over_budget) in self._marks.items():
+                rows.append({
+                    'mark': name, 'count': count, 'last_ms': round(last * 1000, 3),
+                    'mean_ms': round(total / count * 1000, 3) if count else 0.0,
+                    'p95_ms': self._quantile(counts, count, 0.95),
+                    'over_budget': over_budget,
+                })
+        return rows
+
+    def to_prometheus(self):
+        with self._lock:
+            sections = {key: (list(stats[0]), *stats[1:]) for key, stats in self._sections.items()}
+            marks = {key: (list(stats[0]), *stats[1:]) for key, stats in self._marks.items()}
+            reruns, rerun_seconds = self.reruns, self._rerun_seconds
+        lines = self._histogram(
+            f'{METRIC_PREFIX}_section_seconds', 'section', sections,
+            'Duração de cada seção do script por execução.',
+        )
+        for metric, index, help_text in (
+            ('section_rows_total', 3, 'Linhas processadas por seção.'),
+            ('section_bytes_total', 4, 'Bytes enviados ao navegador por seção (estimativa).'),
+        ):
+            lines.append(f'# HELP {METRIC_PREFIX}_{metric} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{metric} counter')
+            for section, stats in sections.items():
+                lines.append(f'{METRIC_PREFIX}_{metric}{{section="{_label(section)}"}} {stats[index]}')
+        lines += self._histogram(
+            f'{METRIC_PREFIX}_mark_seconds', 'mark', marks,
+            'Tempo do início da execução até cada marco (ex.: primeiros cards).',
+        )
+        for metric, index, kind, help_text in (
+            ('mark_last_seconds', 3, 'gauge', 'Último valor de cada marco.'),
+            ('mark_over_budget_total', 4, 'counter', 'Execuções em que o marco passou do orçamento.'),
+        ):
+            lines.append(f'# HELP {METRIC_PREFIX}_{metric} {help_text}')
+            lines.append(f'# TYPE {METRIC_PREFIX}_{metric} {kind}')
+            for mark, stats in marks.items():
+                lines.append(f'{METRIC_PREFIX}_{metric}{{mark="{_label(mark)}"}} {stats[index]}')
+        lines += [
+            f'# HELP {METRIC_PREFIX}_reruns_total Execuções completas do script.',
+            f'# TYPE {METRIC_PREFIX}_reruns_total counter',
+            f'{METRIC_PREFIX}_reruns_total {reruns}',
+            f'# HELP {METRIC_PREFIX}_rerun_seconds_total Tempo somado das execuções completas.',
+            f'# TYPE {METRIC_PREFIX}_rerun_seconds_total counter',
+            f'{METRIC_PREFIX}_rerun_seconds_total {rerun_seconds}',
+        ]
+        return '\n'.join(lines) + '\n'
+
+    def _histogram(self, name, label_name, table, help_text):
+        lines = [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+        for key, (counts, total, count, _, _) in table.items():
+            label = f'{label_name}="{_label(key)}"'
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                lines.append(f'{name}_bucket{{{label},le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'{name}_sum{{{label}}} {total}')
+            lines.append(f'{name}_count{{{label}}} {count}')
+        return lines
+
+    def write_textfile(self, path=None):
+        path = path or self.textfile
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, path)
+
+    def _quantile(self, counts, count, q):
+        # Limite superior da faixa que contém o quantil (como histogram_quantile, sem interpolar)
+        if not count:
+            return 0.0
+        target = q * count
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets, counts):
+            cumulative += bucket_count
+            if cumulative >= target:
+                return round(bound * 1000, 3)
+        return float('inf')
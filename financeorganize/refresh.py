@@ -0,0 +1,112 @@
+"""Atualização dos dados remotos em segundo plano.
+
+Uma thread por processo busca e processa o CSV remoto em intervalos fixos
+(ou quando alguém pede), monta o Ledger fora das execuções do script e
+publica o resultado como um snapshot imutável, trocado numa única
+atribuição. Falhas não apagam nada: o último snapshot bom continua
+disponível e a próxima tentativa espera cada vez mais (backoff exponencial).
+"""
+import random
+import threading
+import time
+from collections import namedtuple
+
+from .ledger import Ledger
+
+Snapshot = namedtuple('Snapshot', ['frame', 'ledger', 'sequence', 'fetched_at'])
+
+
+class BackgroundRefresher:
+    def __init__(self, fetch, interval=300, build=Ledger, min_backoff=2, max_backoff=300):
+        # fetch(force) devolve o DataFrame remoto; build monta o Ledger do snapshot
+        self.fetch = fetch
+        self.interval = interval
+        self.build = build
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.last_error = None
+        self.failures = 0
+        self.next_attempt = None  # time.monotonic() da próxima tentativa agendada
+        self._snapshot = None
+        self._running = False
+        self._requested = 0  # tentativas pedidas explicitamente
+        self._completed = 0  # tentativas concluídas, com ou sem sucesso
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._cond = threading.Condition()
+        self._thread = None
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def completed(self):
+        return self._completed
+
+    @property
+    def refreshing(self):
+        return self._requested > self._completed
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='background-refresher', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopped.set()
+        self._wake.set()
+
+    def request(self):
+        # Não bloqueia: devolve o número da tentativa que atenderá o pedido (compare com `completed`)
+        with self._cond:
+            # Uma busca já em andamento pode ter começado antes do pedido; vale a seguinte
+            ticket = self._completed + (2 if self._running else 1)
+            self._requested = max(self._requested, ticket)
+        self._wake.set()
+        return ticket
+
+    def wait(self, timeout=None):
+        # Espera a primeira tentativa terminar; devolve o snapshot atual (None se ainda não houver)
+        with self._cond:
+            self._cond.wait_for(lambda: self._completed > 0, timeout)
+        return self._snapshot
+
+    def _run(self):
+        delay = 0
+        while not self._stopped.is_set():
+            self.next_attempt = time.monotonic() + delay
+            self._wake.wait(delay)
+            self._wake.clear()
+            if self._stopped.is_set():
+                return
+            with self._cond:
+                forced = self._requested > self._completed
+                self._running = True
+            self.next_attempt = None
+            try:
+                self._publish(self.fetch(force=forced))
+            except Exception as e:
+                self.failures += 1
+                self.last_error = e
+                base = min(self.max_backoff, self.min_backoff * 2 ** (self.failures - 1))
+                delay = base * random.uniform(0.5, 1.0)
+            else:
+                self.failures = 0
+                self.last_error = None
+                delay = self.interval
+            with self._cond:
+                self._running = False
+                self._completed += 1
+                self._cond.notify_all()
+
+    def _publish(self, frame):
+        previous = self._snapshot
+        # Resposta 304 devolve o mesmo quadro em cache: nada novo a publicar
+        if previous is not None and frame is previous.frame:
+            return
+        self._snapshot = Snapshot(
+            frame, self.build(frame) if self.build is not None else None,
+            previous.sequence + 1 if previous is not None else 1, time.time(),
+        )
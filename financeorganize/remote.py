@@ -0,0 +1,106 @@
+"""Carregamento do CSV remoto com cache local e requisições condicionais.
+
+O corpo da resposta é lido em streaming direto para o parser em blocos, e o
+resultado fica em cache (em memória e em disco, no formato Arrow) junto com
+o ETag/Last-Modified. Uma resposta 304 devolve o quadro já carregado, sem
+nenhum parse; o mesmo quadro é compartilhado por todas as sessões.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+from .ingest import ingest_csv
+from .schema import COLUMNS
+from .storage import frame_to_table, table_to_frame, read_table_file, write_table_file
+
+DEFAULT_TIMEOUT = (3.05, 15)  # (conexão, leitura) em segundos
+
+
+def read_csv_stream(stream, chunksize=50_000):
+    # Mesmo pipeline de validação usado nos uploads
+    df, _ = ingest_csv(stream, chunksize)
+    return df
+
+
+class RemoteCSVLoader:
+    def __init__(self, url, cache_dir, timeout=DEFAULT_TIMEOUT, max_age=60,
+                 chunksize=50_000, session=None):
+        self.url = url
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+        self.max_age = max_age
+        self.chunksize = chunksize
+        self._session = session
+        self._lock = threading.Lock()
+        self._frame = None
+        self._checked_at = 0.0
+
+        os.makedirs(cache_dir, exist_ok=True)
+        key = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        self._data_path = os.path.join(cache_dir, f'{key}.arrow')
+        self._meta_path = os.path.join(cache_dir, f'{key}.json')
+        self._meta = self._read_meta()
+
+    @property
+    def session(self):
+        # requests só é importado na primeira busca (na thread de atualização, fora da partida)
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+        return self._session
+
+    def load(self, force=False):
+        with self._lock:
+            if not force and self._frame is not None and time.monotonic() - self._checked_at < self.max_age:
+                return self._frame
+
+            cached = self._cached_frame()
+            headers = {}
+            if cached is not None:
+                if 'etag' in self._meta:
+                    headers['If-None-Match'] = self._meta['etag']
+                if 'last_modified' in self._meta:
+                    headers['If-Modified-Since'] = self._meta['last_modified']
+
+            with self.session.get(self.url, headers=headers, stream=True, timeout=self.timeout) as response:
+                if response.status_code == 304 and cached is not None:
+                    self._checked_at = time.monotonic()
+                    return cached
+                response.raise_for_status()
+                response.raw.decode_content = True
+                df = read_csv_stream(response.raw, self.chunksize)
+                meta = {}
+                if response.headers.get('ETag'):
+                    meta['etag'] = response.headers['ETag']
+                if response.headers.get('Last-Modified'):
+                    meta['last_modified'] = response.headers['Last-Modified']
+
+            self._store(df[COLUMNS], meta)
+            self._checked_at = time.monotonic()
+            return self._frame
+
+    def _cached_frame(self):
+        if self._frame is None and self._meta and os.path.exists(self._data_path):
+            self._frame = table_to_frame(read_table_file(self._data_path))
+        return self._frame
+
+    def _store(self, df, meta):
+        self._frame = df
+        self._meta = meta
+        # Sem validadores não há como revalidar; não vale a pena gravar em disco
+        if not meta:
+            return
+        write_table_file(self._data_path, frame_to_table(df))
+        tmp_path = self._meta_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path)
+
+    def _read_meta(self):
+        try:
+            with open(self._meta_path, encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
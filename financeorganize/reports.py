@@ -0,0 +1,338 @@
+"""Relatórios mensais sem navegador, um livro por vez ou em lote.
+
+Um relatório reúne o que o painel mostra para um mês (as mesmas métricas,
+despesas por categoria, resumo por conta, orçamentos e as figuras) e é
+gravado em JSON, HTML (figuras Plotly interativas) e PNG (matplotlib, sem
+pyplot). Cada livro é um trabalho independente: generate_reports os
+distribui por um pool de processos, com poucos trabalhos na fila de cada
+vez, e com um prazo deixa de agendar quando o tempo acaba, registrando no
+manifesto os que ficaram de fora para a próxima execução.
+
+    python -m financeorganize --month 2024-03 --db data/ledger.db --output relatorios
+"""
+import html
+import json
+import multiprocessing
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import timedelta
+
+import pandas as pd
+
+from .budgets import Budgets
+from .charts import (
+    account_totals, balance_variation, calculate_metrics, create_balance_chart, create_budget_chart,
+    create_expense_pie_chart, create_monthly_flow_chart, format_currency,
+)
+from .currency import RateTable, load_rates
+from .database import LedgerService
+from .downsampling import minmax_downsample
+from .ingest import ingest_csv
+from .ledger import Ledger
+from .schema import BASE_CURRENCY
+from .session import read_ledger
+from .storage import MANIFEST_FILE as STORE_MANIFEST_FILE, LedgerStore
+
+REPORT_FORMATS = ['json', 'html', 'png']
+MANIFEST_FILE = 'relatorios.json'
+FLOW_MONTHS = 12  # meses do gráfico de fluxo, terminando no mês do relatório
+QUEUE_PER_WORKER = 2  # trabalhos agendados por processo; o resto espera fora do pool
+SQLITE_EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+
+# kind: 'csv', 'arrow' (diretório do LedgerStore) ou 'sqlite'; user só vale para 'sqlite'
+ReportJob = namedtuple('ReportJob', ['name', 'kind', 'path', 'user'])
+
+# Por processo: um pool de conexões por banco e as cotações, reaproveitados entre trabalhos
+_services = {}
+_rates = {}
+
+
+def month_bounds(month):
+    # (primeiro dia, último dia) do mês que contém a data
+    start = pd.Timestamp(month).to_period('M').start_time
+    return start.date(), (start + pd.offsets.MonthEnd(0)).date()
+
+
+def jobs_from_paths(paths, users=None):
+    # CSV vira um trabalho; diretório do LedgerStore também; banco SQLite, um por usuário.
+    # Caminhos inexistentes ou de tipo desconhecido dão ValueError (abrir um banco ausente o criaria vazio)
+    jobs = []
+    for path in paths:
+        if os.path.isdir(path):
+            if not os.path.exists(os.path.join(path, STORE_MANIFEST_FILE)):
+                raise ValueError(f"{path}: diretório sem o armazenamento do livro ({STORE_MANIFEST_FILE})")
+            jobs.append(ReportJob(os.path.basename(os.path.normpath(path)), 'arrow', path, None))
+        elif not os.path.isfile(path):
+            raise ValueError(f"{path}: arquivo não encontrado")
+        elif path.lower().endswith('.csv'):
+            jobs.append(ReportJob(os.path.splitext(os.path.basename(path))[0], 'csv', path, None))
+        elif path.lower().endswith(SQLITE_EXTENSIONS):
+            _check_database(path)
+            for user in users or _service(path).users():
+                jobs.append(ReportJob(user, 'sqlite', path, user))
+        else:
+            raise ValueError(f"{path}: tipo de livro desconhecido (use .csv, um banco {'/'.join(SQLITE_EXTENSIONS)} "
+                             "ou o diretório do armazenamento Arrow)")
+    return jobs
+
+
+def load_job(job):
+    # Devolve (Ledger, {categoria: limite mensal})
+    if job.kind == 'csv':
+        df, _ = ingest_csv(job.path)
+        return Ledger(df), {}
+    if job.kind == 'arrow':
+        store = LedgerStore(job.path)
+    elif job.kind == 'sqlite':
+        store = _service(job.path).store(job.user)
+    else:
+        raise ValueError(f"Tipo de livro desconhecido: {job.kind}")
+    return read_ledger(store)[0], store.read_budgets()
+
+
+def monthly_report(ledger, month, rates=None, limits=None):
+    # Resumo do mês no consolidado, na moeda base; números prontos para JSON
+    start_date, end_date = month_bounds(month)
+    view = ledger.view(None, rates)
+    currency = view.currency or BASE_CURRENCY
+    receitas, despesas, saldo, prev_saldo = calculate_metrics(view, start_date, end_date, start_date - timedelta(days=1))
+    totals = view.aggregates.window(start_date, end_date)
+    by_category = view.by_category(start_date, end_date).sort_values(ascending=False)
+    budgets = Budgets(limits)
+    report = {
+        'mes': start_date.strftime('%Y-%m'),
+        'moeda': currency,
+        'receitas': round(receitas, 2),
+        'despesas': round(despesas, 2),
+        'saldo': round(saldo, 2),
+        'saldo_mes_anterior': round(prev_saldo, 2),
+        'variacao_saldo': round(balance_variation(saldo, prev_saldo), 1),
+        'n_receitas': int(totals.n_receitas),
+        'n_despesas': int(totals.n_despesas),
+        'despesas_por_categoria': {str(categoria): round(valor, 2) for categoria, valor in by_category.items()},
+        'contas': [],
+        'orcamentos': [],
+    }
+    if len(ledger.accounts()) > 1:
+        report['contas'] = account_totals(ledger, start_date, end_date, rates).round(2).to_dict('records')
+    if len(budgets):
+        report['orcamentos'] = budgets.status(view.spending(start_date)).round(2).to_dict('records')
+    return report
+
+
+def report_figures(ledger, month, rates=None, limits=None):
+    # Figuras Plotly do relatório, na ordem em que aparecem no HTML; as vazias ficam de fora
+    start_date, end_date = month_bounds(month)
+    view = ledger.view(None, rates)
+    currency = view.currency or BASE_CURRENCY
+    flow_start = (pd.Timestamp(start_date) - pd.DateOffset(months=FLOW_MONTHS - 1)).date()
+    figures = {
+        'fluxo': create_monthly_flow_chart(view, flow_start, end_date, currency),
+        'despesas': create_expense_pie_chart(view, start_date, end_date, currency),
+        'saldo': create_balance_chart(view.running_balance(start_date, end_date), currency),
+    }
+    budgets = Budgets(limits)
+    if len(budgets):
+        figures['orcamento'] = create_budget_chart(budgets.status(view.spending(start_date)), currency)
+    return {name: fig for name, fig in figures.items() if fig is not None}
+
+
+def render_html(name, report, figures):
+    currency = report['moeda']
+    cards = [
+        ('Receitas', report['receitas']), ('Despesas', report['despesas']),
+        ('Saldo', report['saldo']), ('Saldo do mês anterior', report['saldo_mes_anterior']),
+    ]
+    parts = [
+        '<!DOCTYPE html><html lang="pt-BR"><head><meta charset="utf-8">',
+        f'<title>{html.escape(name)} · {report["mes"]}</title>',
+        '<style>body{font-family:sans-serif;margin:2em;color:#5a5c69}table{border-collapse:collapse}'
+        'td,th{padding:4px 12px;border-bottom:1px solid #e3e6f0;text-align:right}</style></head><body>',
+        f'<h1>{html.escape(name)} · {report["mes"]}</h1>',
+        '<table>' + ''.join(
+            f'<tr><th>{label}</th><td>{format_currency(value, currency)}</td></tr>' for label, value in cards
+        ) + f'<tr><th>Variação do saldo</th><td>{report["variacao_saldo"]:.1f}%</td></tr></table>',
+    ]
+    for title, rows in (('Resumo por conta', report['contas']), ('Orçamentos', report['orcamentos'])):
+        if rows:
+            parts += [f'<h2>{title}</h2>', pd.DataFrame(rows).to_html(index=False, float_format='{:,.2f}'.format)]
+    # O plotly.js vem da CDN uma vez, na primeira figura
+    for position, fig in enumerate(figures.values()):
+        parts.append(fig.to_html(full_html=False, include_plotlyjs='cdn' if position == 0 else False))
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+
+def render_png(path, name, ledger, month, report, rates=None):
+    # Sem pyplot: Figure avulsa, sem estado global nem backend interativo
+    from matplotlib.dates import DateFormatter
+    from matplotlib.figure import Figure
+
+    start_date, end_date = month_bounds(month)
+    view = ledger.view(None, rates)
+    flow_start = (pd.Timestamp(start_date) - pd.DateOffset(months=FLOW_MONTHS - 1)).date()
+    flow = view.flow(flow_start, end_date, 'M')
+    balance = view.running_balance(start_date, end_date)
+    by_category = pd.Series(report['despesas_por_categoria'], dtype='float64').iloc[::-1]
+
+    fig = Figure(figsize=(12, 8))
+    fig.subplots_adjust(left=0.12, right=0.97, bottom=0.1, top=0.92, hspace=0.45, wspace=0.35)
+    fig.suptitle(f"{name} · {report['mes']} · saldo {format_currency(report['saldo'], report['moeda'])}")
+    flow_ax, category_ax, balance_ax, budget_ax = fig.subplots(2, 2).flatten()
+
+    labels = pd.to_datetime(flow.index).strftime('%m/%y')
+    positions = range(len(flow))
+    flow_ax.bar([p - 0.2 for p in positions], flow['receitas'], width=0.4, color='#1cc88a', label='Receitas')
+    flow_ax.bar([p + 0.2 for p in positions], flow['despesas'], width=0.4, color='#e74a3b', label='Despesas')
+    flow_ax.set_xticks(list(positions), labels, rotation=45)
+    flow_ax.set_title('Fluxo mensal')
+    flow_ax.legend()
+
+    category_ax.barh(by_category.index, by_category.to_numpy(), color='#4e73df')
+    category_ax.set_title('Despesas por categoria')
+
+    if len(balance):
+        # Mínimo/máximo por faixa, como no painel: meses de livros grandes têm milhares de pontos
+        x, y = minmax_downsample(balance.index.to_numpy(), balance.to_numpy())
+        balance_ax.plot(x, y, color='#4e73df')
+        balance_ax.xaxis.set_major_formatter(DateFormatter('%d/%m'))
+    balance_ax.set_title('Evolução do saldo')
+
+    if report['orcamentos']:
+        status = pd.DataFrame(report['orcamentos']).iloc[::-1]
+        colors = status['Percentual'].map(lambda p: '#e74a3b' if p >= 100 else '#f6c23e' if p >= 80 else '#1cc88a')
+        budget_ax.barh(status['Categoria'], status['Limite'], color='#e3e6f0')
+        budget_ax.barh(status['Categoria'], status['Gasto'], height=0.4, color=colors.tolist())
+        budget_ax.set_title('Orçamento x Realizado')
+    else:
+        budget_ax.set_axis_off()
+
+    fig.savefig(path, dpi=100)
+
+
+def write_report(job, month, output_dir, formats=REPORT_FORMATS, rates=None):
+    # Gera os arquivos de um livro; devolve a lista de caminhos gravados
+    ledger, limits = load_job(job)
+    report = monthly_report(ledger, month, rates, limits)
+    base = os.path.join(output_dir, f"{_safe_name(job.name)}_{report['mes']}")
+    written = []
+    if 'json' in formats:
+        _write_text(base + '.json', json.dumps({'livro': job.name, **report}, ensure_ascii=False, indent=2))
+        written.append(base + '.json')
+    if 'html' in formats:
+        _write_text(base + '.html', render_html(job.name, report, report_figures(ledger, month, rates, limits)))
+        written.append(base + '.html')
+    if 'png' in formats:
+        render_png(base + '.png', job.name, ledger, month, report, rates)
+        written.append(base + '.png')
+    return written
+
+
+def run_job(job, month, output_dir, formats=REPORT_FORMATS, rates_path=None):
+    # Erros ficam no resultado: um livro com problema não derruba o lote
+    started = time.perf_counter()
+    result = {'livro': job.name, 'tipo': job.kind, 'caminho': job.path, 'usuario': job.user}
+    try:
+        result['arquivos'] = write_report(job, month, output_dir, formats, _rate_table(rates_path))
+        result['status'] = 'ok'
+    except Exception as e:
+        result['status'] = 'erro'
+        result['erro'] = f"{type(e).__name__}: {e}"
+    result['segundos'] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def generate_reports(jobs, month, output_dir, formats=REPORT_FORMATS, workers=None, deadline=None,
+                     rates_path=None, progress=None):
+    # workers=0 roda tudo neste processo; deadline: segundos até parar de agendar novos livros.
+    # progress(resultado) é chamado a cada livro concluído. Devolve os resultados, também gravados no manifesto
+    started = time.monotonic()
+    os.makedirs(output_dir, exist_ok=True)
+    workers = (os.cpu_count() or 1) if workers is None else workers
+    pending_jobs = list(jobs)
+    pending_jobs.reverse()
+    results = []
+
+    def expired():
+        return deadline is not None and time.monotonic() - started >= deadline
+
+    def finish(result):
+        results.append(result)
+        if progress is not None:
+            progress(result)
+
+    if workers == 0:
+        while pending_jobs and not expired():
+            finish(run_job(pending_jobs.pop(), month, output_dir, formats, rates_path))
+    else:
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context('forkserver' if 'forkserver' in methods else 'spawn')
+        with ProcessPoolExecutor(workers, mp_context=context) as executor:
+            running = set()
+            while True:
+                # Fila curta: ao estourar o prazo, só os livros já agendados ainda rodam
+                while pending_jobs and len(running) < workers * QUEUE_PER_WORKER and not expired():
+                    job = pending_jobs.pop()
+                    running.add(executor.submit(run_job, job, month, output_dir, formats, rates_path))
+                if not running:
+                    break
+                done, running = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    finish(future.result())
+
+    for job in reversed(pending_jobs):
+        finish({'livro': job.name, 'tipo': job.kind, 'caminho': job.path, 'usuario': job.user, 'status': 'ignorado'})
+    _write_text(os.path.join(output_dir, MANIFEST_FILE), json.dumps({
+        'mes': month_bounds(month)[0].strftime('%Y-%m'),
+        'formatos': list(formats),
+        'processos': workers,
+        'prazo_segundos': deadline,
+        'segundos': round(time.monotonic() - started, 3),
+        'resultados': results,
+    }, ensure_ascii=False, indent=2))
+    return results
+
+
+def _service(path):
+    # Somente leitura: o relatório não cria tabelas nem migra o banco de outra instalação
+    service = _services.get(path)
+    if service is None:
+        service = _services[path] = LedgerService(path, pool_size=1, read_only=True)
+    return service
+
+
+def _check_database(path):
+    try:
+        valid = _service(path).has_ledgers()
+    except sqlite3.DatabaseError as e:
+        valid, reason = False, f"não é um banco SQLite ({e})"
+    else:
+        reason = "banco sem a tabela de livros (ledgers)"
+    if not valid:
+        _services.pop(path).close()
+        raise ValueError(f"{path}: {reason}")
+
+
+def _rate_table(path):
+    if path is None:
+        return RateTable()
+    table = _rates.get(path)
+    if table is None:
+        table = _rates[path] = load_rates(path)
+    return table
+
+
+def _safe_name(name):
+    return re.sub(r'[^\w.-]+', '_', str(name)).strip('._') or 'livro'
+
+
+def _write_text(path, text):
+    # Grava ao lado e troca: quem lê a saída durante o lote nunca vê um arquivo pela metade
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(text + '\n')
+    os.replace(tmp_path, path)
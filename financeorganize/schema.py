@@ -0,0 +1,59 @@
+"""Esquema do livro-caixa e conversões de valores compartilhadas pelo app."""
+import numpy as np
+import pandas as pd
+
+COLUMNS = ['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria', 'Conta', 'Moeda']
+TIPOS = ['Receita', 'Despesa']
+CATEGORIAS = [
+    "Moradia", "Alimentação", "Transporte", "Lazer", "Saúde",
+    "Educação", "Outros", "Salário", "Freelance", "Bônus"
+]
+# Quadros sem Conta/Moeda (extratos e dados antigos) caem na conta principal, em reais
+DEFAULT_ACCOUNT = 'Principal'
+BASE_CURRENCY = 'BRL'
+CURRENCY_SYMBOLS = {'BRL': 'R$', 'USD': 'US$', 'EUR': '€', 'GBP': '£', 'ARS': 'AR$', 'CAD': 'C$', 'JPY': '¥'}
+
+
+def empty_frame():
+    return pd.DataFrame(columns=COLUMNS)
+
+
+def _blank(values):
+    # Vazios de uma coluna de texto; em categorias o teste roda só sobre os rótulos distintos
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        labels = values.cat.categories.astype(str).str.strip() == ''
+        codes = values.cat.codes.to_numpy()
+        return (codes < 0) | np.append(labels, True)[codes]
+    return (values.isna() | (values.astype(str).str.strip() == '')).to_numpy()
+
+
+def complete_columns(df):
+    # Acrescenta Conta e Moeda quando faltam e preenche os valores vazios com os padrões
+    defaults = {'Conta': DEFAULT_ACCOUNT, 'Moeda': BASE_CURRENCY}
+    missing = {col: value for col, value in defaults.items() if col not in df.columns}
+    if missing:
+        df = df.assign(**missing)
+    for col, value in defaults.items():
+        blank = _blank(df[col])
+        if blank.any():
+            df = df.assign(**{col: df[col].astype(object).where(~blank, value).astype(str).str.strip()})
+    return df
+
+
+def currency_symbol(currency):
+    return CURRENCY_SYMBOLS.get(currency, currency)
+
+
+def to_cents(values):
+    # Valores (float, na moeda do lançamento) -> centavos (int64), arredondando para evitar 0.1 + 0.2
+    return np.rint(np.asarray(values, dtype='float64') * 100).astype('int64')
+
+
+def from_cents(cents):
+    return np.asarray(cents, dtype='int64') / 100
+
+
+def signed_cents(df):
+    # Receitas somam e todo o resto subtrai do saldo
+    cents = to_cents(df['Valor'])
+    return np.where((df['Tipo'] == 'Receita').to_numpy(), cents, -cents)
@@ -0,0 +1,197 @@
+"""Índice invertido para a busca de transações.
+
+A busca considera Descrição e Categoria sem diferenciar maiúsculas nem
+acentos ("agua" encontra "Água"). Como extratos repetem muito os mesmos
+textos, o índice trabalha sobre os textos distintos: trigramas e tokens
+apontam para ids de texto, e cada linha do livro guarda apenas o id do seu
+texto. Linhas novas entram no fim sem reconstruir o que já existe.
+
+Uma busca pode rodar enquanto outro thread acrescenta linhas (o Ledger só
+segura o lock para pegar o índice). Por isso add não altera os conjuntos
+e as listas que uma busca percorre: monta os novos e troca a referência.
+As linhas já indexadas nunca mudam de texto. O preço fica nos lotes com
+textos novos, que copiam os conjuntos dos trigramas e tokens que tocam
+(proporcionais aos textos distintos, não às linhas do livro).
+"""
+import bisect
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+_TOKEN_RE = re.compile(r'\w+')
+_SEPARATOR = '\x1f'  # separa Descrição e Categoria no texto indexado
+_CSR_SLICE_LIMIT = 64  # acima disso, uma máscara vetorizada é mais barata que juntar fatias
+
+
+def fold(text):
+    text = str(text)
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize('NFKD', text.casefold())
+    return ''.join(c for c in text if not unicodedata.combining(c))
+
+
+def _trigrams(text):
+    padded = f' {text} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    def __init__(self, descriptions=(), categories=()):
+        self._texts = []
+        self._text_ids = {}
+        self._trigrams = {}
+        self._token_ids = {}
+        self._sorted_tokens = []
+        self._short_terms = {}  # resultados de termos com 1-2 letras, que varrem os trigramas
+        self._codes = np.empty(0, dtype='int64')
+        # (ordem das linhas por texto, início de cada texto nela, linhas cobertas); trocado de uma vez
+        self._csr = (np.empty(0, dtype='int64'), np.zeros(1, dtype='int64'), 0)
+        self.add(descriptions, categories)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def add(self, descriptions, categories):
+        combined = (
+            pd.Series(descriptions, dtype='object').fillna('').astype(str) + _SEPARATOR
+            + pd.Series(categories, dtype='object').fillna('').astype(str).to_numpy()
+        )
+        if combined.empty:
+            return
+        raw_codes, uniques = pd.factorize(combined)
+        grams, tokens = {}, {}
+        folded_ids = np.fromiter(
+            (self._intern(fold(text), grams, tokens) for text in uniques), dtype='int64', count=len(uniques),
+        )
+        if grams:
+            self._publish(grams, tokens)
+        self._codes = np.concatenate([self._codes, folded_ids[raw_codes]])
+        # A parte nova fica fora do CSR até acumular o bastante para valer a reconstrução
+        csr_rows = self._csr[2]
+        if len(self._codes) - csr_rows > max(1024, csr_rows // 20):
+            self._build_csr()
+
+    def search(self, query, lo=0, hi=None, mode='substring', ranked=False):
+        hi = len(self._codes) if hi is None else hi
+        terms = fold(query).split()
+        if not terms or hi <= lo:
+            return np.empty(0, dtype='int64')
+
+        matcher = self._prefix_ids if mode == 'prefix' else self._substring_ids
+        text_ids = None
+        for term in sorted(terms, key=len, reverse=True):
+            ids = matcher(term)
+            text_ids = ids if text_ids is None else text_ids & ids
+            if not text_ids:
+                return np.empty(0, dtype='int64')
+
+        rows = self._rows_for(sorted(text_ids), lo, hi)
+        if not ranked:
+            return rows
+        scores = np.zeros(len(self._texts))
+        for text_id in text_ids:
+            scores[text_id] = self._score(self._texts[text_id], terms)
+        row_scores = scores[self._codes[rows]]
+        # Maior pontuação primeiro; no empate, o lançamento mais recente
+        return rows[np.lexsort((-rows, -row_scores))]
+
+    def _intern(self, text, grams, tokens):
+        # Textos novos só entram em grams/tokens (ids por trigrama/token do lote); _publish os junta ao índice
+        text_id = self._text_ids.get(text)
+        if text_id is not None:
+            return text_id
+        text_id = len(self._texts)
+        self._texts.append(text)
+        self._text_ids[text] = text_id
+        for gram in _trigrams(text):
+            grams.setdefault(gram, set()).add(text_id)
+        for token in _TOKEN_RE.findall(text):
+            tokens.setdefault(token, set()).add(text_id)
+        return text_id
+
+    def _publish(self, grams, tokens):
+        # Cada conjunto alterado é substituído por outro, nunca aumentado no lugar. Os tokens entram antes
+        # da lista ordenada, que é por onde a busca por prefixo chega a eles
+        new_tokens = [token for token in tokens if token not in self._token_ids]
+        for postings, additions in ((self._trigrams, grams), (self._token_ids, tokens)):
+            for key, ids in additions.items():
+                postings[key] = postings.get(key, frozenset()) | ids
+        if new_tokens:
+            # Lista quase ordenada: o sort a percorre em O(n), sem as comparações de insort
+            self._sorted_tokens = sorted(self._sorted_tokens + new_tokens)
+        # Depois dos trigramas: um resultado calculado antes deles só pode ir para o cache descartado
+        self._short_terms = {}
+
+    def _substring_ids(self, term):
+        if len(term) < 3:
+            # Termos curtos: toda ocorrência cabe em algum trigrama (o texto é indexado com bordas)
+            cache = self._short_terms
+            ids = cache.get(term)
+            if ids is None:
+                ids = set()
+                # Cópia dos itens: o dicionário pode ganhar trigramas durante a varredura
+                for gram, gram_ids in list(self._trigrams.items()):
+                    if term in gram:
+                        ids |= gram_ids
+                cache[term] = ids
+            return set(ids)
+        # As bordas do termo não são bordas do texto; descarta os trigramas com espaço artificial
+        trigrams = self._trigrams
+        postings = [trigrams.get(term[i:i + 3], frozenset()) for i in range(len(term) - 2)]
+        smallest, *others = sorted(postings, key=len)
+        candidates = smallest.intersection(*others)
+        return {text_id for text_id in candidates if term in self._texts[text_id]}
+
+    def _prefix_ids(self, term):
+        ids = set()
+        tokens = self._sorted_tokens
+        start = bisect.bisect_left(tokens, term)
+        for token in tokens[start:]:
+            if not token.startswith(term):
+                break
+            ids |= self._token_ids[token]
+        return ids
+
+    def _score(self, text, terms):
+        tokens = _TOKEN_RE.findall(text)
+        score = 0.0
+        for term in terms:
+            if term in tokens:
+                score += 3
+            elif any(token.startswith(term) for token in tokens):
+                score += 2
+            else:
+                score += 1
+        # Textos mais curtos são correspondências mais específicas
+        return score + 1 / (1 + len(text))
+
+    def _build_csr(self):
+        codes = self._codes
+        counts = np.bincount(codes, minlength=len(self._texts))
+        self._csr = (np.argsort(codes, kind='stable'), np.concatenate([[0], np.cumsum(counts)]), len(codes))
+
+    def _rows_for(self, text_ids, lo, hi):
+        # O CSR é lido antes das linhas: as linhas que ele cobre já estão em _codes
+        order, offsets, csr_rows = self._csr
+        codes = self._codes
+        csr_hi = min(hi, csr_rows)
+        parts = []
+        if lo < csr_hi and len(text_ids) <= _CSR_SLICE_LIMIT:
+            for text_id in text_ids:
+                if text_id + 1 >= len(offsets):
+                    continue
+                rows = order[offsets[text_id]:offsets[text_id + 1]]
+                parts.append(rows[np.searchsorted(rows, lo):np.searchsorted(rows, csr_hi)])
+            tail_lo = max(lo, csr_rows)
+        else:
+            tail_lo = lo
+        if tail_lo < hi:
+            mask = np.zeros(len(self._texts), dtype=bool)
+            mask[list(text_ids)] = True
+            parts.append(tail_lo + np.flatnonzero(mask[codes[tail_lo:hi]]))
+        if not parts:
+            return np.empty(0, dtype='int64')
+        return np.sort(np.concatenate(parts))
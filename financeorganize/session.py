@@ -0,0 +1,121 @@
+"""Ledger compartilhado pelo processo e camadas de alterações por sessão.
+
+Todas as sessões leem o mesmo Ledger base (somente leitura); uma sessão só
+ocupa memória própria enquanto tem lançamentos ainda não gravados, que
+ficam numa camada pequena sobreposta à base até o commit. A camada
+compartilha as colunas e os agregados da base e só acrescenta os seus
+lançamentos. A versão do armazenamento indica quando outro processo gravou
+no mesmo livro.
+"""
+import threading
+
+import pandas as pd
+
+from .cube import ROLLUP_NAME, MonthlyCube
+from .ledger import Ledger
+from .schema import empty_frame
+
+
+def read_ledger(store):
+    # Devolve (Ledger, versão lida); o cubo mensal gravado evita reagregar todo o histórico
+    version = store.version
+    monthly = store.read_rollup(ROLLUP_NAME)
+    df = store.read()
+    if monthly is not None and store.version == version:
+        return Ledger(df, monthly=MonthlyCube.from_frame(monthly)), version
+    # Uma gravação no meio da leitura deixaria cubo e lançamentos de versões diferentes
+    return Ledger(df), version
+
+
+class SharedLedger:
+    def __init__(self, ledger, store=None, store_version=None):
+        self.store = store
+        self._ledger = ledger
+        if store_version is None and store is not None:
+            store_version = store.version
+        self._store_version = store_version
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, store):
+        ledger, version = read_ledger(store)
+        return cls(ledger, store=store, store_version=version)
+
+    @property
+    def ledger(self):
+        return self._ledger
+
+    def refresh(self):
+        # Relê o livro se outro processo gravou no armazenamento desde a última leitura
+        if self.store is None or self.store.version == self._store_version:
+            return False
+        with self._lock:
+            if self.store.version != self._store_version:
+                self._ledger, self._store_version = read_ledger(self.store)
+        return True
+
+    def commit(self, new_entries):
+        with self._lock:
+            if self.store is None:
+                self._ledger = self._ledger.appended(new_entries)
+                return
+            if self.store.is_empty():
+                # Com o armazenamento vazio, a base inteira (ex.: dados do GitHub) é gravada junto
+                ledger = self._ledger.appended(new_entries)
+                version = self.store.replace(ledger.df)
+            else:
+                version = self.store.append(new_entries)
+                if version == self._store_version + 1:
+                    ledger = self._ledger.appended(new_entries)
+                else:
+                    # Houve gravações de outro processo; o armazenamento já tem as duas partes
+                    ledger, version = read_ledger(self.store)
+            self.store.write_rollup(ROLLUP_NAME, ledger.monthly.to_frame(), version)
+            self._ledger, self._store_version = ledger, version
+
+    def replace(self, df):
+        # Aceita também um Ledger já montado (ex.: snapshot preparado em segundo plano)
+        with self._lock:
+            ledger = df if isinstance(df, Ledger) else Ledger(df)
+            if self.store is not None:
+                version = self.store.replace(ledger.df)
+                self.store.write_rollup(ROLLUP_NAME, ledger.monthly.to_frame(), version)
+                self._store_version = version
+            self._ledger = ledger
+
+
+class SessionLedger:
+    def __init__(self, shared):
+        self.shared = shared
+        self.pending = empty_frame()
+        self._overlay = None  # (versão da base, Ledger base + pendentes)
+
+    @property
+    def ledger(self):
+        base = self.shared.ledger
+        if self.pending.empty:
+            return base
+        if self._overlay is None or self._overlay[0] != base.version:
+            self._overlay = (base.version, base.appended(self.pending, take_indexes=False))
+        return self._overlay[1]
+
+    def stage(self, new_entries):
+        if self.pending.empty:
+            self.pending = new_entries.copy()
+        else:
+            self.pending = pd.concat([self.pending, new_entries], ignore_index=True)
+        # A camada já montada só recebe o lote; a base continua a mesma
+        if self._overlay is not None and self._overlay[0] == self.shared.ledger.version:
+            self._overlay = (self._overlay[0], self._overlay[1].appended(new_entries))
+        else:
+            self._overlay = None
+
+    def commit(self):
+        if self.pending.empty:
+            return
+        self.shared.commit(self.pending)
+        self.discard()
+
+    def discard(self):
+        self.pending = empty_frame()
+        self._overlay = None
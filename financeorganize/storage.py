@@ -0,0 +1,202 @@
+"""Armazenamento colunar do livro-caixa.
+
+Os lançamentos ficam em arquivos Arrow IPC: um arquivo base compactado
+(ordenado por data e lido via memory-map) e segmentos append-only com as
+gravações posteriores. Uma nova transação grava apenas o seu segmento; a
+compactação periódica funde base + segmentos em um novo arquivo base.
+"""
+import json
+import os
+import threading
+
+import pandas as pd
+import pyarrow as pa
+
+from .schema import COLUMNS, complete_columns, empty_frame, to_cents, from_cents
+
+SCHEMA = pa.schema([
+    ('Data', pa.timestamp('ns')),
+    ('Descrição', pa.string()),
+    ('Valor', pa.int64()),  # centavos
+    ('Tipo', pa.dictionary(pa.int8(), pa.string())),
+    ('Categoria', pa.dictionary(pa.int16(), pa.string())),
+    ('Conta', pa.dictionary(pa.int16(), pa.string())),
+    ('Moeda', pa.dictionary(pa.int8(), pa.string())),
+])
+
+BASE_FILE = 'base.arrow'
+MANIFEST_FILE = 'manifest.json'
+BUDGETS_FILE = 'budgets.json'
+SEGMENTS_DIR = 'segments'
+ROLLUPS_DIR = 'rollups'
+
+
+def frame_to_table(df):
+    df = complete_columns(df)
+    data = pd.to_datetime(df['Data'], errors='coerce')
+    valid = data.notna()
+    frame = pd.DataFrame({
+        'Data': data[valid].astype('datetime64[ns]'),
+        'Descrição': df['Descrição'][valid].astype(object).fillna('').astype(str),
+        'Valor': to_cents(df['Valor'][valid]),
+        'Tipo': pd.Categorical(df['Tipo'][valid].astype(str)),
+        'Categoria': pd.Categorical(df['Categoria'][valid].astype(str)),
+        'Conta': pd.Categorical(df['Conta'][valid].astype(str)),
+        'Moeda': pd.Categorical(df['Moeda'][valid].astype(str)),
+    })
+    table = pa.Table.from_pandas(frame, schema=SCHEMA, preserve_index=False)
+    return table.replace_schema_metadata(None)
+
+
+def table_to_frame(table):
+    if table.num_rows == 0:
+        return empty_frame()
+    df = table.unify_dictionaries().to_pandas()
+    df['Valor'] = from_cents(df['Valor'].to_numpy())
+    # Arquivos gravados antes de Conta/Moeda chegam com as colunas nulas
+    return complete_columns(df)[COLUMNS]
+
+
+def write_table_file(path, table):
+    tmp_path = path + '.tmp'
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, path)
+
+
+def read_table_file(path):
+    # As colunas apontam direto para o arquivo mapeado, sem parse de texto
+    source = pa.memory_map(path, 'r')
+    return pa.ipc.open_file(source).read_all()
+
+
+class LedgerStore:
+    def __init__(self, path, compact_after=32):
+        self.path = path
+        self.compact_after = compact_after
+        self._lock = threading.RLock()
+        os.makedirs(os.path.join(path, SEGMENTS_DIR), exist_ok=True)
+        os.makedirs(os.path.join(path, ROLLUPS_DIR), exist_ok=True)
+        self._manifest = self._read_manifest()
+
+    @property
+    def version(self):
+        return self._manifest['version']
+
+    @property
+    def segment_count(self):
+        return len(self._manifest['segments'])
+
+    def is_empty(self):
+        return not self._manifest['base'] and not self._manifest['segments']
+
+    def read_table(self):
+        tables = []
+        with self._lock:
+            if self._manifest['base']:
+                tables.append(read_table_file(self._file(BASE_FILE)))
+            for name in self._manifest['segments']:
+                tables.append(read_table_file(self._file(SEGMENTS_DIR, name)))
+        if not tables:
+            return SCHEMA.empty_table()
+        return pa.concat_tables(tables, promote_options='default')
+
+    def read(self):
+        return table_to_frame(self.read_table())
+
+    def append(self, df):
+        # Devolve a versão resultante; cada gravação avança a versão em exatamente um
+        table = frame_to_table(df)
+        with self._lock:
+            if table.num_rows == 0:
+                return self.version
+            name = f"{self._manifest['next_segment']:08d}.arrow"
+            write_table_file(self._file(SEGMENTS_DIR, name), table)
+            self._manifest['segments'].append(name)
+            self._manifest['next_segment'] += 1
+            self._commit()
+            if len(self._manifest['segments']) >= self.compact_after:
+                self.compact()
+            return self.version
+
+    def replace(self, df):
+        table = frame_to_table(df)
+        with self._lock:
+            self._write_base(table)
+            return self.version
+
+    def compact(self):
+        # Mesmo conteúdo em menos arquivos: a versão não muda
+        with self._lock:
+            if not self._manifest['segments']:
+                return
+            self._write_base(self.read_table(), bump=False)
+
+    def read_budgets(self):
+        # {categoria: limite mensal em reais}
+        try:
+            with open(self._file(BUDGETS_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+
+    def write_budgets(self, limits):
+        tmp_path = self._file(BUDGETS_FILE) + '.tmp'
+        with self._lock:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({categoria: float(limite) for categoria, limite in limits.items()}, f, ensure_ascii=False)
+            os.replace(tmp_path, self._file(BUDGETS_FILE))
+
+    def write_rollup(self, name, df, version=None):
+        # Agregados derivados do livro, marcados com a versão do manifesto a que correspondem
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        with self._lock:
+            version = self.version if version is None else version
+            table = table.replace_schema_metadata({'ledger_version': str(version)})
+            write_table_file(self._file(ROLLUPS_DIR, f'{name}.arrow'), table)
+
+    def read_rollup(self, name):
+        # None quando não existe ou foi gravado para outra versão do livro
+        with self._lock:
+            try:
+                table = read_table_file(self._file(ROLLUPS_DIR, f'{name}.arrow'))
+            except FileNotFoundError:
+                return None
+            metadata = table.schema.metadata or {}
+            if metadata.get(b'ledger_version') != str(self.version).encode():
+                return None
+        return table.to_pandas()
+
+    def _write_base(self, table, bump=True):
+        table = table.unify_dictionaries().combine_chunks()
+        table = table.sort_by('Data')
+        write_table_file(self._file(BASE_FILE), table)
+        old_segments = self._manifest['segments']
+        self._manifest['base'] = True
+        self._manifest['segments'] = []
+        self._commit(bump)
+        for name in old_segments:
+            try:
+                os.remove(self._file(SEGMENTS_DIR, name))
+            except OSError:
+                pass
+
+    def _file(self, *parts):
+        return os.path.join(self.path, *parts)
+
+    def _read_manifest(self):
+        try:
+            with open(self._file(MANIFEST_FILE), encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {'version': 0, 'base': False, 'segments': [], 'next_segment': 1}
+
+    def _commit(self, bump=True):
+        # O manifesto é a fonte da verdade: segmentos só existem depois de listados nele
+        if bump:
+            self._manifest['version'] += 1
+        tmp_path = self._file(MANIFEST_FILE) + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self._manifest, f)
+        os.replace(tmp_path, self._file(MANIFEST_FILE))
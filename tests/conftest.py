@@ -0,0 +1,11 @@
+import numpy as np
+import pytest
+
+from .support import LEDGER_CASES, build_ledger, random_frame
+
+
+@pytest.fixture(params=LEDGER_CASES)
+def case(request):
+    rng = np.random.default_rng(sum(map(ord, request.param)))
+    df = random_frame(rng, 3000)
+    return build_ledger(request.param, df), df, rng
@@ -0,0 +1,61 @@
+"""Livros aleatórios e as mesmas consultas feitas com pandas ingênuo."""
+import numpy as np
+import pandas as pd
+
+from financeorganize import CATEGORIAS, TIPOS, Ledger
+
+START = pd.Timestamp('2023-01-01')
+DAYS = 730
+DESCRIPTIONS = [
+    'Supermercado Pão de Açúcar', 'Padaria', 'Água e Esgoto', 'Conta de Luz', 'Uber *Viagem',
+    'Farmácia São João', 'SALÁRIO', 'Freelance Site', 'iFood', 'Cinema',
+]
+LEDGER_CASES = ['built', 'appended', 'appended_out_of_order']
+
+
+def random_frame(rng, n_rows):
+    # Horários quebrados e lançamentos à meia-noite, para exercitar os limites de dia
+    seconds = rng.integers(0, DAYS * 86400, size=n_rows)
+    seconds[rng.random(n_rows) < 0.2] //= 86400 * 86400
+    return pd.DataFrame({
+        'Data': START + pd.to_timedelta(seconds, unit='s'),
+        'Descrição': rng.choice(DESCRIPTIONS, size=n_rows),
+        'Valor': rng.integers(1, 500_00, size=n_rows) / 100,
+        'Tipo': rng.choice(TIPOS, size=n_rows),
+        'Categoria': rng.choice(CATEGORIAS, size=n_rows),
+    })
+
+
+def random_window(rng):
+    # Inclui janelas fora dos dados e com o fim antes do início
+    start = START + pd.Timedelta(days=int(rng.integers(-30, DAYS + 30)))
+    end = start + pd.Timedelta(days=int(rng.integers(-5, 400)))
+    return start.date(), end.date()
+
+
+def build_ledger(kind, df, parts=4):
+    # O mesmo livro montado de uma vez ou por appended, que atualiza os índices incrementalmente
+    if kind == 'built':
+        return Ledger(df)
+    if kind == 'appended':
+        df = df.sort_values('Data', kind='stable', ignore_index=True)
+    chunks = [df.iloc[rows] for rows in np.array_split(np.arange(len(df)), parts)]
+    ledger = Ledger(chunks[0])
+    for chunk in chunks[1:]:
+        # Os índices já montados passam a cada versão nova e recebem o lote
+        ledger.search('x', START, START + pd.Timedelta(days=DAYS))
+        ledger = ledger.appended(chunk)
+    return ledger
+
+
+def naive_window(df, start_date, end_date):
+    start = pd.Timestamp(start_date)
+    end = pd.Timestamp(end_date) + pd.Timedelta(days=1)
+    ordered = df.sort_values('Data', kind='stable', ignore_index=True)
+    return ordered[(ordered['Data'] >= start) & (ordered['Data'] < end)]
+
+
+def naive_totals(df):
+    receitas = df.loc[df['Tipo'] == 'Receita', 'Valor'].sum()
+    despesas = df.loc[df['Tipo'] == 'Despesa', 'Valor'].sum()
+    return receitas, despesas
@@ -0,0 +1,81 @@
+"""Agregados diários e cards de métricas comparados com pandas ingênuo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import DailyAggregates
+from financeorganize.charts import calculate_metrics
+
+from .support import naive_totals, naive_window, random_frame, random_window
+
+
+def test_metrics(case):
+    ledger, df, rng = case
+    for _ in range(25):
+        start_date, end_date = random_window(rng)
+        prev_month = pd.Timestamp(start_date) - pd.DateOffset(months=1)
+        receitas, despesas, saldo, prev_saldo = calculate_metrics(ledger, start_date, end_date, prev_month)
+
+        exp_receitas, exp_despesas = naive_totals(naive_window(df, start_date, end_date))
+        month = df[df['Data'].dt.to_period('M') == prev_month.to_period('M')]
+        prev_receitas, prev_despesas = naive_totals(month)
+        assert receitas == pytest.approx(exp_receitas, abs=1e-6)
+        assert despesas == pytest.approx(exp_despesas, abs=1e-6)
+        assert saldo == pytest.approx(exp_receitas - exp_despesas, abs=1e-6)
+        assert prev_saldo == pytest.approx(prev_receitas - prev_despesas, abs=1e-6)
+
+
+def test_by_category(case):
+    ledger, df, rng = case
+    for _ in range(10):
+        start_date, end_date = random_window(rng)
+        window = naive_window(df, start_date, end_date)
+        expected = window[window['Tipo'] == 'Despesa'].groupby('Categoria')['Valor'].sum()
+
+        got = ledger.aggregates.by_category(start_date, end_date)
+        assert got.index.tolist() == expected.index.tolist()
+        np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), atol=1e-6)
+
+
+def test_incremental_matches_fresh():
+    rng = np.random.default_rng(3)
+    df = random_frame(rng, 2000).sort_values('Data', kind='stable', ignore_index=True)
+    incremental = DailyAggregates()
+    # Lotes pequenos em ordem, inclusive vários no mesmo dia, e um lote fora de ordem no meio
+    for rows in np.array_split(np.arange(1500), 300):
+        incremental.add(df.iloc[rows])
+    incremental.add(df.iloc[1500:])
+    incremental.add(df.iloc[:0])
+    fresh = DailyAggregates(df)
+
+    for _ in range(25):
+        start_date, end_date = random_window(rng)
+        assert incremental.window(start_date, end_date) == pytest.approx(fresh.window(start_date, end_date))
+        pd.testing.assert_frame_equal(incremental.daily(start_date, end_date), fresh.daily(start_date, end_date))
+        pd.testing.assert_series_equal(
+            incremental.by_category(start_date, end_date), fresh.by_category(start_date, end_date)
+        )
+
+    shuffled = DailyAggregates()
+    for rows in np.array_split(rng.permutation(len(df)), 7):
+        shuffled.add(df.iloc[rows])
+    assert shuffled.window(df['Data'].iloc[0], df['Data'].iloc[-1]) == fresh.window(df['Data'].iloc[0], df['Data'].iloc[-1])
+
+
+def test_appended_leaves_previous_version_unchanged(case):
+    ledger, df, rng = case
+    start_date, end_date = df['Data'].min(), df['Data'].max() + pd.Timedelta(days=30)
+    last_day = df['Data'].max().normalize()
+
+    def count(version):
+        totals = version.aggregates.window(start_date, end_date)
+        return totals.n_receitas + totals.n_despesas
+
+    before = ledger.aggregates.window(start_date, end_date)
+    # Duas versões derivadas do mesmo Ledger: a segunda não pode escrever sobre as linhas da primeira
+    first = ledger.appended(random_frame(rng, 5).assign(Data=last_day))
+    second = ledger.appended(random_frame(rng, 7).assign(Data=last_day + pd.Timedelta(days=3)))
+
+    assert ledger.aggregates.window(start_date, end_date) == before
+    assert count(first) == len(df) + 5
+    assert count(second) == len(df) + 7
@@ -0,0 +1,114 @@
+"""AnalyticsPool: consultas na thread e no pool de processos, cache e colunas compartilhadas."""
+import time
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import AnalyticsPool, Ledger, run_query, share_columns
+from financeorganize.analytics import _release, _worker_ledger, _worker_ledgers
+
+from .support import START, random_frame, random_window
+
+
+@pytest.fixture
+def ledger():
+    return Ledger(random_frame(np.random.default_rng(1), 3000))
+
+
+@pytest.fixture
+def inline_pool():
+    pool = AnalyticsPool(max_workers=0)
+    yield pool
+    pool.close()
+
+
+def test_shared_columns_match_ledger(ledger):
+    rng = np.random.default_rng(2)
+    block, descriptor = share_columns(ledger)
+    try:
+        columns = _worker_ledger(descriptor)
+        assert _worker_ledger(descriptor) is columns
+        for _ in range(20):
+            start_date, end_date = random_window(rng)
+            pd.testing.assert_series_equal(
+                columns.running_balance(start_date, end_date), ledger.running_balance(start_date, end_date),
+                check_index_type=False,
+            )
+    finally:
+        _worker_ledgers.clear()
+        _release(block)
+
+
+def test_inline_results_cached(ledger, inline_pool):
+    view = inline_pool.view(ledger)
+    start_date, end_date = START.date(), (START + pd.Timedelta(days=200)).date()
+    prev_month = pd.Timestamp(start_date) - pd.DateOffset(months=1)
+
+    assert view.metrics(start_date, end_date, prev_month) == run_query(ledger, 'metrics', start_date, end_date, prev_month)
+    pd.testing.assert_frame_equal(view.flow(start_date, end_date, 'M'), ledger.flow(start_date, end_date, 'M'))
+    pd.testing.assert_series_equal(view.by_category(start_date, end_date), ledger.by_category(start_date, end_date))
+    assert (inline_pool.hits, inline_pool.misses) == (0, 3)
+
+    first = inline_pool.submit(ledger, 'flow', start_date, end_date, 'M')
+    assert first.done() and inline_pool.hits == 1
+    # Outra versão do livro não reaproveita o resultado
+    later = ledger.appended(random_frame(np.random.default_rng(3), 5))
+    assert inline_pool.submit(later, 'flow', start_date, end_date, 'M') is not first
+    assert inline_pool.misses == 4
+
+    # O saldo volta já reduzido, com os extremos preservados
+    balance = view.running_balance(START.date(), (START + pd.Timedelta(days=800)).date())
+    full = ledger.running_balance(START.date(), (START + pd.Timedelta(days=800)).date())
+    assert len(balance) <= 2000
+    assert balance.max() == full.max() and balance.min() == full.min()
+
+
+def test_errors_not_cached(ledger, inline_pool):
+    with pytest.raises(ValueError, match='desconhecida'):
+        inline_pool.submit(ledger, 'mediana')
+    failed = inline_pool.submit(ledger, 'flow', START, START, 'frequência inválida')
+    assert failed.exception() is not None
+    retried = inline_pool.submit(ledger, 'flow', START, START, 'frequência inválida')
+    assert retried is not failed
+    assert inline_pool.hits == 0
+
+
+def test_cache_size(ledger):
+    pool = AnalyticsPool(max_workers=0, cache_size=2)
+    for freq in ('D', 'W', 'M'):
+        pool.submit(ledger, 'flow', START, START, freq)
+    pool.submit(ledger, 'flow', START, START, 'M')
+    pool.submit(ledger, 'flow', START, START, 'D')
+    assert (pool.hits, pool.misses) == (1, 4)
+
+
+def test_process_pool(ledger):
+    pool = AnalyticsPool(max_workers=1, min_rows=1000, keep_versions=1)
+    try:
+        view = pool.view(ledger)
+        start_date, end_date = START.date(), (START + pd.Timedelta(days=400)).date()
+        view.prefetch(start_date, end_date)
+        assert len(pool._blocks) == 1
+        got = view.running_balance(start_date, end_date)
+        expected = run_query(ledger, 'balance', start_date, end_date)
+        pd.testing.assert_series_equal(got, expected, check_index_type=False)
+        assert pool.hits == 1
+
+        # Livros pequenos e consultas baratas não vão ao pool
+        small = Ledger(random_frame(np.random.default_rng(4), 10))
+        pool.compute(small, 'balance', start_date, end_date)
+        pool.compute(ledger, 'flow', start_date, end_date, 'M')
+        assert len(pool._blocks) == 1
+
+        # Só a versão mais recente fica publicada quando não há tarefas pendentes
+        later = ledger.appended(random_frame(np.random.default_rng(5), 5).assign(Data=START + pd.Timedelta(days=800)))
+        pool.compute(later, 'balance', start_date, end_date)
+        # A contagem de tarefas cai no callback do Future, que pode rodar logo depois de result()
+        deadline = time.monotonic() + 5
+        while list(pool._blocks) != [later.version] and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert list(pool._blocks) == [later.version]
+    finally:
+        pool.close()
+    assert not pool._blocks
@@ -0,0 +1,58 @@
+"""Saldo acumulado e saldo de abertura do Ledger comparados com pandas ingênuo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import Ledger
+
+from .support import START, naive_window, random_window
+
+
+def naive_signed(df):
+    ordered = df.sort_values('Data', kind='stable', ignore_index=True)
+    return ordered, ordered['Valor'].where(ordered['Tipo'] == 'Receita', -ordered['Valor'])
+
+
+def test_running_balance(case):
+    ledger, df, rng = case
+    ordered, signed = naive_signed(df)
+    for _ in range(25):
+        start_date, end_date = random_window(rng)
+        window = naive_window(df, start_date, end_date)
+        opening = signed[ordered['Data'] < pd.Timestamp(start_date)].sum()
+        expected = opening + signed[window.index].cumsum()
+
+        assert ledger.opening_balance(start_date) == pytest.approx(opening, abs=1e-6)
+        got = ledger.running_balance(start_date, end_date)
+        np.testing.assert_allclose(got.to_numpy(), expected.to_numpy(), atol=1e-6)
+
+
+def test_running_balance_without_opening(case):
+    ledger, df, rng = case
+    ordered, signed = naive_signed(df)
+    for _ in range(10):
+        start_date, end_date = random_window(rng)
+        window = naive_window(df, start_date, end_date)
+        got = ledger.running_balance(start_date, end_date, include_opening=False)
+        assert got.index.tolist() == window['Data'].tolist()
+        np.testing.assert_allclose(got.to_numpy(), signed[window.index].cumsum().to_numpy(), atol=1e-6)
+
+
+def test_balance_in_cents():
+    df = pd.DataFrame({
+        'Data': [START, START, START + pd.Timedelta(days=1)],
+        'Descrição': ['Salário', 'Mercado', 'Padaria'], 'Valor': [0.1, 0.2, 0.3],
+        'Tipo': ['Receita', 'Despesa', 'Despesa'], 'Categoria': 'Outros',
+    })
+    ledger = Ledger(df)
+    # Centavos inteiros: 0,1 - 0,2 - 0,3 fecha exato, sem resíduo de ponto flutuante
+    assert ledger.balance_cents().tolist() == [10, -10, -40]
+    assert ledger.opening_balance(START) == 0.0
+    assert ledger.opening_balance(START + pd.Timedelta(days=1)) == -0.1
+    assert ledger.opening_balance(START + pd.Timedelta(days=30)) == -0.4
+
+    later = ledger.appended(df.iloc[:1].assign(Data=START + pd.Timedelta(days=2)))
+    assert later.balance_cents().tolist() == [10, -10, -40, -30]
+    # A versão anterior continua vendo só as suas linhas
+    assert ledger.balance_cents().tolist() == [10, -10, -40]
+    assert later.running_balance(START + pd.Timedelta(days=2), START + pd.Timedelta(days=2)).tolist() == [-0.3]
@@ -0,0 +1,47 @@
+"""Gerador sintético e execução curta da suíte de benchmarks."""
+import json
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.run import STAGES, main
+from benchmarks.synthetic import FOREIGN_ACCOUNTS, generate_ledger, generate_rates
+from financeorganize import BASE_CURRENCY, COLUMNS, DEFAULT_ACCOUNT, Ledger, RateTable
+
+
+def test_generate_ledger():
+    df = generate_ledger(5000, years=2, seed=3)
+    assert list(df.columns) == COLUMNS and len(df) == 5000
+    pd.testing.assert_frame_equal(df, generate_ledger(5000, years=2, seed=3))
+    assert df['Data'].is_monotonic_increasing
+    assert df['Data'].min() >= pd.Timestamp('2023-01-01') and df['Data'].max() <= pd.Timestamp('2024-12-31')
+    assert (df['Valor'] > 0).all()
+    assert set(df['Conta']) == {DEFAULT_ACCOUNT} and set(df['Moeda']) == {BASE_CURRENCY}
+    # Cada descrição pertence a uma só categoria, como num extrato real
+    assert df.groupby('Descrição', observed=True)['Categoria'].nunique().max() == 1
+
+
+def test_generate_foreign():
+    df = generate_ledger(5000, seed=4, foreign_share=0.3)
+    foreign = df[df['Moeda'] != BASE_CURRENCY]
+    assert (foreign['Tipo'] == 'Despesa').all()
+    assert 0.15 < len(foreign) / (df['Tipo'] == 'Despesa').sum() < 0.45
+    assert set(foreign['Conta']) == {account for account, _, _ in FOREIGN_ACCOUNTS}
+
+    rates = RateTable(generate_rates(seed=4))
+    assert rates.currencies == sorted([BASE_CURRENCY] + [currency for _, currency, _ in FOREIGN_ACCOUNTS])
+    assert not np.isnan(rates.rates(df['Data'], df['Moeda'])).any()
+    assert len(Ledger(df).view(None, rates)) == len(df)
+
+
+def test_run_all_stages(tmp_path):
+    output = tmp_path / 'bench.json'
+    main(['--rows', '2000', '--repeat', '1', '--years', '2', '--output', str(output)])
+    report = json.loads(output.read_text(encoding='utf-8'))
+    assert report['meta']['repeat'] == 1
+    stages = {result['stage'] for result in report['results']}
+    assert set(STAGES) <= stages
+    cold = next(result for result in report['results'] if result['stage'] == 'cold_import')
+    assert cold['heavy_modules_loaded'] == []
+    for result in report['results']:
+        assert len(result['samples_ms']) >= 1 and result['min_ms'] <= result['median_ms']
@@ -0,0 +1,80 @@
+"""Gasto mensal por categoria e níveis de alerta dos orçamentos."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import LEVELS, Budgets, Ledger, MonthlyCube, SpendingTracker, expense_months
+
+from .support import START, random_frame
+
+
+def naive_spending(df, month):
+    month = pd.Timestamp(month).to_period('M')
+    despesas = df[(df['Tipo'] == 'Despesa') & (df['Data'].dt.to_period('M') == month)]
+    return despesas.groupby(despesas['Categoria'].astype(str))['Valor'].sum()
+
+
+@pytest.mark.parametrize('shuffled', [False, True])
+def test_spending_matches_naive(shuffled):
+    rng = np.random.default_rng(21)
+    df = random_frame(rng, 3000)
+    rows = rng.permutation(len(df)) if shuffled else np.argsort(df['Data'].to_numpy(), kind='stable')
+    chunks = [df.iloc[part] for part in np.array_split(rows, 5)]
+    ledger = Ledger(chunks[0])
+    for chunk in chunks[1:]:
+        # O tracker montado a partir do cubo passa de versão em versão e recebe cada lote
+        ledger.spending(START)
+        ledger = ledger.appended(chunk)
+    for month in pd.date_range(START, periods=25, freq='MS'):
+        got = ledger.spending(month)
+        expected = naive_spending(df, month)
+        pd.testing.assert_series_equal(
+            got[got != 0].sort_index(), expected[expected != 0].sort_index(),
+            check_names=False, check_index_type=False, atol=1e-6,
+        )
+
+
+def test_tracker_from_cube_equals_incremental():
+    rng = np.random.default_rng(22)
+    df = random_frame(rng, 500)
+    incremental = SpendingTracker()
+    for rows in np.array_split(rng.permutation(len(df)), 5):
+        incremental.add(df.iloc[rows])
+    from_cube = SpendingTracker.from_cube(MonthlyCube(df))
+    for month in pd.date_range(START, periods=25, freq='MS'):
+        left, right = incremental.totals(month), from_cube.totals(month)
+        pd.testing.assert_series_equal(left.sort_index(), right.reindex(left.index).sort_index())
+    assert SpendingTracker().month(START).size == 0
+
+
+def test_levels_and_status():
+    budgets = Budgets({'Moradia': 1000, 'Lazer': 100, 'Saúde': 0, 'Educação': 50})
+    spending = pd.Series({'Moradia': 850.0, 'Lazer': 120.0, 'Saúde': 10.0, 'Transporte': 30.0})
+    levels = budgets.levels(spending)
+    assert levels.to_dict() == {'Moradia': 1, 'Lazer': 2, 'Saúde': 2, 'Educação': 0}
+
+    status = budgets.status(spending)
+    assert status['Categoria'].tolist() == ['Saúde', 'Lazer', 'Moradia', 'Educação']
+    assert status['Situação'].tolist() == [LEVELS[2], LEVELS[2], LEVELS[1], LEVELS[0]]
+    assert status.loc[status['Categoria'] == 'Lazer', 'Restante'].item() == pytest.approx(-20.0)
+    assert Budgets().status(spending).empty
+
+
+def test_alerts_only_when_level_rises():
+    budgets = Budgets({'Moradia': 1000, 'Lazer': 100})
+    month = pd.Timestamp('2024-05-17')
+    before = budgets.levels(pd.Series({'Moradia': 900.0, 'Lazer': 10.0}))
+    after = pd.Series({'Moradia': 950.0, 'Lazer': 100.0})
+
+    alerts = budgets.alerts(after, month, before)
+    assert [(alert.categoria, alert.nivel) for alert in alerts] == [('Lazer', 2)]
+    assert alerts[0].mes == pd.Timestamp('2024-05-01') and alerts[0].gasto == 100.0
+    assert [alert.categoria for alert in budgets.alerts(after, month)] == ['Moradia', 'Lazer']
+
+
+def test_expense_months():
+    df = pd.DataFrame({
+        'Data': pd.to_datetime(['2024-01-31', '2024-03-01', '2024-03-20', '2024-04-02']),
+        'Tipo': ['Despesa', 'Despesa', 'Despesa', 'Receita'],
+    })
+    assert expense_months(df) == [pd.Timestamp('2024-01-01'), pd.Timestamp('2024-03-01')]
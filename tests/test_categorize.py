@@ -0,0 +1,125 @@
+"""Categorização automática: chaves de descrição, mapeamentos aprendidos, regras e o arquivo de regras."""
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import (
+    DEFAULT_RULES, LearnedMappings, Ledger, Rule, RuleSet, description_key, description_keys, learn_mappings,
+    load_rules,
+)
+
+from .support import START, random_frame
+
+
+def frame(rows):
+    return pd.DataFrame(rows, columns=['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria'])
+
+
+def test_description_keys():
+    assert description_key('Conta de LUZ 03/24') == 'conta de luz'
+    assert description_key('Água & Esgoto - 123') == 'agua esgoto'
+    assert description_keys(['Uber *Viagem', '', '42']).tolist() == ['uber viagem', '', '']
+
+
+def test_learn_mappings_prefers_frequent_then_recent():
+    df = frame([
+        ('2024-01-01', 'Luz 01/24', 200, 'Despesa', 'Moradia'),
+        ('2024-02-01', 'Luz 02/24', 210, 'Despesa', 'Moradia'),
+        ('2024-03-01', 'Luz 03/24', 190, 'Despesa', 'Outros'),
+        ('2024-01-05', 'Pix', 50, 'Receita', 'Freelance'),
+        ('2024-01-06', 'Pix', 50, 'Receita', 'Bônus'),
+        ('2024-01-07', 'Pix', 50, 'Despesa', 'Lazer'),
+        ('2024-01-08', 'Sem categoria', 10, 'Despesa', ''),
+        ('2024-01-09', '0800', 10, 'Despesa', 'Outros'),
+    ])
+    assert learn_mappings(df) == {
+        ('luz', 'Despesa'): 'Moradia',
+        ('pix', 'Receita'): 'Bônus',
+        ('pix', 'Despesa'): 'Lazer',
+    }
+    assert learn_mappings(df, min_count=2) == {('luz', 'Despesa'): 'Moradia'}
+    assert learn_mappings(df.assign(Categoria='')) == {}
+
+
+def test_learned_mappings_by_batch():
+    rng = np.random.default_rng(31)
+    df = random_frame(rng, 4000).sort_values('Data', kind='stable', ignore_index=True)
+    index = LearnedMappings()
+    for rows in np.array_split(np.arange(len(df)), 9):
+        index.add(df.iloc[rows])
+    assert index.mappings() == learn_mappings(df)
+    assert index.mappings(min_count=60) == learn_mappings(df, min_count=60)
+
+
+def test_ledger_learned_mappings_follow_appends():
+    rng = np.random.default_rng(32)
+    df = random_frame(rng, 3000)
+    ordered = df.sort_values('Data', kind='stable', ignore_index=True)
+    ledger = Ledger(ordered.iloc[:1000])
+    ledger.learned_mappings()
+    ledger = ledger.appended(ordered.iloc[1000:2000])
+    assert ledger.learned_mappings() == learn_mappings(ledger.df)
+    # Lote fora de ordem: o índice é refeito sobre o livro reordenado
+    late = random_frame(rng, 200).assign(Data=START, Descrição='Loja Antiga', Categoria='Lazer')
+    ledger = ledger.appended(late)
+    assert ledger.learned_mappings() == learn_mappings(ledger.df)
+    assert ledger.learned_mappings()[('loja antiga', 'Despesa')] == 'Lazer'
+
+
+def test_rules_in_order():
+    rules = [
+        Rule('Mercado grande', ('mercado',), min_valor=500),
+        Rule('Transporte', pattern=r'^uber\b', tipo='Despesa'),
+        Rule('Alimentação', ('super mercado', 'padaria')),
+        Rule('Reembolso', tipo='Receita', max_valor=100),
+    ]
+    df = frame([
+        ('2024-01-01', 'Super Mercado Dia', 80, 'Despesa', ''),
+        ('2024-01-02', 'SUPER MERCADO DIA', 800, 'Despesa', ''),
+        ('2024-01-03', 'Uber *Trip', 30, 'Despesa', ''),
+        ('2024-01-04', 'Uber *Trip', 30, 'Receita', ''),
+        ('2024-01-05', 'Padaria Pão Quente', 12, 'Despesa', ''),
+        ('2024-01-06', 'Cinema', 40, 'Despesa', ''),
+    ])
+    result, source = RuleSet(rules, learned={('cinema', 'Despesa'): 'Lazer'}).categorize(df)
+    assert result.tolist() == ['Alimentação', 'Mercado grande', 'Transporte', 'Reembolso', 'Alimentação', 'Lazer']
+    assert source.tolist() == ['regra'] * 5 + ['aprendido']
+
+
+def test_fill():
+    df = frame([
+        ('2024-01-01', 'Farmácia São João', 30, 'Despesa', None),
+        ('2024-01-02', 'Farmácia São João', 30, 'Despesa', 'Lazer'),
+        ('2024-01-03', 'Algo desconhecido', 30, 'Despesa', ' '),
+    ])
+    filled, matched = RuleSet(DEFAULT_RULES).fill(df)
+    assert filled['Categoria'].tolist() == ['Saúde', 'Lazer', 'Outros'] and matched == 1
+    overridden, matched = RuleSet(DEFAULT_RULES).fill(df, default='?', override=True)
+    assert overridden['Categoria'].tolist() == ['Saúde', 'Saúde', '?'] and matched == 2
+    assert df['Categoria'].tolist()[1] == 'Lazer'
+
+
+def test_load_rules(tmp_path):
+    path = tmp_path / 'regras.json'
+    path.write_text(json.dumps([
+        {'categoria': 'Pets', 'palavras': ['petshop', 'veterinario'], 'tipo': 'Despesa'},
+        {'categoria': 'Aluguel recebido', 'regex': 'aluguel', 'tipo': 'Receita', 'valor_min': 1000},
+    ]), encoding='utf-8')
+    rules = load_rules(str(path))
+    assert rules == [
+        Rule('Pets', ('petshop', 'veterinario'), tipo='Despesa'),
+        Rule('Aluguel recebido', pattern='aluguel', tipo='Receita', min_valor=1000),
+    ]
+
+
+@pytest.mark.parametrize('items, message', [
+    ([{'categoria': 'Pets'}, {'categoria': 'Carro', 'tipo': 'despesa'}], r"Regra 2 \(Carro\).*tipo 'despesa'"),
+    ([{'palavras': ['x']}], 'Regra 1 .*falta a categoria'),
+])
+def test_load_rules_rejects_invalid(tmp_path, items, message):
+    path = tmp_path / 'regras.json'
+    path.write_text(json.dumps(items), encoding='utf-8')
+    with pytest.raises(ValueError, match=message):
+        load_rules(str(path))
@@ -0,0 +1,91 @@
+"""Cubo mensal: fluxo por período, categorias e meses cortados pelo filtro."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import MonthlyCube, month_pieces
+
+from .support import naive_totals, naive_window, random_frame, random_window
+
+FREQS = ['D', 'W', 'M', 'Q', 'Y']
+
+
+def naive_flow(df, freq):
+    periods = df['Data'].dt.to_period(freq)
+    flow = pd.DataFrame({
+        'receitas': df['Valor'].where(df['Tipo'] == 'Receita', 0.0),
+        'despesas': df['Valor'].where(df['Tipo'] == 'Despesa', 0.0),
+    }).groupby(periods).sum().sort_index()
+    if freq == 'W':
+        flow.index = flow.index.start_time.strftime('%d/%m/%Y')
+    else:
+        flow.index = flow.index.astype(str)
+    return flow
+
+
+@pytest.mark.parametrize('freq', FREQS)
+def test_flow(case, freq):
+    ledger, df, rng = case
+    for _ in range(10):
+        start_date, end_date = random_window(rng)
+        got = ledger.flow(start_date, end_date, freq)
+        expected = naive_flow(naive_window(df, start_date, end_date), freq)
+        assert got.index.tolist() == expected.index.tolist()
+        np.testing.assert_allclose(got[['receitas', 'despesas']].to_numpy(dtype='float64'),
+                                   expected.to_numpy(), atol=1e-6)
+
+
+def test_by_category(case):
+    ledger, df, rng = case
+    for _ in range(10):
+        start_date, end_date = random_window(rng)
+        window = naive_window(df, start_date, end_date)
+        for tipo in ('Despesa', 'Receita'):
+            expected = window[window['Tipo'] == tipo].groupby('Categoria')['Valor'].sum()
+            got = ledger.by_category(start_date, end_date, tipo)
+            got = got[got != 0]
+            assert sorted(got.index) == sorted(expected.index)
+            np.testing.assert_allclose(got.reindex(expected.index).to_numpy(), expected.to_numpy(), atol=1e-6)
+
+
+@pytest.mark.parametrize('start, end, first, last, edges', [
+    ('2023-01-01', '2023-03-31', '2023-01', '2023-03', []),
+    ('2023-01-15', '2023-03-31', '2023-02', '2023-03', [('2023-01-15', '2023-01-31')]),
+    ('2023-01-01', '2023-03-10', '2023-01', '2023-02', [('2023-03-01', '2023-03-10')]),
+    ('2023-01-15', '2023-03-10', '2023-02', '2023-02', [('2023-01-15', '2023-01-31'), ('2023-03-01', '2023-03-10')]),
+    ('2023-01-10', '2023-01-20', '2023-02', '2023-01', [('2023-01-10', '2023-01-20')]),
+    ('2023-01-20', '2023-01-10', '2023-01', '2022-12', []),
+])
+def test_month_pieces(start, end, first, last, edges):
+    got_first, got_last, got_edges = month_pieces(pd.Timestamp(start), pd.Timestamp(end) + pd.Timedelta(hours=18))
+    assert (str(got_first), str(got_last)) == (first, last)
+    assert got_edges == [(pd.Timestamp(a), pd.Timestamp(b)) for a, b in edges]
+
+
+def test_month_totals(case):
+    ledger, df, rng = case
+    for month in pd.period_range('2022-12', '2025-02', freq='M'):
+        rows = df[df['Data'].dt.to_period('M') == month]
+        receitas, despesas = naive_totals(rows)
+        totals = ledger.monthly.month(month.start_time + pd.Timedelta(days=10))
+        assert totals.receitas == pytest.approx(receitas, abs=1e-6)
+        assert totals.despesas == pytest.approx(despesas, abs=1e-6)
+        assert totals.n_receitas + totals.n_despesas == len(rows)
+
+
+def test_frame_round_trip():
+    rng = np.random.default_rng(5)
+    df = random_frame(rng, 1000)
+    cube = MonthlyCube(df.iloc[:600])
+    cube.add(df.iloc[600:])
+    fresh = MonthlyCube(df)
+    pd.testing.assert_frame_equal(cube.totals, fresh.totals)
+
+    # Como é gravado ao lado do livro: tipos de texto podem voltar como object ou categoria
+    stored = fresh.to_frame().astype({'Tipo': 'category', 'Mes': 'datetime64[us]'})
+    loaded = MonthlyCube.from_frame(stored)
+    pd.testing.assert_frame_equal(loaded.totals, fresh.totals)
+    first, last = pd.Period('2023-01', 'M'), pd.Period('2024-12', 'M')
+    pd.testing.assert_frame_equal(loaded.flow(first, last), fresh.flow(first, last))
+    assert loaded.month('2023-06-15') == fresh.month('2023-06-15')
+    assert MonthlyCube().month('2023-06-15').n_receitas == 0
@@ -0,0 +1,117 @@
+"""Cotações as-of e visões do Ledger por conta e moeda."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import BASE_CURRENCY, Ledger, RateTable, load_rates
+
+from .support import START, random_frame
+
+
+def rate_frame(rows):
+    return pd.DataFrame(rows, columns=['Data', 'Moeda', 'Taxa'])
+
+
+def test_rates_as_of():
+    rng = np.random.default_rng(1)
+    quotes = pd.DataFrame({
+        'Data': START + pd.to_timedelta(np.sort(rng.choice(400, size=60, replace=False)), unit='D'),
+        'Moeda': 'USD',
+        'Taxa': np.round(rng.uniform(4.5, 5.5, size=60), 4),
+    })
+    table = RateTable(quotes.astype({'Data': str, 'Taxa': str}))
+    dates = START + pd.to_timedelta(rng.integers(-10, 420, size=500), unit='D')
+
+    expected = pd.merge_asof(
+        pd.DataFrame({'Data': dates.sort_values()}), quotes, on='Data', direction='backward',
+    )['Taxa'].fillna(quotes['Taxa'].iloc[0])
+    got = table.rates(dates.sort_values(), ['USD'] * 500)
+    np.testing.assert_array_equal(got, expected.to_numpy())
+
+
+def test_rates_parsing():
+    table = RateTable(rate_frame([
+        ('2024-01-02', ' usd ', '5.432'),
+        ('2024-01-02', 'USD', '4,9'),  # mesmo dia: vale a última
+        ('2024-01-10', 'EUR', '5,5'),
+        ('2024-01-11', 'EUR', '0'),
+        ('sem data', 'EUR', '6'),
+        ('2024-01-12', 'GBP', 'abc'),
+    ]))
+    assert len(table) == 2
+    assert table.currencies == ['BRL', 'EUR', 'USD']
+    assert table.covers(BASE_CURRENCY) and table.covers('EUR') and not table.covers('GBP')
+
+    dates = pd.to_datetime(['2024-01-01', '2024-01-05', '2024-01-20', '2024-01-20', '2024-01-20'])
+    rates = table.rates(dates, ['USD', 'USD', 'EUR', BASE_CURRENCY, 'GBP'])
+    np.testing.assert_array_equal(rates[:4], [4.9, 4.9, 5.5, 1.0])
+    assert np.isnan(rates[4])
+    np.testing.assert_array_equal(table.convert([10.0, 3.333], dates[:2], ['USD', 'EUR']), [49.0, 18.33])
+    assert RateTable().version != table.version
+
+
+def test_load_rates(tmp_path):
+    path = tmp_path / 'cambio.csv'
+    path.write_text('Data,Moeda,Taxa\n2024-01-02,USD,"5,1"\n', encoding='utf-8')
+    assert load_rates(path).rates(pd.to_datetime(['2024-02-01']), ['USD']).tolist() == [5.1]
+    path.write_text('Data,Taxa\n2024-01-02,5.1\n', encoding='utf-8')
+    with pytest.raises(ValueError, match='Moeda'):
+        load_rates(path)
+
+
+@pytest.fixture
+def multi():
+    rng = np.random.default_rng(2)
+    df = random_frame(rng, 600)
+    df['Conta'] = rng.choice(['Corrente', 'Cartão', 'Viagem'], size=len(df))
+    df['Moeda'] = np.where(df['Conta'] == 'Viagem', rng.choice(['USD', 'EUR'], size=len(df)), BASE_CURRENCY)
+    rates = RateTable(rate_frame([(str(START.date()), 'USD', '5')]))
+    return Ledger(df), df, rates
+
+
+def test_account_views(multi):
+    ledger, df, rates = multi
+    assert ledger.accounts() == ['Cartão', 'Corrente', 'Viagem']
+    assert ledger.currency is None
+    assert ledger.account(None) is ledger
+
+    cartao = ledger.account('Cartão')
+    assert ledger.account('Cartão') is cartao
+    assert len(cartao) == (df['Conta'] == 'Cartão').sum()
+    assert cartao.currency == BASE_CURRENCY
+    # Uma conta em reais é a própria conta, com ou sem cotações
+    assert ledger.view('Cartão', rates) is cartao
+    assert ledger.account('Inexistente').empty
+
+
+def test_converted_view(multi):
+    ledger, df, rates = multi
+    # Sem cotação do euro, os lançamentos em EUR ficam fora da visão convertida
+    view = ledger.view(None, rates)
+    assert view.currency == BASE_CURRENCY
+    kept = df[df['Moeda'] != 'EUR']
+    assert len(view) == len(kept)
+    expected = np.where(kept['Moeda'] == 'USD', kept['Valor'] * 5, kept['Valor']).round(2)
+    assert view.df['Valor'].sum() == pytest.approx(expected.sum())
+    assert ledger.view(None, rates) is view
+
+    # native=True mantém uma conta de moeda única na própria moeda
+    usd_only = Ledger(df[df['Moeda'] == 'USD'])
+    assert usd_only.view(None, rates) is usd_only
+    assert usd_only.view(None, rates, native=False).currency == BASE_CURRENCY
+
+
+def test_views_follow_appends(multi):
+    ledger, df, rates = multi
+    view = ledger.view(None, rates)
+    viagem = ledger.account('Viagem')
+    batch = pd.DataFrame({
+        'Data': [df['Data'].max()] * 2, 'Descrição': ['Hotel', 'Padaria'], 'Valor': [100.0, 7.5],
+        'Tipo': 'Despesa', 'Categoria': 'Outros', 'Conta': ['Viagem', 'Corrente'], 'Moeda': ['USD', BASE_CURRENCY],
+    })
+    later = ledger.appended(batch)
+    assert len(later.view(None, rates)) == len(view) + 2
+    assert later.view(None, rates).df['Valor'].iloc[-2:].sort_values().tolist() == [7.5, 500.0]
+    assert len(later.account('Viagem')) == len(viagem) + 1
+    # A versão anterior continua com as suas visões
+    assert ledger.view(None, rates) is view and len(ledger.account('Viagem')) == len(viagem)
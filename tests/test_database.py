@@ -0,0 +1,156 @@
+"""SQLiteLedgerStore e LedgerService: gravações, versões, rollups e migração de bancos antigos."""
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import COLUMNS, Ledger, LedgerService, SessionLedger, complete_columns
+from financeorganize.cube import ROLLUP_NAME
+
+from .support import START, random_frame
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = LedgerService(str(tmp_path / 'ledger.db'), pool_size=2)
+    yield service
+    service.close()
+
+
+def comparable(df):
+    return complete_columns(df)[COLUMNS].astype({
+        'Data': 'datetime64[ns]', 'Descrição': str, 'Tipo': str, 'Categoria': str, 'Conta': str, 'Moeda': str,
+    }).reset_index(drop=True)
+
+
+def test_round_trip(service):
+    rng = np.random.default_rng(1)
+    df = random_frame(rng, 300).assign(Conta='Cartão', Moeda='USD').sort_values('Data', kind='stable')
+    store = service.store()
+    assert store.is_empty() and store.read().empty
+
+    assert store.replace(df) == 1
+    pd.testing.assert_frame_equal(comparable(store.read()), comparable(df))
+
+
+def test_append_bumps_version(service):
+    rng = np.random.default_rng(2)
+    first = random_frame(rng, 20).assign(Data=START)
+    second = random_frame(rng, 5).assign(Data=START + pd.Timedelta(days=1))
+    store = service.store()
+    assert store.append(first) == 1
+    assert store.append(second) == 2
+    assert store.version == 2
+    pd.testing.assert_frame_equal(comparable(store.read()), comparable(pd.concat([first, second])))
+
+    assert store.replace(second) == 3
+    assert len(store.read()) == 5
+
+
+def test_users_are_separate(service):
+    rng = np.random.default_rng(3)
+    service.store('ana').append(random_frame(rng, 4))
+    service.store('bruno').append(random_frame(rng, 7))
+    assert service.users() == ['ana', 'bruno']
+    assert len(service.store('ana').read()) == 4
+    assert service.store('bruno').version == 1
+    assert service.store('carla').is_empty()
+
+
+def test_budgets_keep_version(service):
+    store = service.store()
+    store.write_budgets({'Moradia': 1500.0, 'Lazer': 200.55})
+    assert store.read_budgets() == {'Lazer': 200.55, 'Moradia': 1500.0}
+    store.write_budgets({'Saúde': 300.0})
+    assert store.read_budgets() == {'Saúde': 300.0}
+    assert service.store('outro').read_budgets() == {}
+    assert store.version == 0
+
+
+def test_rollup_follows_version(service):
+    rng = np.random.default_rng(4)
+    store = service.store()
+    store.append(random_frame(rng, 10))
+    rollup = pd.DataFrame({'Mes': ['2024-01'], 'Valor': [1250]})
+    store.write_rollup(ROLLUP_NAME, rollup)
+    pd.testing.assert_frame_equal(store.read_rollup(ROLLUP_NAME), rollup)
+
+    # Uma gravação depois do rollup o invalida
+    store.append(random_frame(rng, 1))
+    assert store.read_rollup(ROLLUP_NAME) is None
+    assert store.read_rollup('outro') is None
+
+
+def test_shared_loads_once_and_commits(service):
+    rng = np.random.default_rng(5)
+    initial = random_frame(rng, 30).sort_values('Data', kind='stable')
+    calls = []
+
+    def load_initial():
+        calls.append(1)
+        return initial
+
+    shared = service.shared('ana', load_initial=load_initial)
+    assert service.shared('ana', load_initial=load_initial) is shared
+    assert calls == [1] and len(shared.ledger) == 30
+    # Nada foi gravado até o primeiro commit
+    assert service.store('ana').is_empty()
+
+    session = SessionLedger(shared)
+    new_rows = random_frame(rng, 3).assign(Data=initial['Data'].max())
+    session.stage(new_rows)
+    session.commit()
+    store = service.store('ana')
+    assert store.version == 1 and len(store.read()) == 33
+    assert store.read_rollup(ROLLUP_NAME) is not None
+
+
+def test_commit_after_other_process_wrote(tmp_path):
+    rng = np.random.default_rng(6)
+    path = str(tmp_path / 'ledger.db')
+    ours, theirs = LedgerService(path, pool_size=1), LedgerService(path, pool_size=1)
+    try:
+        ours.store().replace(random_frame(rng, 10))
+        shared = ours.shared()
+        assert len(shared.ledger) == 10
+
+        theirs.store().append(random_frame(rng, 4))
+        shared.commit(random_frame(rng, 2))
+        # A versão pulou uma gravação: o livro é relido com as duas partes
+        assert len(shared.ledger) == 16
+        assert shared.ledger.df['Data'].is_monotonic_increasing
+
+        theirs.store().append(random_frame(rng, 1))
+        assert shared.refresh()
+        assert len(shared.ledger) == 17
+        assert not shared.refresh()
+    finally:
+        ours.close()
+        theirs.close()
+
+
+def test_migrates_old_schema(tmp_path):
+    path = str(tmp_path / 'antigo.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE ledgers (usuario TEXT PRIMARY KEY, version INTEGER NOT NULL);
+        CREATE TABLE lancamentos (
+            id INTEGER PRIMARY KEY, usuario TEXT NOT NULL, data INTEGER NOT NULL,
+            descricao TEXT NOT NULL, valor INTEGER NOT NULL, tipo TEXT NOT NULL, categoria TEXT NOT NULL
+        );
+    """)
+    day = pd.Timestamp('2024-03-01').value
+    conn.execute("INSERT INTO lancamentos VALUES (1, 'padrao', ?, 'Aluguel', 150000, 'Despesa', 'Moradia')", (day,))
+    conn.execute("INSERT INTO ledgers VALUES ('padrao', 1)")
+    conn.commit()
+    conn.close()
+
+    service = LedgerService(path, pool_size=1)
+    try:
+        df = service.store().read()
+        assert df[['Conta', 'Moeda']].astype(str).values.tolist() == [['Principal', 'BRL']]
+        assert df['Valor'].tolist() == [1500.0]
+        assert isinstance(service.shared().ledger, Ledger)
+    finally:
+        service.close()
@@ -0,0 +1,93 @@
+"""Detecção de lançamentos repetidos: contagem exata, descrições e comparação aproximada."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import DedupIndex, Ledger, complete_columns, fingerprints, near_duplicates_mask, normalize_description
+
+from .support import START, random_frame
+
+
+def entries(rows):
+    # rows: (dias após START, descrição, valor)
+    return complete_columns(pd.DataFrame({
+        'Data': [START + pd.Timedelta(days=day, hours=9) for day, _, _ in rows],
+        'Descrição': [text for _, text, _ in rows],
+        'Valor': [valor for _, _, valor in rows],
+        'Tipo': 'Despesa', 'Categoria': 'Alimentação',
+    }))
+
+
+def test_normalize_description():
+    assert normalize_description('  PADARIA São-João!! ') == 'padaria sao joao'
+    assert normalize_description('Uber *Viagem') == 'uber viagem'
+
+
+def test_fingerprint_ignores_time_and_formatting():
+    a = entries([(0, 'Padaria São João', 12.5)])
+    b = entries([(0, 'PADARIA SAO JOAO', 12.50)]).assign(Data=START + pd.Timedelta(hours=22))
+    assert fingerprints(a)[0] == fingerprints(b)[0]
+    for changed in (
+        b.assign(Valor=12.51),
+        b.assign(Data=START + pd.Timedelta(days=1)),
+        b.assign(Tipo='Receita'),
+        b.assign(Conta='Cartão'),
+        b.assign(Moeda='USD'),
+    ):
+        assert fingerprints(changed)[0] != fingerprints(a)[0]
+
+
+def test_repeated_purchases_counted():
+    ledger_rows = entries([(0, 'Café', 5.0), (0, 'Café', 5.0), (1, 'Mercado', 80.0)])
+    index = DedupIndex(ledger_rows)
+    # Três cafés iguais no mesmo dia: dois já existem, só o terceiro é novo
+    batch = entries([(0, 'Café', 5.0), (0, 'café', 5.0), (0, 'CAFÉ', 5.0), (1, 'Mercado', 80.0), (2, 'Mercado', 80.0)])
+    assert index.new_rows_mask(batch).tolist() == [False, False, True, False, True]
+
+
+@pytest.mark.parametrize('merge_after', [0, 3, 50_000])
+def test_index_add_matches_rebuild(merge_after):
+    rng = np.random.default_rng(merge_after)
+    df = complete_columns(random_frame(rng, 600))
+    incremental = DedupIndex(df.iloc[:200], merge_after=merge_after)
+    incremental.add(df.iloc[200:400])
+    incremental.add(df.iloc[400:])
+    rebuilt = DedupIndex(df)
+
+    batch = pd.concat([df.sample(300, random_state=1), complete_columns(random_frame(rng, 50))], ignore_index=True)
+    np.testing.assert_array_equal(incremental.new_rows_mask(batch), rebuilt.new_rows_mask(batch))
+    assert not incremental.new_rows_mask(df).any()
+
+
+def test_near_duplicates():
+    existing = entries([(0, 'Supermercado Pão de Açúcar', 250.0), (1, 'Farmácia', 30.0)])
+    candidates = entries([
+        (0, 'SUPERMERCADO PAO DE ACUCAR LJ', 250.0),  # mesmo lançamento com sufixo do banco
+        (0, 'Supermercado Pão de Açúcar', 251.0),  # outro valor
+        (1, 'Cinema', 30.0),  # outra descrição
+        (2, 'Farmacia', 30.0),  # outro dia
+    ])
+    assert near_duplicates_mask(candidates, existing).tolist() == [True, False, False, False]
+    assert not near_duplicates_mask(candidates, existing.iloc[:0]).any()
+
+
+def test_ledger_deduplicate(case):
+    ledger, df, rng = case
+    repeated = df.sample(200, random_state=2)
+    fresh = random_frame(rng, 40).assign(Valor=lambda d: d['Valor'] + 1000)  # fora da faixa de random_frame
+    new, dropped = ledger.deduplicate(pd.concat([repeated, fresh], ignore_index=True))
+    assert dropped == 200
+    assert len(new) == 40
+
+    # O índice acompanha appended: o lote gravado passa a contar como existente
+    later = ledger.appended(new)
+    again, dropped = later.deduplicate(new)
+    assert again.empty and dropped == 40
+
+
+def test_ledger_deduplicate_fuzzy():
+    ledger = Ledger(entries([(0, 'Supermercado Pão de Açúcar', 250.0)]))
+    batch = entries([(0, 'SUPERMERCADO PAO DE ACUCAR LJ', 250.0)])
+    assert len(ledger.deduplicate(batch)[0]) == 1
+    new, dropped = ledger.deduplicate(batch, fuzzy=True)
+    assert new.empty and dropped == 1
@@ -0,0 +1,75 @@
+"""Redução de pontos do saldo e escolha da granularidade do fluxo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import choose_flow_frequency, minmax_downsample, resample_flow
+
+from .support import START
+
+
+def test_short_series_unchanged():
+    x = pd.date_range(START, periods=50, freq='h').to_numpy()
+    y = np.arange(50.0)
+    got_x, got_y = minmax_downsample(x, y, max_points=50)
+    np.testing.assert_array_equal(got_x, x)
+    np.testing.assert_array_equal(got_y, y)
+
+
+@pytest.mark.parametrize('max_points', [10, 101, 2000])
+def test_minmax_keeps_envelope(max_points):
+    rng = np.random.default_rng(max_points)
+    n = 20_000
+    x = np.sort(START.to_datetime64() + rng.integers(0, 365 * 86400, size=n).astype('timedelta64[s]'))
+    y = np.cumsum(rng.normal(size=n))
+    got_x, got_y = minmax_downsample(x, y, max_points=max_points)
+
+    assert len(got_x) <= max_points
+    assert np.all(np.diff(got_x.astype('int64')) >= 0)
+    # Extremos e pontas sempre sobrevivem
+    assert got_y.max() == y.max() and got_y.min() == y.min()
+    assert got_x[0] == x[0] and got_x[-1] == x[-1]
+    assert got_y[0] == y[0] and got_y[-1] == y[-1]
+    # Só pontos originais, nunca interpolados
+    positions = np.searchsorted(x, got_x)
+    assert np.isin(got_y, y[positions[0]:positions[-1] + 1]).all()
+
+
+def test_minmax_same_timestamp():
+    x = np.full(100, START.to_datetime64())
+    y = np.arange(100.0)
+    got_x, got_y = minmax_downsample(x, y, max_points=10)
+    assert len(got_x) <= 10
+    assert got_y.min() == 0 and got_y.max() == 99
+
+
+@pytest.mark.parametrize('days, max_bars, freq', [
+    (30, 120, 'D'),
+    (119, 120, 'D'),
+    (120, 120, 'W'),
+    (365 * 2, 120, 'W'),
+    (365 * 5, 120, 'M'),
+    (365 * 20, 120, 'Q'),
+    (365 * 40, 120, 'Y'),
+])
+def test_choose_flow_frequency(days, max_bars, freq):
+    start = START.date()
+    end = (START + pd.Timedelta(days=days)).date()
+    assert choose_flow_frequency(start, end, max_bars)[0] == freq
+
+
+def test_resample_flow():
+    days = pd.date_range('2023-01-01', '2023-03-05', freq='D')
+    daily = pd.DataFrame({'receitas': 1.0, 'despesas': 2.0}, index=days)
+
+    monthly = resample_flow(daily, 'M')
+    assert monthly.index.tolist() == ['2023-01', '2023-02', '2023-03']
+    assert monthly['receitas'].tolist() == [31.0, 28.0, 5.0]
+    assert monthly['despesas'].tolist() == [62.0, 56.0, 10.0]
+
+    weekly = resample_flow(daily, 'W')
+    # Semanas começam na segunda; 01/01/2023 foi domingo
+    assert weekly.index[:2].tolist() == ['26/12/2022', '02/01/2023']
+    assert weekly['receitas'].iloc[:2].tolist() == [1.0, 7.0]
+
+    assert resample_flow(daily.iloc[:0], 'M').empty
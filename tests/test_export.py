@@ -0,0 +1,65 @@
+"""Exportação em CSV, CSV compactado e Parquet, gravada em blocos."""
+import gzip
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from financeorganize import COLUMNS, EXPORT_FORMATS, Ledger, export_file, export_file_name, iter_csv_bytes, write_export
+
+from .support import random_frame
+
+
+@pytest.fixture
+def ledger():
+    return Ledger(random_frame(np.random.default_rng(41), 1234))
+
+
+def read_back(data, fmt):
+    if fmt == 'parquet':
+        return pq.read_table(io.BytesIO(data)).to_pandas()
+    if fmt == 'csv.gz':
+        data = gzip.decompress(data)
+    return pd.read_csv(io.BytesIO(data), parse_dates=['Data'])
+
+
+def normalized(df):
+    text = {col: str for col in ['Descrição', 'Tipo', 'Categoria', 'Conta', 'Moeda']}
+    return df[COLUMNS].astype({'Data': 'datetime64[ns]', **text}).reset_index(drop=True)
+
+
+@pytest.mark.parametrize('fmt', list(EXPORT_FORMATS))
+@pytest.mark.parametrize('chunk_rows', [100, 50_000])
+def test_round_trip(ledger, fmt, chunk_rows):
+    data = export_file(ledger.df, fmt, chunk_rows=chunk_rows).read()
+    pd.testing.assert_frame_equal(normalized(read_back(data, fmt)), normalized(ledger.df))
+
+
+def test_csv_blocks_have_one_header(ledger):
+    blocks = list(iter_csv_bytes(ledger.df, chunk_rows=500))
+    assert len(blocks) == 3
+    assert [block.startswith(b'Data,') for block in blocks] == [True, False, False]
+    assert b''.join(blocks) == export_file(ledger.df, 'csv').read()
+
+
+@pytest.mark.parametrize('fmt', list(EXPORT_FORMATS))
+def test_empty(fmt):
+    data = export_file(Ledger(random_frame(np.random.default_rng(0), 0)).df, fmt).read()
+    back = read_back(data, fmt)
+    assert back.empty and list(back.columns) == COLUMNS
+
+
+def test_write_to_file(ledger, tmp_path):
+    path = tmp_path / 'saida.csv'
+    with open(path, 'wb') as f:
+        write_export(ledger.between('2023-06-01', '2023-06-30'), 'csv', f)
+    assert len(pd.read_csv(path)) == len(ledger.between('2023-06-01', '2023-06-30'))
+
+
+def test_names_and_errors(ledger):
+    assert export_file_name('csv.gz') == 'lancamentos.csv.gz'
+    assert export_file_name('parquet', 'junho') == 'junho.parquet'
+    with pytest.raises(ValueError, match='xlsx'):
+        export_file(ledger.df, 'xlsx')
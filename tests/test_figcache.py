@@ -0,0 +1,75 @@
+"""FigureCache: LRU por número de figuras e por bytes estimados."""
+import numpy as np
+import plotly.graph_objects as go
+
+from financeorganize import FigureCache, estimate_figure_bytes
+
+
+def line(n):
+    return go.Figure(go.Scatter(x=np.arange(n, dtype='float64'), y=np.zeros(n)))
+
+
+def test_estimate_grows_with_points():
+    assert estimate_figure_bytes(None) == 0
+    small, large = estimate_figure_bytes(line(10)), estimate_figure_bytes(line(10_000))
+    assert large - small == (10_000 - 10) * 16
+    pie = go.Figure(go.Pie(labels=['Mercado', 'Lazer'], values=[1.0, 2.0]))
+    assert estimate_figure_bytes(pie) > estimate_figure_bytes(go.Figure())
+
+
+def test_get_or_build_counts_hits():
+    cache = FigureCache()
+    built = []
+
+    def build():
+        built.append(1)
+        return line(5)
+
+    fig = cache.get_or_build(('saldo', 1), build)
+    assert cache.get_or_build(('saldo', 1), build) is fig
+    assert len(built) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+    # Nova versão do livro: outra chave, outra figura
+    assert cache.get_or_build(('saldo', 2), build) is not fig
+    assert len(built) == 2
+
+
+def test_evicts_least_recently_used():
+    cache = FigureCache(max_entries=2)
+    figs = {key: line(5) for key in 'abc'}
+    cache.put('a', figs['a'])
+    cache.put('b', figs['b'])
+    assert cache.get('a') is figs['a']
+    cache.put('c', figs['c'])
+    assert cache.get('b') is None
+    assert cache.get('a') is figs['a'] and cache.get('c') is figs['c']
+    assert len(cache) == 2
+
+
+def test_byte_limit():
+    size = estimate_figure_bytes(line(1000))
+    cache = FigureCache(max_bytes=size * 2)
+    for key in range(3):
+        cache.put(key, line(1000))
+    assert len(cache) == 2 and cache.nbytes == size * 2
+    assert cache.get(0) is None
+
+    # Substituir a mesma chave não conta duas vezes
+    cache.put(1, line(1000))
+    assert cache.nbytes == size * 2
+
+    # Maior que o limite inteiro: não entra e não expulsa ninguém
+    cache.put('grande', line(10_000))
+    assert cache.get('grande') is None
+    assert len(cache) == 2
+
+    cache.clear()
+    assert len(cache) == 0 and cache.nbytes == 0
+
+
+def test_none_is_cached():
+    cache = FigureCache()
+    calls = []
+    assert cache.get_or_build('vazio', lambda: calls.append(1)) is None
+    assert cache.get_or_build('vazio', lambda: calls.append(1)) is None
+    assert len(calls) == 1
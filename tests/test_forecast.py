@@ -0,0 +1,113 @@
+"""Recorrentes detectados (de uma vez e por lote) e projeção do saldo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import Ledger, RecurringIndex, empty_frame, forecast_balance
+
+
+def recurring_frame(rng):
+    # Dois anos de salário, aluguel, conta de luz numerada, academia semanal e gastos avulsos
+    rows = []
+    for month in pd.date_range('2023-01-01', '2024-12-01', freq='MS'):
+        rows.append((month + pd.Timedelta(days=4, hours=8), 'SALÁRIO', 5000.0, 'Receita', 'Salário'))
+        rows.append((month + pd.Timedelta(days=9), 'Aluguel', 2000.0, 'Despesa', 'Moradia'))
+        valor = round(float(rng.uniform(150, 170)), 2)
+        rows.append((month + pd.Timedelta(days=14), f'Conta de Luz {month:%m/%Y}', valor, 'Despesa', 'Moradia'))
+        # Cobrado no último dia do mês
+        rows.append((month + pd.offsets.MonthEnd(0), 'Seguro', 80.0, 'Despesa', 'Outros'))
+    for day in pd.date_range('2024-06-03', '2024-12-30', freq='7D'):
+        rows.append((day + pd.Timedelta(hours=19), 'Academia', 25.0, 'Despesa', 'Saúde'))
+    # Assinatura cancelada há mais de um ano
+    for month in pd.date_range('2023-01-01', '2023-06-01', freq='MS'):
+        rows.append((month + pd.Timedelta(days=2), 'Streaming', 39.9, 'Despesa', 'Lazer'))
+    for i, day in enumerate(rng.choice(pd.date_range('2023-01-01', '2024-12-31'), size=150)):
+        rows.append((day, f'Compra avulsa {i}', round(float(rng.uniform(5, 300)), 2), 'Despesa', 'Outros'))
+    return pd.DataFrame(rows, columns=['Data', 'Descrição', 'Valor', 'Tipo', 'Categoria'])
+
+
+@pytest.fixture
+def df():
+    return recurring_frame(np.random.default_rng(1))
+
+
+def test_detects_recurring(df):
+    table = Ledger(df).recurring().set_index('Descrição')
+    assert sorted(table.index) == ['Academia', 'Aluguel', 'Conta de Luz 12/2024', 'SALÁRIO', 'Seguro']
+    assert table.loc['SALÁRIO', ['Tipo', 'Periodo', 'Dia', 'Valor', 'Ocorrencias']].tolist() == [
+        'Receita', 'Mensal', 5, 5000.0, 24,
+    ]
+    assert table.loc['Academia', 'Periodo'] == 'Semanal'
+    assert table.loc['Conta de Luz 12/2024', 'Ocorrencias'] == 24
+    assert 150 <= table.loc['Conta de Luz 12/2024', 'Valor'] <= 170
+    # Receitas primeiro, depois as despesas maiores
+    assert Ledger(df).recurring()['Descrição'].iloc[:2].tolist() == ['SALÁRIO', 'Aluguel']
+
+
+def test_inactive_and_all(df):
+    index = RecurringIndex(Ledger(df).df)
+    assert 'Streaming' in index.table()['Descrição'].tolist()
+    assert 'Streaming' not in index.table('2024-12-31')['Descrição'].tolist()
+    assert 'Streaming' in index.table('2023-06-20')['Descrição'].tolist()
+
+
+@pytest.mark.parametrize('shuffle', [False, True])
+def test_incremental_matches_rebuild(df, shuffle):
+    if shuffle:
+        df = df.sample(frac=1, random_state=2, ignore_index=True)
+    else:
+        df = df.sort_values('Data', kind='stable', ignore_index=True)
+    chunks = [df.iloc[rows] for rows in np.array_split(np.arange(len(df)), 6)]
+    incremental = Ledger(chunks[0])
+    for chunk in chunks[1:]:
+        # O índice já montado passa a cada versão nova e recebe o lote
+        incremental.recurring()
+        incremental = incremental.appended(chunk)
+    # A concatenação com a tabela vazia pode deixar o texto como object em vez de str
+    pd.testing.assert_frame_equal(
+        incremental.recurring().sort_values('Descrição', ignore_index=True),
+        Ledger(df).recurring().sort_values('Descrição', ignore_index=True),
+        check_dtype=False,
+    )
+
+    # Depois de montado, o índice passa para as versões seguintes e recebe só os grupos tocados
+    later = incremental.appended(pd.DataFrame({
+        'Data': [pd.Timestamp('2025-01-05 08:00')], 'Descrição': ['SALÁRIO'], 'Valor': [5000.0],
+        'Tipo': ['Receita'], 'Categoria': ['Salário'],
+    }))
+    salary = later.recurring().set_index('Descrição').loc['SALÁRIO']
+    assert salary['Ocorrencias'] == 25
+    assert salary['Ultima'] == pd.Timestamp('2025-01-05')
+    assert incremental.recurring().set_index('Descrição').loc['SALÁRIO', 'Ocorrencias'] == 24
+
+
+def test_forecast(df):
+    ledger = Ledger(df)
+    forecast = ledger.forecast(3)
+    assert ledger.forecast(3) is forecast
+    assert forecast.as_of == pd.Timestamp('2024-12-31')
+    assert forecast.opening == pytest.approx(ledger.opening_balance('2025-01-01'))
+    daily = forecast.daily
+    assert daily.index[0] == pd.Timestamp('2025-01-01') and daily.index[-1] == pd.Timestamp('2025-03-31')
+
+    assert daily['entradas'][daily['entradas'] > 0].index.day.tolist() == [5, 5, 5]
+    assert daily['entradas'].sum() == pytest.approx(15_000)
+    # O dia 31 vira o último dia de fevereiro
+    seguro = daily.loc[['2025-01-31', '2025-02-28', '2025-03-31'], 'saidas']
+    assert (seguro >= 80).all()
+    assert (daily['saidas'][daily.index.dayofweek == 0] >= 25).all()
+
+    # Saldo: abertura mais o acumulado de cada dia; o mensal guarda o último dia
+    net = (daily['entradas'] - daily['saidas'] + daily['variaveis']).cumsum()
+    np.testing.assert_allclose(daily['saldo'], forecast.opening + net)
+    assert forecast.monthly['saldo'].tolist() == pytest.approx(daily['saldo'].resample('MS').last().tolist())
+    assert forecast.monthly['entradas'].tolist() == pytest.approx([5000.0] * 3)
+
+    # Sem recorrentes, só a média do que é variável
+    plain = forecast_balance(ledger, 3, recurring=ledger.recurring().iloc[:0])
+    assert plain.daily['entradas'].sum() == 0 and plain.daily['saidas'].sum() == 0
+    assert plain.daily['variaveis'].nunique() == 1
+
+
+def test_forecast_empty():
+    assert Ledger(empty_frame()).forecast() is None
@@ -0,0 +1,41 @@
+"""Importações adiadas: o pacote não carrega o que só algumas telas usam."""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFERRED = ['plotly.express', 'requests', 'pyarrow.parquet']
+
+
+def loaded_after(code):
+    script = f'import sys\n{code}\nprint(" ".join(sorted(sys.modules)))'
+    result = subprocess.run([sys.executable, '-c', script], cwd=ROOT, capture_output=True, text=True, check=True)
+    return set(result.stdout.split())
+
+
+def test_package_defers_heavy_imports():
+    modules = loaded_after('import financeorganize')
+    assert 'pandas' in modules
+    assert [name for name in DEFERRED if name in modules] == []
+
+
+LEDGER = (
+    'import pandas as pd\n'
+    'from financeorganize import Ledger\n'
+    'ledger = Ledger(pd.DataFrame({"Data": ["2023-01-05"], "Descrição": ["Padaria"], "Valor": [9.5],'
+    ' "Tipo": ["Despesa"], "Categoria": ["Alimentação"]}))\n'
+)
+
+
+@pytest.mark.parametrize('code, module', [
+    ('import io\nfrom financeorganize import write_export\nwrite_export(ledger.df, "parquet", io.BytesIO())',
+     'pyarrow.parquet'),
+    ('from financeorganize import create_expense_pie_chart\n'
+     'create_expense_pie_chart(ledger, "2023-01-01", "2023-01-31")', 'plotly.express'),
+])
+def test_loaded_on_first_use(code, module):
+    modules = loaded_after(LEDGER + code)
+    assert module in modules
+    assert [name for name in DEFERRED if name in modules] == [module]
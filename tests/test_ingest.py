@@ -0,0 +1,91 @@
+"""Importação de CSV em blocos: valores, validação e relatório."""
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import IngestError, ingest_csv, parse_valor
+
+
+@pytest.mark.parametrize('text, expected', [
+    ('1.234,56', 1234.56),
+    ('1,234.56', 1234.56),
+    ('12,5', 12.5),
+    ('1234.56', 1234.56),
+    ('-3,50', -3.5),
+    ('1.000.000', 1_000_000.0),
+    ('-1,000,000.5', -1_000_000.5),
+    ('0.500', 0.5),
+])
+def test_parse_valor(text, expected):
+    assert parse_valor(pd.Series([text])).iloc[0] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('text', ['-1.000', '1,000', '12.345'])
+def test_parse_valor_ambiguous(text):
+    assert np.isnan(parse_valor(pd.Series([text])).iloc[0])
+    # Sem separador de milhar (cotações), o separador sozinho é o decimal
+    assert parse_valor(pd.Series([text]), grouping=False).iloc[0] == pytest.approx(float(text.replace(',', '.')))
+
+
+@pytest.mark.parametrize('text', ['1,2,3', '12,34.5', 'abc', ''])
+def test_parse_valor_invalid(text):
+    assert np.isnan(parse_valor(pd.Series([text])).iloc[0])
+
+
+def csv(rows, header='Data,Descrição,Valor,Tipo,Categoria'):
+    return io.StringIO(header + '\n' + '\n'.join(rows) + '\n')
+
+
+def test_ingest_report_counts_each_reason():
+    df, report = ingest_csv(csv([
+        '2024-01-05,Salário,"5.000,00",Receita,Salário',
+        '2024-01-06,Mercado,"1,234.56",despesa,Alimentação',
+        '2024-01-07,Luz,-1.000,Despesa,Moradia',
+        'ontem,Padaria,12,Despesa,Alimentação',
+        '2024-01-08,Cinema,abc,Despesa,Lazer',
+        '2024-01-09,Pix,10,Transferência,Outros',
+        '2024-01-10,Uber,"12,5",Despesa,',
+    ]), chunksize=2)
+
+    assert df['Valor'].tolist() == [5000.0, 1234.56, 12.5]
+    assert df['Tipo'].astype(str).tolist() == ['Receita', 'Despesa', 'Despesa']
+    assert df['Categoria'].astype(str).tolist() == ['Salário', 'Alimentação', 'Outros']
+    assert report.rows_read == 7
+    assert report.rows_valid == 3
+    assert report.rejected == {
+        'Data inválida': 1, 'Valor inválido': 1, 'Valor ambíguo': 1, 'Tipo desconhecido': 1,
+    }
+
+
+def test_chunks_do_not_change_the_result():
+    rng = np.random.default_rng(0)
+    rows = [
+        f'2024-{month:02d}-{day:02d},Item {i},"{value:.2f}",{tipo},Outros'
+        for i, (month, day, value, tipo) in enumerate(zip(
+            rng.integers(1, 13, 500), rng.integers(1, 29, 500), rng.random(500) * 900,
+            rng.choice(['Receita', 'Despesa'], 500),
+        ))
+    ]
+    whole, _ = ingest_csv(csv(rows), chunksize=1000)
+    chunked, report = ingest_csv(csv(rows), chunksize=7)
+
+    pd.testing.assert_frame_equal(whole, chunked)
+    assert report.rows_valid == 500
+
+
+def test_missing_columns_raise():
+    with pytest.raises(IngestError) as error:
+        ingest_csv(csv(['2024-01-05,Salário,10'], header='Data,Descrição,Valor'))
+    assert error.value.missing_columns == ['Tipo']
+
+
+def test_account_and_currency_defaults():
+    df, _ = ingest_csv(csv(
+        ['2024-01-05,Hotel,100,Despesa,Lazer,,usd', '2024-01-06,Café,5,Despesa,Lazer,Cartão,'],
+        header='Data,Descrição,Valor,Tipo,Categoria,Conta,Moeda',
+    ), account='Viagem', currency='EUR')
+
+    assert df['Conta'].astype(str).tolist() == ['Viagem', 'Cartão']
+    assert df['Moeda'].astype(str).tolist() == ['USD', 'EUR']
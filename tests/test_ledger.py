@@ -0,0 +1,44 @@
+"""Consultas do Ledger comparadas com pandas ingênuo em janelas aleatórias."""
+import numpy as np
+import pandas as pd
+
+from financeorganize import Ledger
+
+from .support import naive_window, random_window
+
+
+def test_between(case):
+    ledger, df, rng = case
+    for _ in range(25):
+        start_date, end_date = random_window(rng)
+        got = ledger.between(start_date, end_date)
+        expected = naive_window(df, start_date, end_date)
+        assert got['Data'].tolist() == expected['Data'].tolist()
+        assert got['Valor'].tolist() == expected['Valor'].tolist()
+        assert got['Descrição'].astype(str).tolist() == expected['Descrição'].tolist()
+
+
+def test_sorted_by_date(case):
+    ledger, df, _ = case
+    dates = ledger.df['Data']
+    assert dates.is_monotonic_increasing
+    assert len(ledger) == len(df)
+    np.testing.assert_array_equal(ledger.dates, dates.to_numpy())
+
+
+def test_positions_cover_whole_days():
+    df = pd.DataFrame({
+        'Data': ['2023-01-05 00:00:00', '2023-01-05 23:59:59', 'data ruim', '2023-01-06 00:00:00', '2023-01-04 12:00:00'],
+        'Descrição': ['a', 'b', 'c', 'd', 'e'], 'Valor': [1.0, 2.0, 3.0, 4.0, 5.0],
+        'Tipo': 'Despesa', 'Categoria': 'Outros',
+    })
+    ledger = Ledger(df)
+    assert list(ledger.df['Descrição']) == ['e', 'a', 'b', 'd']
+    # Horários nos limites não cortam o dia
+    assert ledger.positions(pd.Timestamp('2023-01-05 18:00'), pd.Timestamp('2023-01-05 06:00')) == (1, 3)
+    assert ledger.positions('2023-01-01', '2023-01-04') == (0, 1)
+    assert ledger.positions('2023-01-06', '2023-02-01') == (3, 4)
+    assert ledger.positions('2023-01-07', '2023-02-01') == (4, 4)
+    # Fim antes do início: janela vazia, nunca negativa
+    assert ledger.positions('2023-01-06', '2023-01-04') == (3, 3)
+    assert ledger.between('2023-01-06', '2023-01-04').empty
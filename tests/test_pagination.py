@@ -0,0 +1,90 @@
+"""table_page: páginas por data, por coluna e com busca, conferidas contra pandas ingênuo."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from financeorganize import table_page
+from financeorganize.search import fold
+
+from .support import DAYS, START, naive_window, random_frame, random_window
+
+QUERIES = ['agua', 'ÁGUA', 'pao acucar', 'SUPER', 'uber viagem', 'sa', 'luz conta', 'ali', 'xyz', 'farmacia joao']
+
+
+def test_dates_match_frame(case):
+    ledger, _, _ = case
+    assert ledger.dates.dtype == np.dtype('datetime64[ns]')
+    np.testing.assert_array_equal(ledger.dates, ledger.df['Data'].to_numpy())
+    assert (np.diff(ledger.dates.view('int64')) >= 0).all()
+
+
+def collect_pages(ledger, start_date, end_date, page_size, **kwargs):
+    frames, cursor = [], None
+    while True:
+        page = table_page(ledger, start_date, end_date, cursor=cursor, page_size=page_size, **kwargs)
+        assert page.start == sum(map(len, frames))
+        assert len(page.frame) <= page_size
+        frames.append(page.frame)
+        cursor = page.next_cursor
+        if cursor is None:
+            return pd.concat(frames), page.total
+
+
+@pytest.mark.parametrize('descending', [True, False])
+def test_pagination_by_date(case, descending):
+    ledger, df, rng = case
+    for _ in range(10):
+        start_date, end_date = random_window(rng)
+        page_size = int(rng.choice([1, 7, 50]))
+        got, total = collect_pages(ledger, start_date, end_date, page_size, descending=descending)
+
+        expected = naive_window(df, start_date, end_date)
+        if descending:
+            expected = expected.iloc[::-1]
+        assert total == len(expected)
+        assert got['Data'].tolist() == expected['Data'].tolist()
+        assert got['Valor'].tolist() == expected['Valor'].tolist()
+
+
+@pytest.mark.parametrize('sort', ['Valor', 'Categoria'])
+def test_pagination_by_column(case, sort):
+    ledger, df, rng = case
+    for _ in range(10):
+        start_date, end_date = random_window(rng)
+        got, total = collect_pages(ledger, start_date, end_date, 50, sort=sort, descending=True)
+
+        window = naive_window(df, start_date, end_date)
+        keys = window[sort].map(fold) if sort == 'Categoria' else window[sort]
+        expected = window.loc[keys.sort_values(kind='stable').index].iloc[::-1]
+        assert total == len(expected)
+        assert got['Data'].tolist() == expected['Data'].tolist()
+        assert got['Valor'].tolist() == expected['Valor'].tolist()
+
+
+def test_pagination_with_query(case):
+    ledger, df, rng = case
+    for query in QUERIES:
+        start_date, end_date = random_window(rng)
+        got, total = collect_pages(ledger, start_date, end_date, 25, query=query)
+
+        window = naive_window(df, start_date, end_date)
+        texts = window['Descrição'].map(fold) + ' ' + window['Categoria'].map(fold)
+        terms = fold(query).split()
+        matches = np.array([all(term in text for term in terms) for text in texts], dtype=bool)
+        expected = window[matches].iloc[::-1]
+        assert total == len(expected)
+        assert got['Data'].tolist() == expected['Data'].tolist()
+
+
+def test_date_cursor_survives_new_entries(case):
+    ledger, df, rng = case
+    start_date, end_date = START.date(), (START + pd.Timedelta(days=DAYS + 60)).date()
+    first = table_page(ledger, start_date, end_date, page_size=100)
+
+    # Lançamentos mais recentes entram no topo sem deslocar as páginas seguintes
+    newer = random_frame(rng, 20).assign(Data=START + pd.Timedelta(days=DAYS + 1))
+    second = table_page(ledger.appended(newer), start_date, end_date, cursor=first.next_cursor, page_size=100)
+
+    expected = naive_window(df, start_date, end_date).iloc[::-1]
+    assert second.start == 100
+    assert second.frame['Valor'].tolist() == expected['Valor'].iloc[100:200].tolist()
@@ -0,0 +1,114 @@
+"""Perfil por execução e métricas do processo, com um relógio controlado."""
+import json
+import logging
+
+import pytest
+
+from financeorganize import MetricsRegistry, RerunProfile, profiling
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(profiling, 'time', clock)
+    return clock
+
+
+def rerun(clock, registry, sections, marks=(), **context):
+    # sections: (nome, segundos, linhas); marks: (nome, segundos desde o início, orçamento)
+    profile = RerunProfile(registry, **context)
+    elapsed = 0.0
+    pending = sorted(marks, key=lambda mark: mark[1])
+    for name, seconds, rows in sections:
+        profile.section(name)
+        profile.add(rows=rows, nbytes=rows * 8)
+        clock.advance(seconds)
+        elapsed += seconds
+        while pending and pending[0][1] <= elapsed:
+            mark, _, budget = pending.pop(0)
+            profile.mark(mark, budget)
+    return profile.finish()
+
+
+def test_profile_sections_and_marks(clock, caplog):
+    caplog.set_level(logging.INFO, logger=profiling.__name__)
+    profile = rerun(
+        clock, None, [('dados', 0.2, 1000), ('cards', 0.05, 4), ('graficos', 0.5, 0)],
+        marks=[('primeiros_cards', 0.25, 0.1)], usuario='ana',
+    )
+    assert [(span.name, span.rows, span.nbytes) for span in profile.spans] == [
+        ('dados', 1000, 8000), ('cards', 4, 32), ('graficos', 0, 0),
+    ]
+    assert [span.seconds for span in profile.spans] == pytest.approx([0.2, 0.05, 0.5])
+    assert profile.total_seconds == pytest.approx(0.75)
+    assert profile.marks['primeiros_cards'] == pytest.approx(0.25)
+    assert profile.over_budget == {'primeiros_cards'}
+    # Marcos repetidos mantêm o primeiro valor
+    clock.advance(1)
+    assert profile.mark('primeiros_cards') == pytest.approx(0.25)
+
+    events = [json.loads(record.getMessage()) for record in caplog.records]
+    assert [event['event'] for event in events] == ['budget_exceeded', 'rerun']
+    assert events[0]['usuario'] == 'ana' and events[0]['budget_ms'] == 100.0
+    assert events[1]['total_ms'] == 750.0
+    assert events[1]['sections'][0] == {'section': 'dados', 'ms': 200.0, 'rows': 1000, 'bytes': 8000}
+
+
+def test_started_before_profile(clock):
+    started = clock.now
+    clock.advance(0.3)
+    profile = RerunProfile(started=started)
+    assert profile.mark('primeiros_cards') == pytest.approx(0.3)
+    assert profile.add(rows=5) is None  # sem seção aberta, nada a somar
+    assert profile.finish().spans == []
+
+
+def test_registry_summary(clock):
+    registry = MetricsRegistry(buckets=(0.1, 0.5, 1.0))
+    for seconds in (0.05, 0.05, 0.3, 2.0):
+        rerun(clock, registry, [('dados', seconds, 10)], marks=[('primeiros_cards', seconds, 1.0)])
+
+    assert registry.reruns == 4
+    (row,) = registry.summary()
+    assert row == {'section': 'dados', 'count': 4, 'mean_ms': 600.0, 'p95_ms': float('inf'), 'rows': 40, 'bytes': 320}
+    (mark,) = registry.marks_summary()
+    assert mark['count'] == 4 and mark['last_ms'] == 2000.0
+    assert mark['over_budget'] == 1
+    # p50 cai na faixa de 0,1 s
+    assert registry._quantile(registry._sections['dados'][0], 4, 0.5) == 100.0
+
+
+def test_prometheus_text(clock, tmp_path):
+    textfile = tmp_path / 'metrics.prom'
+    registry = MetricsRegistry(buckets=(0.1, 1.0), textfile=str(textfile), write_interval=60)
+    rerun(clock, registry, [('seção "a"', 0.05, 3), ('b', 0.5, 0)])
+    text = textfile.read_text(encoding='utf-8')
+    assert text == registry.to_prometheus()
+    lines = text.splitlines()
+    assert 'financeorganize_section_seconds_bucket{section="seção \\"a\\"",le="0.1"} 1' in lines
+    assert 'financeorganize_section_seconds_bucket{section="b",le="0.1"} 0' in lines
+    assert 'financeorganize_section_seconds_bucket{section="b",le="1.0"} 1' in lines
+    assert 'financeorganize_section_seconds_bucket{section="b",le="+Inf"} 1' in lines
+    assert 'financeorganize_section_rows_total{section="seção \\"a\\""} 3' in lines
+    assert 'financeorganize_reruns_total 1' in lines
+
+    # Antes do intervalo o arquivo não é reescrito
+    rerun(clock, registry, [('b', 0.5, 0)])
+    assert textfile.read_text(encoding='utf-8') == text
+    clock.advance(60)
+    rerun(clock, registry, [('b', 0.5, 0)])
+    assert 'financeorganize_reruns_total 3' in textfile.read_text(encoding='utf-8')
@@ -0,0 +1,96 @@
+"""BackgroundRefresher: snapshots, pedidos explícitos e backoff após falhas."""
+import time
+
+import numpy as np
+
+from financeorganize import BackgroundRefresher
+
+from .support import random_frame
+
+
+class Remote:
+    # Devolve os quadros da fila; um Exception na fila vira falha da busca
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls = []
+
+    def __call__(self, force):
+        self.calls.append(force)
+        response = self.responses.pop(0) if len(self.responses) > 1 else self.responses[0]
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def wait_for(refresher, ticket, timeout=5):
+    deadline = time.monotonic() + timeout
+    while refresher.completed < ticket:
+        assert time.monotonic() < deadline, 'a atualização não terminou'
+        time.sleep(0.005)
+
+
+def scheduled_in(refresher, timeout=5):
+    # next_attempt é agendado logo depois de a tentativa contar como concluída
+    deadline = time.monotonic() + timeout
+    while refresher.next_attempt is None:
+        assert time.monotonic() < deadline, 'nenhuma tentativa agendada'
+        time.sleep(0.005)
+    return refresher.next_attempt - time.monotonic()
+
+
+def test_snapshots():
+    rng = np.random.default_rng(1)
+    first, second = random_frame(rng, 50), random_frame(rng, 80)
+    remote = Remote(first, first, second)
+    refresher = BackgroundRefresher(remote, interval=3600).start()
+    try:
+        snapshot = refresher.wait(timeout=5)
+        assert snapshot.sequence == 1 and snapshot.frame is first
+        assert len(snapshot.ledger) == 50
+        assert remote.calls == [False]
+
+        # O mesmo quadro (resposta 304) não publica um snapshot novo
+        ticket = refresher.request()
+        wait_for(refresher, ticket)
+        assert refresher.snapshot is snapshot
+        assert remote.calls == [False, True]
+        assert not refresher.refreshing
+
+        wait_for(refresher, refresher.request())
+        assert refresher.snapshot.sequence == 2
+        assert len(refresher.snapshot.ledger) == 80
+    finally:
+        refresher.stop()
+
+
+def test_failure_keeps_snapshot_and_backs_off():
+    rng = np.random.default_rng(2)
+    frame = random_frame(rng, 10)
+    error = ConnectionError('sem rede')
+    remote = Remote(frame, error, error, frame)
+    refresher = BackgroundRefresher(remote, interval=3600, build=None, min_backoff=60, max_backoff=100).start()
+    try:
+        snapshot = refresher.wait(timeout=5)
+        assert snapshot.ledger is None
+
+        wait_for(refresher, refresher.request())
+        assert refresher.snapshot is snapshot
+        assert refresher.failures == 1 and refresher.last_error is error
+        # Espera entre metade e o total do backoff; sem o pedido, a próxima tentativa demoraria
+        assert 25 < scheduled_in(refresher) <= 60
+
+        wait_for(refresher, refresher.request())
+        assert refresher.failures == 2
+        assert 45 < scheduled_in(refresher) <= 100
+
+        wait_for(refresher, refresher.request())
+        assert refresher.failures == 0 and refresher.last_error is None
+        assert refresher.snapshot.sequence == 1  # o mesmo quadro de antes
+    finally:
+        refresher.stop()
+
+
+def test_wait_times_out_without_fetch():
+    refresher = BackgroundRefresher(Remote(None))
+    assert refresher.wait(timeout=0.01) is None
+    assert refresher.completed == 0
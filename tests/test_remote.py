@@ -0,0 +1,154 @@
+"""RemoteCSVLoader contra um servidor HTTP local: 200, 304 com ETag e cache em disco."""
+import http.server
+import os
+import threading
+
+import pandas as pd
+import pytest
+import requests
+
+from financeorganize import RemoteCSVLoader
+
+CSV_V1 = (
+    'Data,Descrição,Valor,Tipo,Categoria\n'
+    '2024-01-05,Salário,5000.00,Receita,Salário\n'
+    '2024-01-06,Supermercado,123.45,Despesa,Alimentação\n'
+    '2024-01-07,Água e Esgoto,80.10,Despesa,Moradia\n'
+)
+CSV_V2 = CSV_V1 + '2024-01-08,Uber,25.90,Despesa,Transporte\n'
+
+
+class CSVHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        server = self.server
+        server.requests.append(dict(self.headers))
+        if server.fail:
+            self.send_error(500)
+            return
+        if server.etag and self.headers.get('If-None-Match') == server.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        if server.last_modified and self.headers.get('If-Modified-Since') == server.last_modified:
+            self.send_response(304)
+            self.end_headers()
+            return
+        body = server.body.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/csv; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        if server.etag:
+            self.send_header('ETag', server.etag)
+        if server.last_modified:
+            self.send_header('Last-Modified', server.last_modified)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), CSVHandler)
+    httpd.body = CSV_V1
+    httpd.etag = '"v1"'
+    httpd.last_modified = None
+    httpd.fail = False
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    httpd.url = f'http://127.0.0.1:{httpd.server_address[1]}/lancamentos.csv'
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def make_loader(server, cache_dir, **kwargs):
+    return RemoteCSVLoader(server.url, str(cache_dir), timeout=5, **kwargs)
+
+
+def test_first_load_parses_and_writes_cache(server, tmp_path):
+    df = make_loader(server, tmp_path).load()
+
+    assert len(df) == 3
+    assert df['Valor'].tolist() == [5000.00, 123.45, 80.10]
+    assert df['Descrição'].astype(str).tolist() == ['Salário', 'Supermercado', 'Água e Esgoto']
+    assert 'If-None-Match' not in server.requests[0]
+    assert sorted(os.path.splitext(name)[1] for name in os.listdir(tmp_path)) == ['.arrow', '.json']
+
+
+def test_within_max_age_skips_request(server, tmp_path):
+    loader = make_loader(server, tmp_path)
+    first = loader.load()
+
+    assert loader.load() is first
+    assert len(server.requests) == 1
+
+
+def test_not_modified_returns_loaded_frame(server, tmp_path):
+    loader = make_loader(server, tmp_path)
+    first = loader.load()
+
+    assert loader.load(force=True) is first
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+
+
+def test_new_etag_replaces_frame(server, tmp_path):
+    loader = make_loader(server, tmp_path)
+    loader.load()
+    server.body, server.etag = CSV_V2, '"v2"'
+
+    df = loader.load(force=True)
+
+    assert len(df) == 4
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+    assert loader.load(force=True) is df
+    assert server.requests[2]['If-None-Match'] == '"v2"'
+
+
+def test_last_modified_without_etag(server, tmp_path):
+    server.etag = None
+    server.last_modified = 'Fri, 05 Jan 2024 10:00:00 GMT'
+    loader = make_loader(server, tmp_path)
+    first = loader.load()
+
+    assert loader.load(force=True) is first
+    assert server.requests[1]['If-Modified-Since'] == server.last_modified
+    assert 'If-None-Match' not in server.requests[1]
+
+
+def test_restart_revalidates_disk_cache(server, tmp_path):
+    expected = make_loader(server, tmp_path).load()
+
+    # Novo processo: o quadro sai do Arrow em disco e o servidor só confirma com 304
+    df = make_loader(server, tmp_path).load()
+
+    assert server.requests[1]['If-None-Match'] == '"v1"'
+    pd.testing.assert_frame_equal(
+        df.reset_index(drop=True).astype(str), expected.reset_index(drop=True).astype(str)
+    )
+
+
+def test_without_validators_nothing_is_cached(server, tmp_path):
+    server.etag = None
+    make_loader(server, tmp_path).load()
+    make_loader(server, tmp_path).load()
+
+    assert os.listdir(tmp_path) == []
+    assert 'If-None-Match' not in server.requests[1]
+
+
+def test_server_error_keeps_cache(server, tmp_path):
+    expected = make_loader(server, tmp_path).load()
+    server.fail = True
+
+    loader = make_loader(server, tmp_path)
+    with pytest.raises(requests.HTTPError):
+        loader.load()
+
+    # O cache em disco continua valendo quando o servidor volta
+    server.fail = False
+    df = loader.load(force=True)
+    assert server.requests[-1]['If-None-Match'] == '"v1"'
+    assert df['Valor'].tolist() == expected['Valor'].tolist()
@@ -0,0 +1,130 @@
+"""Relatórios mensais: descoberta dos livros, números do mês e o lote com prazo."""
+import json
+import sqlite3
+
+import pandas as pd
+import pytest
+
+from financeorganize import LedgerService, generate_reports, jobs_from_paths, monthly_report
+from financeorganize.reports import MANIFEST_FILE, load_job
+
+CSV = (
+    'Data,Descrição,Valor,Tipo,Categoria\n'
+    '2024-02-20,Salário,4000.00,Receita,Salário\n'
+    '2024-03-05,Salário,5000.00,Receita,Salário\n'
+    '2024-03-06,Supermercado,300.50,Despesa,Alimentação\n'
+    '2024-03-07,Aluguel,1500.00,Despesa,Moradia\n'
+    '2024-03-31,Padaria,20.00,Despesa,Alimentação\n'
+    '2024-04-01,Cinema,40.00,Despesa,Lazer\n'
+)
+
+
+@pytest.fixture
+def csv_path(tmp_path):
+    path = tmp_path / 'casa.csv'
+    path.write_text(CSV, encoding='utf-8')
+    return str(path)
+
+
+@pytest.fixture
+def db_path(tmp_path, csv_path):
+    path = str(tmp_path / 'ledger.db')
+    service = LedgerService(path, pool_size=1)
+    df = load_job(jobs_from_paths([csv_path])[0])[0].df
+    service.store('ana').replace(df)
+    service.store('bruno').replace(df.iloc[:2])
+    service.store('ana').write_budgets({'Alimentação': 250.0})
+    service.store().compact()
+    service.close()
+    return path
+
+
+def test_monthly_report(csv_path):
+    ledger, limits = load_job(jobs_from_paths([csv_path])[0])
+    report = monthly_report(ledger, '2024-03-15', limits={'Alimentação': 300.0})
+    assert report['mes'] == '2024-03' and report['moeda'] == 'BRL'
+    assert (report['receitas'], report['despesas'], report['saldo']) == (5000.0, 1820.5, 3179.5)
+    assert report['saldo_mes_anterior'] == 4000.0
+    assert (report['n_receitas'], report['n_despesas']) == (1, 3)
+    assert report['despesas_por_categoria'] == {'Moradia': 1500.0, 'Alimentação': 320.5}
+    assert report['contas'] == []
+    assert [row['Categoria'] for row in report['orcamentos']] == ['Alimentação']
+    assert report['orcamentos'][0]['Situação'] == 'Estourado'
+
+
+def test_invalid_paths(tmp_path):
+    with pytest.raises(ValueError, match='não encontrado'):
+        jobs_from_paths([str(tmp_path / 'nada.db')])
+    (tmp_path / 'notas.txt').write_text('x')
+    with pytest.raises(ValueError, match='desconhecido'):
+        jobs_from_paths([str(tmp_path / 'notas.txt')])
+    with pytest.raises(ValueError, match='manifest'):
+        jobs_from_paths([str(tmp_path)])
+
+
+def test_rejects_foreign_databases(tmp_path):
+    # Nenhum dos dois arquivos é alterado: o banco é aberto somente para leitura
+    other = tmp_path / 'outro.sqlite'
+    conn = sqlite3.connect(other)
+    conn.execute('CREATE TABLE contatos (nome TEXT)')
+    conn.commit()
+    conn.close()
+    garbage = tmp_path / 'lixo.db'
+    garbage.write_bytes(b'isto nao e um banco sqlite' * 100)
+    before = other.read_bytes(), garbage.read_bytes()
+
+    with pytest.raises(ValueError, match='ledgers'):
+        jobs_from_paths([str(other)])
+    with pytest.raises(ValueError, match='não é um banco'):
+        jobs_from_paths([str(garbage)])
+    assert (other.read_bytes(), garbage.read_bytes()) == before
+
+
+def test_sqlite_jobs_do_not_touch_the_database(db_path, tmp_path):
+    before = open(db_path, 'rb').read()
+    jobs = jobs_from_paths([db_path])
+    assert [(job.name, job.kind, job.user) for job in jobs] == [('ana', 'sqlite', 'ana'), ('bruno', 'sqlite', 'bruno')]
+    assert [job.user for job in jobs_from_paths([db_path], users=['bruno'])] == ['bruno']
+
+    results = generate_reports(jobs, '2024-03', str(tmp_path / 'saida'), formats=['json'], workers=0)
+    assert [result['status'] for result in results] == ['ok', 'ok']
+    report = json.loads(open(results[0]['arquivos'][0], encoding='utf-8').read())
+    assert report['livro'] == 'ana' and report['despesas'] == 1820.5
+    assert report['orcamentos'][0]['Limite'] == 250.0
+    assert open(db_path, 'rb').read() == before
+
+
+def test_old_schema_is_not_migrated(tmp_path):
+    path = str(tmp_path / 'antigo.db')
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE ledgers (usuario TEXT PRIMARY KEY, version INTEGER NOT NULL);
+        CREATE TABLE lancamentos (
+            id INTEGER PRIMARY KEY, usuario TEXT NOT NULL, data INTEGER NOT NULL,
+            descricao TEXT NOT NULL, valor INTEGER NOT NULL, tipo TEXT NOT NULL, categoria TEXT NOT NULL
+        );
+        INSERT INTO lancamentos VALUES (1, 'padrao', 0, 'Aluguel', 150000, 'Despesa', 'Moradia');
+    """)
+    conn.close()
+    assert [job.user for job in jobs_from_paths([path])] == ['padrao']
+
+    conn = sqlite3.connect(path)
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(lancamentos)')}
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    conn.close()
+    assert 'conta' not in columns and tables == {'ledgers', 'lancamentos'}
+
+
+def test_deadline_skips_and_records(csv_path, tmp_path):
+    output = tmp_path / 'saida'
+    jobs = jobs_from_paths([csv_path, csv_path])
+    results = generate_reports(jobs, '2024-03', str(output), formats=['json', 'html'], workers=0, deadline=0)
+    assert [result['status'] for result in results] == ['ignorado', 'ignorado']
+    manifest = json.loads((output / MANIFEST_FILE).read_text(encoding='utf-8'))
+    assert manifest['mes'] == '2024-03' and len(manifest['resultados']) == 2
+
+    seen = []
+    results = generate_reports(jobs[:1], pd.Timestamp('2024-03-01'), str(output), formats=['json', 'html'],
+                               workers=0, progress=seen.append)
+    assert seen == results and results[0]['status'] == 'ok'
+    assert sorted(path.rsplit('.', 1)[1] for path in results[0]['arquivos']) == ['html', 'json']
@@ -0,0 +1,95 @@
+"""Busca de transações: SearchIndex direto e Ledger.search contra uma varredura ingênua."""
+import numpy as np
+import pytest
+
+from financeorganize import SearchIndex, fold
+
+from .support import random_window
+
+QUERIES = ['agua', 'ÁGUA', 'pao acucar', 'SUPER', 'uber viagem', 'sa', 'luz conta', 'ali', 'xyz', 'farmacia joao']
+
+
+def test_fold():
+    assert fold('Água e Esgoto') == 'agua e esgoto'
+    assert fold('SÃO JOÃO') == 'sao joao'
+    assert fold('Uber') == 'uber'
+
+
+def test_index_modes():
+    index = SearchIndex(
+        ['Padaria do João', 'Pão de Açúcar', 'Padaria do João', 'Uber *Viagem'],
+        ['Alimentação', 'Alimentação', 'Alimentação', 'Transporte'],
+    )
+    assert len(index) == 4
+    np.testing.assert_array_equal(index.search('joao'), [0, 2])
+    np.testing.assert_array_equal(index.search('pa', mode='prefix'), [0, 1, 2])
+    np.testing.assert_array_equal(index.search('ada'), [0, 2])
+    np.testing.assert_array_equal(index.search('ada', mode='prefix'), [])
+    np.testing.assert_array_equal(index.search('alimentacao joao', lo=1, hi=3), [2])
+    np.testing.assert_array_equal(index.search('   '), [])
+    # Palavra inteira pontua mais que o começo de uma; no empate, o mais recente primeiro
+    np.testing.assert_array_equal(index.search('pao', ranked=True), [1])
+    np.testing.assert_array_equal(index.search('padaria', ranked=True), [2, 0])
+
+
+def test_index_add_keeps_earlier_results():
+    index = SearchIndex(['Luz'], ['Moradia'])
+    assert index.search('lu').tolist() == [0]
+    # Textos novos invalidam o cache dos termos curtos e entram nos tokens ordenados
+    index.add(['Lua Cheia Bar', 'Luz'], ['Lazer', 'Moradia'])
+    assert index.search('lu').tolist() == [0, 1, 2]
+    assert index.search('lu', lo=0, hi=1).tolist() == [0]
+    assert index.search('lua', mode='prefix').tolist() == [1]
+    index.add(['Bar ' + str(i) for i in range(3000)], ['Lazer'] * 3000)
+    assert len(index.search('bar')) == 3001
+    assert index.search('lu').tolist() == [0, 1, 2]
+
+
+@pytest.mark.parametrize('mode', ['substring', 'prefix'])
+def test_search(case, mode):
+    ledger, _, rng = case
+    # Posições relativas ao quadro do Ledger; a ordem dele é conferida em test_between
+    texts = [
+        fold(description) + ' ' + fold(category)
+        for description, category in zip(ledger.df['Descrição'].astype(str), ledger.df['Categoria'].astype(str))
+    ]
+    tokens = [text.replace('*', ' ').split() for text in texts]
+    for query in QUERIES:
+        terms = fold(query).split()
+        if mode == 'prefix':
+            matches = [all(any(token.startswith(term) for token in row) for term in terms) for row in tokens]
+        else:
+            matches = [all(term in text for term in terms) for text in texts]
+        matches = np.flatnonzero(matches)
+        for _ in range(5):
+            start_date, end_date = random_window(rng)
+            lo, hi = ledger.positions(start_date, end_date)
+            expected = matches[(matches >= lo) & (matches < hi)]
+
+            got = ledger.search(query, start_date, end_date, mode=mode)
+            np.testing.assert_array_equal(got, expected)
+            ranked = ledger.search(query, start_date, end_date, mode=mode, ranked=True)
+            np.testing.assert_array_equal(np.sort(ranked), expected)
+
+
+def test_add_leaves_running_queries_alone():
+    # Ledger.search consulta o índice sem lock: os conjuntos e listas que uma consulta já pegou não mudam
+    index = SearchIndex(['Padaria', 'Luz'], ['Alimentação', 'Moradia'])
+    index.search('pa')
+    trigrams, tokens = dict(index._trigrams), dict(index._token_ids)
+    held = (index._sorted_tokens, index._short_terms, index._csr, index._codes)
+    before = (
+        {gram: set(ids) for gram, ids in trigrams.items()}, {token: set(ids) for token, ids in tokens.items()},
+        list(held[0]), dict(held[1]), held[3].copy(),
+    )
+    index.add(
+        ['Papelaria Luz', 'Padaria'] + ['Bar ' + str(i) for i in range(2000)],
+        ['Casa', 'Alimentação'] + ['Lazer'] * 2000,
+    )
+
+    assert {gram: set(ids) for gram, ids in trigrams.items()} == before[0]
+    assert {token: set(ids) for token, ids in tokens.items()} == before[1]
+    assert held[0] == before[2] and held[1] == before[3] and index._csr is not held[2]
+    np.testing.assert_array_equal(held[3], before[4])
+    assert index.search('pa').tolist() == [0, 2, 3]
+    assert index._csr[2] == len(index)
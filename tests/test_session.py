@@ -0,0 +1,131 @@
+"""Versões do Ledger e camadas de sessão sobre a base compartilhada."""
+import numpy as np
+import pandas as pd
+
+from financeorganize import Ledger, SessionLedger, SharedLedger
+
+from .support import START, random_frame
+
+
+def entries(rng, n_rows, day, description=None):
+    frame = random_frame(rng, n_rows).assign(Data=pd.Timestamp(day))
+    return frame if description is None else frame.assign(Descrição=description)
+
+
+def snapshot(ledger):
+    return (
+        ledger.df.astype({'Descrição': str, 'Categoria': str}).copy(),
+        ledger.balance_cents().copy(),
+        ledger.search('agua', START, START + pd.Timedelta(days=900)).copy(),
+    )
+
+
+def assert_snapshot(ledger, expected):
+    df, balance, found = expected
+    pd.testing.assert_frame_equal(ledger.df.astype({'Descrição': str, 'Categoria': str}), df)
+    np.testing.assert_array_equal(ledger.balance_cents(), balance)
+    np.testing.assert_array_equal(ledger.search('agua', START, START + pd.Timedelta(days=900)), found)
+
+
+def expected_frame(*frames):
+    df = pd.concat(frames, ignore_index=True).sort_values('Data', kind='stable', ignore_index=True)
+    return df[['Data', 'Descrição', 'Valor']].astype({'Data': 'datetime64[ns]', 'Descrição': str})
+
+
+def test_appended_keeps_published_versions(case):
+    ledger, df, rng = case
+    before = snapshot(ledger)
+    last_day = df['Data'].max()
+
+    chain = ledger
+    for step in range(5):
+        chain = chain.appended(entries(rng, 3, last_day + pd.Timedelta(days=step), 'Água nova'))
+    assert_snapshot(ledger, before)
+    assert len(chain) == len(df) + 15
+    np.testing.assert_array_equal(chain.balance_cents(), np.cumsum(chain.signed))
+    assert len(chain.search('agua nova', START, last_day + pd.Timedelta(days=10))) == 15
+
+
+def test_branches_do_not_share_new_rows(case):
+    ledger, df, rng = case
+    last_day = df['Data'].max()
+    left_rows = entries(rng, 4, last_day, 'Esquerda')
+    right_rows = entries(rng, 6, last_day + pd.Timedelta(days=1), 'Direita')
+
+    left = ledger.appended(left_rows, take_indexes=False)
+    right = ledger.appended(right_rows)
+    left_more = left.appended(entries(rng, 2, last_day + pd.Timedelta(days=2), 'Mais'))
+
+    assert left.df['Descrição'].astype(str).iloc[-4:].tolist() == ['Esquerda'] * 4
+    assert right.df['Descrição'].astype(str).iloc[-6:].tolist() == ['Direita'] * 6
+    assert left_more.df['Descrição'].astype(str).iloc[-6:].tolist() == ['Esquerda'] * 4 + ['Mais'] * 2
+    pd.testing.assert_frame_equal(
+        right.df[['Data', 'Descrição', 'Valor']].astype({'Descrição': str}),
+        expected_frame(df, right_rows),
+    )
+
+
+def test_new_labels_widen_codes():
+    rng = np.random.default_rng(5)
+    base = entries(rng, 10, START)
+    ledger = Ledger(base)
+    added = []
+    # Mais de 127 descrições distintas: os códigos passam de int8 para int16 no meio do caminho
+    for i in range(200):
+        batch = entries(rng, 1, START + pd.Timedelta(days=i), f'Loja {i}').assign(Conta=f'Conta {i % 3}')
+        added.append(batch)
+        ledger = ledger.appended(batch)
+
+    pd.testing.assert_frame_equal(
+        ledger.df[['Data', 'Descrição', 'Valor']].astype({'Descrição': str}), expected_frame(base, *added)
+    )
+    assert ledger.accounts() == ['Conta 0', 'Conta 1', 'Conta 2', 'Principal']
+    assert ledger.df['Descrição'].cat.codes.dtype == np.dtype('int16')
+
+
+def test_labels_follow_appended_rows():
+    rng = np.random.default_rng(6)
+    ledger = Ledger(entries(rng, 5, START))
+    assert ledger.accounts() == ['Principal']
+    ledger = ledger.appended(entries(rng, 1, START + pd.Timedelta(days=1)).assign(Conta='Cartão', Moeda='USD'))
+    assert ledger.accounts() == ['Cartão', 'Principal']
+    assert ledger.currency is None
+
+
+def test_session_overlay_and_commit():
+    rng = np.random.default_rng(7)
+    base_rows = entries(rng, 50, START)
+    shared = SharedLedger(Ledger(base_rows))
+    mine, other = SessionLedger(shared), SessionLedger(shared)
+    base = shared.ledger
+
+    first = entries(rng, 2, START + pd.Timedelta(days=1))
+    second = entries(rng, 3, START + pd.Timedelta(days=2))
+    mine.stage(first)
+    assert len(mine.ledger) == 52
+    mine.stage(second)
+    assert len(mine.ledger) == 55
+    assert other.ledger is base and len(base) == 50
+
+    mine.commit()
+    assert mine.pending.empty
+    assert shared.ledger is not base and len(base) == 50
+    pd.testing.assert_frame_equal(
+        other.ledger.df[['Data', 'Descrição', 'Valor']].astype({'Descrição': str}),
+        expected_frame(base_rows, first, second),
+    )
+
+
+def test_overlay_follows_new_base():
+    rng = np.random.default_rng(8)
+    shared = SharedLedger(Ledger(entries(rng, 20, START)))
+    mine, other = SessionLedger(shared), SessionLedger(shared)
+    mine.stage(entries(rng, 1, START + pd.Timedelta(days=3)))
+    assert len(mine.ledger) == 21
+
+    other.stage(entries(rng, 4, START + pd.Timedelta(days=1)))
+    other.commit()
+    # A base mudou: a camada é refeita sobre ela com os mesmos pendentes
+    assert len(mine.ledger) == 25
+    mine.discard()
+    assert mine.ledger is shared.ledger
@@ -0,0 +1,88 @@
+"""LedgerStore: segmentos Arrow, compactação, versões e rollups."""
+import numpy as np
+import pandas as pd
+
+from financeorganize import COLUMNS, LedgerStore, complete_columns
+
+from .support import START, random_frame
+
+
+def comparable(df):
+    return complete_columns(df)[COLUMNS].astype({
+        'Data': 'datetime64[ns]', 'Descrição': str, 'Tipo': str, 'Categoria': str, 'Conta': str, 'Moeda': str,
+    }).reset_index(drop=True)
+
+
+def test_append_writes_segments(tmp_path):
+    rng = np.random.default_rng(1)
+    batches = [random_frame(rng, 50).assign(Data=START + pd.Timedelta(days=i)) for i in range(3)]
+    store = LedgerStore(str(tmp_path), compact_after=10)
+    assert store.is_empty() and store.read().empty
+
+    for i, batch in enumerate(batches, start=1):
+        assert store.append(batch) == i
+    assert store.segment_count == 3
+    assert store.append(batches[0].iloc[:0]) == 3
+    pd.testing.assert_frame_equal(comparable(store.read()), comparable(pd.concat(batches)))
+
+    # Outra instância lê o mesmo manifesto
+    reopened = LedgerStore(str(tmp_path))
+    assert reopened.version == 3
+    pd.testing.assert_frame_equal(comparable(reopened.read()), comparable(pd.concat(batches)))
+
+
+def test_compact_keeps_content_and_version(tmp_path):
+    rng = np.random.default_rng(2)
+    df = random_frame(rng, 400)
+    store = LedgerStore(str(tmp_path), compact_after=4)
+    for i, start in enumerate(range(0, 400, 100), start=1):
+        assert store.append(df.iloc[start:start + 100]) == i
+    # O quarto segmento dispara a compactação
+    assert store.segment_count == 0
+    assert store.version == 4
+    assert list((tmp_path / 'segments').iterdir()) == []
+
+    expected = comparable(df.sort_values('Data', kind='stable'))
+    pd.testing.assert_frame_equal(comparable(store.read()), expected)
+
+
+def test_replace_and_budgets(tmp_path):
+    rng = np.random.default_rng(3)
+    store = LedgerStore(str(tmp_path))
+    store.append(random_frame(rng, 10))
+    df = random_frame(rng, 5)
+    assert store.replace(df) == 2
+    assert len(store.read()) == 5
+
+    assert store.read_budgets() == {}
+    store.write_budgets({'Mercado': 800, 'Lazer': 150.5})
+    assert store.read_budgets() == {'Mercado': 800.0, 'Lazer': 150.5}
+    assert store.version == 2
+
+
+def test_rollup_follows_version(tmp_path):
+    rng = np.random.default_rng(4)
+    store = LedgerStore(str(tmp_path))
+    assert store.read_rollup('mensal') is None
+    store.append(random_frame(rng, 10))
+    rollup = pd.DataFrame({'mes': ['2023-01', '2023-02'], 'total': [10, 20]})
+    store.write_rollup('mensal', rollup)
+    pd.testing.assert_frame_equal(store.read_rollup('mensal'), rollup)
+
+    store.append(random_frame(rng, 3))
+    assert store.read_rollup('mensal') is None
+    store.write_rollup('mensal', rollup, version=store.version)
+    assert store.read_rollup('mensal') is not None
+
+
+def test_invalid_dates_dropped(tmp_path):
+    df = pd.DataFrame({
+        'Data': ['2023-01-05', 'ontem'], 'Descrição': ['a', 'b'], 'Valor': [1.25, 2.0],
+        'Tipo': 'Despesa', 'Categoria': 'Outros',
+    })
+    store = LedgerStore(str(tmp_path))
+    store.append(df)
+    stored = store.read()
+    assert list(stored['Descrição']) == ['a']
+    assert stored['Valor'].tolist() == [1.25]
+    assert list(stored['Conta']) == [complete_columns(df)['Conta'][0]]